@@ -33,4 +33,4 @@ echo.
 echo Press Ctrl+C to stop the server
 echo.
 
-python backend/main.py
\ No newline at end of file
+python backend/serve.py
\ No newline at end of file
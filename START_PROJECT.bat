@@ -46,4 +46,4 @@ echo 💡 Press Ctrl+C to stop the server
 echo.
 
 cd backend
-python main.py
\ No newline at end of file
+python serve.py
\ No newline at end of file
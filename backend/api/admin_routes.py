@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from auth import get_current_active_user
-from models import User, Consultation, AuditLog, UserRole
-from typing import List, Dict, Any
+from models import User, Consultation, AuditLog, UserRole, SummaryRun
+from services.summary_runner import SummaryRunner
+from services.query_understanding_service import QueryUnderstandingService
+from services.llm_gateway import LLMGateway
+from services.medical_info_service import MedicalInfoService
+from utils.llm_response_cache import LLMResponseCache
+from typing import List, Dict, Any, Optional
 import logging
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
 
+# Bulk re-summarisation of the report archive
+summary_runner = SummaryRunner()
+
 async def get_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -49,4 +57,107 @@ async def get_audit_logs(
     db: Session = Depends(get_db)
 ):
     logs = db.query(AuditLog).order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    return logs
\ No newline at end of file
+    return logs
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Hit/miss counters and size of the LLM response cache"""
+    return LLMResponseCache.stats(db)
+
+@router.get("/query-routing")
+async def get_query_routing_stats(admin: User = Depends(get_admin_user)):
+    """Share of chat queries whose intent came from local rules, the LLM cache or OpenAI"""
+    return QueryUnderstandingService.routing_stats()
+
+@router.get("/llm-gateway")
+async def get_llm_gateway_stats(admin: User = Depends(get_admin_user)):
+    """OpenAI calls per model: counts, errors, timeouts, in-flight calls, queue depth and coalesced calls"""
+    return {**LLMGateway.get().stats(), "coalescing": {"medical_info": MedicalInfoService.inflight.stats()}}
+
+@router.delete("/llm-cache")
+async def clear_llm_cache(
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    deleted = LLMResponseCache.clear(db)
+    return {"deleted": deleted}
+
+def _get_summary_run(db: Session, run_id: int) -> SummaryRun:
+    run = db.query(SummaryRun).filter(SummaryRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return run
+
+@router.post("/jobs/resummarize")
+async def start_resummarize_job(
+    batch_size: Optional[int] = Query(None, ge=1, le=1000),
+    workers: Optional[int] = Query(None, ge=1, le=32),
+    throttle_seconds: Optional[float] = Query(None, ge=0),
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Re-summarise every report with a missing or stale AI summary in the background"""
+    try:
+        run = summary_runner.start(db, batch_size=batch_size, workers=workers, throttle_seconds=throttle_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return SummaryRunner.progress(run)
+
+@router.get("/jobs")
+async def list_jobs(
+    skip: int = 0,
+    limit: int = 20,
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    runs = db.query(SummaryRun).order_by(SummaryRun.id.desc()).offset(skip).limit(limit).all()
+    return [SummaryRunner.progress(run) for run in runs]
+
+@router.get("/jobs/{run_id}")
+async def get_job(
+    run_id: int,
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    return SummaryRunner.progress(_get_summary_run(db, run_id))
+
+@router.post("/jobs/{run_id}/throttle")
+async def throttle_job(
+    run_id: int,
+    batch_size: Optional[int] = Query(None, ge=1, le=1000),
+    workers: Optional[int] = Query(None, ge=1, le=32),
+    throttle_seconds: Optional[float] = Query(None, ge=0),
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Change batch size, worker count or pause between batches; applies from the next batch"""
+    run = _get_summary_run(db, run_id)
+    if batch_size is not None:
+        run.batch_size = batch_size
+    if workers is not None:
+        run.workers = workers
+    if throttle_seconds is not None:
+        run.throttle_seconds = throttle_seconds
+    db.commit()
+    db.refresh(run)
+    return SummaryRunner.progress(run)
+
+@router.post("/jobs/{run_id}/{action}")
+async def control_job(
+    run_id: int,
+    action: str,
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """pause, resume or cancel a run"""
+    statuses = {"pause": "paused", "resume": "running", "cancel": "cancelled"}
+    if action not in statuses:
+        raise HTTPException(status_code=404, detail="Unknown job action")
+    try:
+        run = summary_runner.set_status(db, _get_summary_run(db, run_id), statuses[action])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return SummaryRunner.progress(run)
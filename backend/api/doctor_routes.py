@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from database import get_db
-from models import User, MedicalReport, Patient, Task
+from typing import Any, Callable, Dict, List, Optional
+from database import get_db, SessionLocal
+from models import User, MedicalReport, Patient, Task, LabResult
 from schemas import ReportResponse, ChatQuery, MedicalQuery, MedicalInfoResponse, TaskCreate, TaskResponse, DuplicateUploadConfirm
 from services.query_understanding_service import QueryUnderstandingService
 from services.medical_info_service import MedicalInfoService
-from utils.pdf_processor import PDFProcessor
+from services.parsed_report_store import ParsedReportStore
+from services.report_job_queue import ReportJobQueue
+from utils.blob_store import BlobStore
+from utils.file_serving import ReportFileServer
+from utils.upload_storage import UploadStorage
+from config import get_settings
+import asyncio
+import json
 import logging
 import os
 import re
-import hashlib
 from datetime import datetime
 
 router = APIRouter(prefix="/api/doctor", tags=["Doctor"])
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # Initialize services
 query_understanding_service = QueryUnderstandingService()
 medical_info_service = MedicalInfoService()
+report_job_queue = ReportJobQueue()
 
 
 @router.post("/chat/query")
@@ -30,6 +39,58 @@ async def handle_chat_query(
     """
     Handle natural language chat queries using OpenAI
     """
+    return await _answer_chat_query(query, db)
+
+
+@router.post("/chat/query/stream")
+async def stream_chat_query(query: ChatQuery):
+    """
+    /chat/query as server-sent events. "token" events carry the model's text as it
+    is generated (medical analyses and medical knowledge answers); a final
+    "response" event carries the same JSON /chat/query returns, or an "error"
+    event its error detail.
+    """
+    async def events():
+        tokens: asyncio.Queue = asyncio.Queue()
+        # The response outlives request-scoped dependencies, so the stream has its own session
+        db = SessionLocal()
+        
+        async def answer():
+            try:
+                return await _answer_chat_query(query, db, on_token=tokens.put_nowait)
+            finally:
+                tokens.put_nowait(None)
+        
+        task = asyncio.create_task(answer())
+        try:
+            # Sent at once so the client sees the stream open before any model output
+            yield ": stream open\n\n"
+            while (text := await tokens.get()) is not None:
+                yield _sse_event("token", {"text": text})
+            try:
+                yield _sse_event("response", jsonable_encoder(await task))
+            except HTTPException as e:
+                yield _sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        finally:
+            # Client went away mid-answer
+            if not task.done():
+                task.cancel()
+            db.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _answer_chat_query(query: ChatQuery, db: Session,
+                             on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Body of /chat/query; on_token receives model output as it streams
+    (/chat/query/stream), the returned response is the same either way
+    """
     query_text = query.query
     mode = query.mode or "medical_report"  # Default to medical_report
     
@@ -140,7 +201,7 @@ async def handle_chat_query(
         # Route based on mode
         if mode == "medical_knowledge":
             # Use medical info service for general medical knowledge
-            medical_info = await medical_info_service.get_medical_information(query_text)
+            medical_info = await medical_info_service.get_medical_information(query_text, on_token=on_token)
             
             response_text = f"{medical_info.get('answer', 'I couldn\'t find specific information about that.')}\n\n"
             
@@ -220,7 +281,7 @@ async def handle_chat_query(
                         report = reports[0]
                         # Use OpenAI to suggest prescriptions based on report
                         prescription_prompt = f"Based on this medical report summary: {report.ai_summary or 'No summary available'}, suggest appropriate medications and treatment plan. Be concise and professional."
-                        prescription_info = await medical_info_service.get_medical_information(prescription_prompt)
+                        prescription_info = await medical_info_service.get_medical_information(prescription_prompt, on_token=on_token)
                         
                         response_text = f"**Prescription Suggestions for {patient.full_name or patient.username}:**\n\n"
                         response_text += prescription_info.get('answer', 'Unable to generate prescription suggestions at this time.')
@@ -288,7 +349,7 @@ async def handle_chat_query(
                 
                 for report in reports_with_text:
                     if report.extracted_text:
-                        extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                        extracted_name = ParsedReportStore.patient_name(db, report)
                         if extracted_name:
                             # Check if extracted name matches search WITH title
                             if search_name.lower() in extracted_name.lower() or f"{title} {patient_name}".lower() in extracted_name.lower():
@@ -318,7 +379,7 @@ async def handle_chat_query(
                 
                 for report in reports_with_text:
                     if report.extracted_text:
-                        extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                        extracted_name = ParsedReportStore.patient_name(db, report)
                         if extracted_name:
                             # Check if extracted name matches search WITHOUT title
                             if patient_name.lower() in extracted_name.lower():
@@ -348,7 +409,7 @@ async def handle_chat_query(
                 
                 for report in reports_with_text:
                     if report.extracted_text:
-                        extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                        extracted_name = ParsedReportStore.patient_name(db, report)
                         if extracted_name:
                             if patient_name.lower() in extracted_name.lower():
                                 existing_patient = db.query(User).filter(
@@ -489,7 +550,7 @@ async def handle_chat_query(
             # Use OpenAI to analyze the medical report
             try:
                 # Create a dedicated analysis using OpenAI directly with better prompt
-                if not medical_info_service.client:
+                if not medical_info_service.llm.available:
                     return {
                         "response": f"**📊 Medical Analysis for {analysis_patient_name}**\n\n❌ OpenAI API key is not configured. Please configure the OpenAI API key to generate medical analysis.",
                         "requires_upload": False,
@@ -526,22 +587,16 @@ Report Data:
 
 Provide your analysis focusing on issues, causes, and recommendations. Do NOT include the raw report content in your response."""
 
-                import asyncio
-                loop = asyncio.get_event_loop()
-                openai_response = await loop.run_in_executor(
-                    None,
-                    lambda: medical_info_service.client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        temperature=0.3,  # Lower temperature for more focused analysis
-                        max_tokens=1500
-                    )
-                )
-                
-                analysis_text = openai_response.choices[0].message.content.strip()
+                analysis_text = (await medical_info_service.llm.chat(
+                    "gpt-3.5-turbo",
+                    [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.3,  # Lower temperature for more focused analysis
+                    max_tokens=1500,
+                    on_token=on_token
+                )).strip()
                 
                 # Clean up the analysis text - remove any accidental report content
                 # Check if the analysis contains the report content and remove it
@@ -614,11 +669,11 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                     if patient and patient.full_name:
                         patient_name = patient.full_name
                     elif report.extracted_text:
-                        extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                        extracted_name = ParsedReportStore.patient_name(db, report)
                         if extracted_name:
                             patient_name = extracted_name
                 elif report.extracted_text:
-                    extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                    extracted_name = ParsedReportStore.patient_name(db, report)
                     if extracted_name:
                         patient_name = extracted_name
                 
@@ -676,7 +731,7 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                         elif not patient.full_name and not patient.username:
                             should_delete = True
                         elif report.extracted_text:
-                            extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                            extracted_name = ParsedReportStore.patient_name(db, report)
                             if not extracted_name and not patient.full_name:
                                 should_delete = True
                     
@@ -686,7 +741,7 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                         if patient:
                             if not patient.full_name:
                                 if report.extracted_text:
-                                    extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                                    extracted_name = ParsedReportStore.patient_name(db, report)
                                     if not extracted_name:
                                         should_delete = True
                                 else:
@@ -696,18 +751,16 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                         reports_to_delete.append(report)
                 
                 deleted_count = 0
+                released_files = []
                 for report in reports_to_delete:
-                    # Delete file if exists
-                    if report.file_path and os.path.exists(report.file_path):
-                        try:
-                            os.remove(report.file_path)
-                        except Exception as e:
-                            logger.warning(f"Could not delete file {report.file_path}: {e}")
+                    # Release the stored file (removed once no other report uses it)
+                    released_files.append(BlobStore.release(db, report))
                     
                     db.delete(report)
                     deleted_count += 1
                 
                 db.commit()
+                BlobStore.delete_files(db, released_files)
                 
                 return {
                     "response": f"✅ **Cleanup Complete**\n\nDeleted **{deleted_count}** invalid report(s) with Unknown Patient or missing data from the database.",
@@ -755,30 +808,20 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                 
                 # Delete duplicate reports
                 deleted_count = 0
+                released_files = []
                 deleted_hashes = set()
                 
                 for report in duplicates_to_remove:
-                    # Only delete the file if it's not shared with other reports
+                    # Drop this report's reference; the kept report still holds the shared file
                     file_hash = report.file_hash
-                    if file_hash not in deleted_hashes:
-                        # Check if any other report uses this file_path
-                        other_reports_with_same_file = db.query(MedicalReport).filter(
-                            MedicalReport.file_path == report.file_path,
-                            MedicalReport.id != report.id
-                        ).count()
-                        
-                        # Only delete file if no other reports use it
-                        if other_reports_with_same_file == 0 and report.file_path and os.path.exists(report.file_path):
-                            try:
-                                os.remove(report.file_path)
-                            except Exception as e:
-                                logger.warning(f"Could not delete file {report.file_path}: {e}")
+                    released_files.append(BlobStore.release(db, report))
                     
                     db.delete(report)
                     deleted_count += 1
                     deleted_hashes.add(file_hash)
                 
                 db.commit()
+                BlobStore.delete_files(db, released_files)
                 
                 return {
                     "response": f"✅ **Duplicate Removal Complete**\n\nRemoved **{deleted_count}** duplicate report(s) from the database.\n\n**Unique hashes cleaned:** {len(deleted_hashes)}",
@@ -924,7 +967,7 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
             
             for report in reports:
                 if report.extracted_text:
-                    patient_name = _extract_patient_name_from_text(report.extracted_text)
+                    patient_name = ParsedReportStore.patient_name(db, report)
                     if patient_name:
                         patient_names.add(patient_name)
             
@@ -992,11 +1035,14 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
             # Analyze reports for abnormalities
             abnormalities = []
             for report in reports:
-                if report.extracted_text:
-                    # Look for abnormal values, high/low indicators
-                    text_lower = report.extracted_text.lower()
-                    if any(word in text_lower for word in ['high', 'elevated', 'increased', 'abnormal', 'low', 'decreased', 'below']):
-                        abnormalities.append(f"Report from {report.report_date.strftime('%Y-%m-%d') if report.report_date else 'Unknown date'}: Contains abnormal values")
+                # Flagged results from the stored parse, not keywords in the text
+                flagged = [
+                    f"{result['test']} {result['status'].lower()}"
+                    for result in ParsedReportStore.iter_results(ParsedReportStore.ensure_parsed(db, report))
+                    if result.get("status") in ["High", "Low"]
+                ]
+                if flagged:
+                    abnormalities.append(f"Report from {report.report_date.strftime('%Y-%m-%d') if report.report_date else 'Unknown date'}: {', '.join(flagged)}")
             
             response_text = f"**Analysis for {patient.full_name or patient.username}:**\n\n"
             response_text += f"**Total Reports:** {len(reports)}\n\n"
@@ -1033,37 +1079,33 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
                     "requires_upload": False
                 }
             
-            # Search through all reports for the lab value
-            reports = db.query(MedicalReport).filter(MedicalReport.extracted_text != "").all()
-            matching_patients = []
-            
-            lab_test_lower = lab_test.lower()
+            # One indexed query on lab_results (analyte, flag)
+            test_names = ParsedReportStore.matching_tests(lab_test)
             condition_lower = lab_condition.lower() if lab_condition else "low"
+            query = db.query(
+                LabResult.report_id, LabResult.report_date, User.full_name
+            ).outerjoin(User, User.id == LabResult.patient_id).filter(
+                LabResult.analyte.in_(test_names)
+            )
+            if condition_lower in ["low", "less", "decreased", "below"]:
+                query = query.filter(LabResult.flag == "Low")
+            elif condition_lower in ["high", "more", "increased", "elevated", "above"]:
+                query = query.filter(LabResult.flag == "High")
+            # If condition not specified, show all
             
-            for report in reports:
-                if report.extracted_text:
-                    text_lower = report.extracted_text.lower()
-                    # Check if lab test is mentioned
-                    if lab_test_lower in text_lower:
-                        # Check for condition (high/low)
-                        is_match = False
-                        if condition_lower in ["low", "less", "decreased", "below"]:
-                            if any(word in text_lower for word in ['low', 'less', 'decreased', 'below', 'deficit']):
-                                is_match = True
-                        elif condition_lower in ["high", "more", "increased", "elevated", "above"]:
-                            if any(word in text_lower for word in ['high', 'more', 'increased', 'elevated', 'above']):
-                                is_match = True
-                        else:
-                            is_match = True  # If condition not specified, show all
-                        
-                        if is_match:
-                            patient_name = _extract_patient_name_from_text(report.extracted_text)
-                            if patient_name and patient_name not in [p['name'] for p in matching_patients]:
-                                matching_patients.append({
-                                    "name": patient_name,
-                                    "report_id": report.id,
-                                    "report_date": report.report_date.strftime('%Y-%m-%d') if report.report_date else 'Unknown'
-                                })
+            matching_patients = []
+            for report_id, report_date, full_name in query.order_by(LabResult.report_date.desc()).all():
+                patient_name = full_name
+                if not patient_name:
+                    # Report not linked to a named patient; use the name printed on it
+                    report = db.query(MedicalReport).filter(MedicalReport.id == report_id).first()
+                    patient_name = ParsedReportStore.patient_name(db, report) if report else None
+                if patient_name and patient_name not in [p['name'] for p in matching_patients]:
+                    matching_patients.append({
+                        "name": patient_name,
+                        "report_id": report_id,
+                        "report_date": report_date.strftime('%Y-%m-%d') if report_date else 'Unknown'
+                    })
             
             if not matching_patients:
                 return {
@@ -1096,50 +1138,58 @@ Provide your analysis focusing on issues, causes, and recommendations. Do NOT in
 @router.get("/reports/{report_id}/file")
 async def get_report_file(
     report_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Download or view a medical report file (PDF, image, etc.)
+    Supports Range requests and conditional GETs (ETag / Last-Modified)
     """
+    report = db.query(MedicalReport).filter(MedicalReport.id == report_id).first()
+    
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    if not report.file_path:
+        raise HTTPException(status_code=404, detail="Report file path not found")
+    
+    file_path = ReportFileServer.resolve_path(report.file_path)
     try:
-        # Get the report
-        report = db.query(MedicalReport).filter(MedicalReport.id == report_id).first()
-        
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        # Check if file exists
-        if not report.file_path or not os.path.exists(report.file_path):
-            raise HTTPException(status_code=404, detail="Report file not found")
-        
-        # Determine media type based on file extension
-        file_ext = os.path.splitext(report.file_path)[1].lower()
-        media_type_map = {
-            '.pdf': 'application/pdf',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.txt': 'text/plain'
-        }
-        
-        media_type = media_type_map.get(file_ext, 'application/octet-stream')
-        
-        # Create a safe filename for download
-        safe_filename = f"{report.report_type}_{report.patient.full_name}_{report.id}{file_ext}".replace(" ", "_")
-        
-        return FileResponse(
-            path=report.file_path,
-            media_type=media_type,
-            filename=safe_filename,
-            headers={
-                "Content-Disposition": f"inline; filename={safe_filename}",
-                "Cache-Control": "no-cache"
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Error serving report file: {e}")
-        raise HTTPException(status_code=500, detail="Error retrieving report file")
+        stat_result = os.stat(file_path) if file_path else None
+    except OSError:
+        ReportFileServer.invalidate(report.file_path)
+        stat_result = None
+    
+    if not stat_result:
+        raise HTTPException(status_code=404, detail="Report file not found")
+    
+    etag = ReportFileServer.etag(report.file_hash) if report.file_hash else None
+    headers = {
+        "Last-Modified": ReportFileServer.last_modified(stat_result.st_mtime),
+        # Browsers keep the file but revalidate, which is a 304 when unchanged
+        "Cache-Control": "private, no-cache"
+    }
+    if etag:
+        headers["ETag"] = etag
+    
+    if ReportFileServer.is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    
+    # Get the original filename for display
+    file_ext = os.path.splitext(file_path)[1].lower()
+    filename = report.report_name or f"report_{report_id}{file_ext}"
+    if not filename.endswith(file_ext):
+        filename += file_ext
+    
+    # FileResponse serves Range / If-Range requests (206, 416) using the ETag above
+    return FileResponse(
+        path=file_path,
+        media_type=ReportFileServer.media_type(file_path),
+        filename=filename,
+        headers=headers,
+        stat_result=stat_result,
+        content_disposition_type="inline"  # Open in browser instead of downloading
+    )
 
 
 @router.get("/reports/{report_id}")
@@ -1166,6 +1216,7 @@ async def get_report_details(
             "file_path": report.file_path,
             "ai_summary": report.ai_summary,
             "extracted_text": report.extracted_text,
+            "parsed_data": ParsedReportStore.ensure_parsed(db, report),
             "uploaded_at": report.uploaded_at.strftime('%Y-%m-%d %H:%M:%S') if report.uploaded_at else None,
             "download_url": f"/api/doctor/reports/{report.id}/file",
             "can_view_inline": report.file_type in ['pdf', 'jpg', 'jpeg', 'png']
@@ -1176,11 +1227,6 @@ async def get_report_details(
         raise HTTPException(status_code=500, detail="Error retrieving report details")
 
 
-def calculate_file_hash(content: bytes) -> str:
-    """Calculate MD5 hash of file content for duplicate detection"""
-    return hashlib.md5(content).hexdigest()
-
-
 @router.post("/reports/upload")
 async def upload_medical_report(
     file: UploadFile = File(...),
@@ -1193,6 +1239,7 @@ async def upload_medical_report(
     """
     Upload medical report with text extraction and duplicate detection
     """
+    temp_path = None
     try:
         # Validate file type
         allowed_extensions = [".pdf", ".jpg", ".jpeg", ".png"]
@@ -1201,46 +1248,19 @@ async def upload_medical_report(
         if file_ext not in allowed_extensions:
             raise HTTPException(status_code=400, detail="Invalid file type")
         
-        # Read file content
-        content = await file.read()
-        
-        # Calculate file hash for duplicate detection
-        file_hash = calculate_file_hash(content)
+        # Stream the upload to a temp file in chunks, hashing as we go
+        temp_path, file_hash, file_size = await UploadStorage.stream_to_temp(file)
         
-        # Check for duplicate (unless force_upload is True)
+        # Check for duplicate (unless force_upload is True); legacy reports are hashed
+        # by backfill_file_hashes, so a single indexed lookup is enough
         if not force_upload:
-            # First check by file_hash (for reports that have hash)
             existing_report = db.query(MedicalReport).filter(
                 MedicalReport.file_hash == file_hash
             ).first()
             
-            # If no match by hash, check reports without hash by comparing file content
-            if not existing_report:
-                reports_without_hash = db.query(MedicalReport).filter(
-                    (MedicalReport.file_hash.is_(None)) | (MedicalReport.file_hash == "")
-                ).all()
-                
-                for report in reports_without_hash:
-                    if report.file_path and os.path.exists(report.file_path):
-                        try:
-                            # Read existing file and calculate its hash
-                            with open(report.file_path, "rb") as f:
-                                existing_content = f.read()
-                                existing_hash = calculate_file_hash(existing_content)
-                                
-                                # Update the report with hash for future checks
-                                report.file_hash = existing_hash
-                                db.commit()
-                                
-                                # Check if it matches the uploaded file
-                                if existing_hash == file_hash:
-                                    existing_report = report
-                                    break
-                        except Exception as e:
-                            logger.warning(f"Could not read file {report.file_path} for duplicate check: {e}")
-                            continue
-            
             if existing_report:
+                UploadStorage.discard(temp_path)
+                
                 # Get patient name for the existing report
                 existing_patient_name = "Unknown"
                 if existing_report.patient_id:
@@ -1258,50 +1278,10 @@ async def upload_medical_report(
                     "filename": file.filename
                 }
         
-        # Save file
-        upload_dir = "uploads/reports"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        file_path = os.path.join(upload_dir, f"{datetime.now().timestamp()}_{file.filename}")
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Extract text from file
-        extracted_text = ""
-        if file_ext == ".pdf":
-            extracted_text = PDFProcessor.extract_text_from_pdf(file_path) or ""
-        elif file_ext in [".jpg", ".jpeg", ".png"]:
-            extracted_text = PDFProcessor.extract_text_from_image(file_path) or ""
+        # Store content-addressed; a byte-identical re-upload reuses the existing blob
+        file_path = BlobStore.store(db, temp_path, file_hash, file_size, file_ext)
         
-        # Extract patient name from text
-        patient_name_from_report = _extract_patient_name_from_text(extracted_text)
-        
-        # If patient_id not provided, try to find or create patient by name
-        if not patient_id and patient_name_from_report:
-            # Search for existing patient
-            existing_patient = db.query(User).filter(
-                (User.full_name.ilike(f"%{patient_name_from_report}%")) |
-                (User.username.ilike(f"%{patient_name_from_report}%"))
-            ).first()
-            
-            if existing_patient:
-                patient_id = existing_patient.id
-            else:
-                # Create new patient with extracted name
-                new_patient = User(
-                    full_name=patient_name_from_report,
-                    username=patient_name_from_report.lower().replace(" ", "_"),
-                    email=f"{patient_name_from_report.lower().replace(' ', '_')}@example.com",
-                    hashed_password="",  # No password for auto-created patients
-                    role="patient"
-                )
-                db.add(new_patient)
-                db.commit()
-                db.refresh(new_patient)
-                patient_id = new_patient.id
-        
-        # Create report record
+        # Create report record; extraction, patient matching and summarisation run in the background
         report = MedicalReport(
             patient_id=patient_id,
             report_type=report_type,
@@ -1310,25 +1290,42 @@ async def upload_medical_report(
             file_path=file_path,
             file_type=file_ext,
             file_hash=file_hash,
-            extracted_text=extracted_text,
+            extracted_text="",
             ai_summary="",
             ai_key_findings=[],
             parsed_data={},
-            ai_abnormal_values=[]
+            ai_abnormal_values=[],
+            processing_status="processing"
         )
         
         db.add(report)
         db.commit()
         db.refresh(report)
         
+        job = report_job_queue.enqueue(db, report.id)
+        
+        # Patient name is only known up front if the uploader picked the patient
+        patient_name = None
+        if patient_id:
+            patient = db.query(User).filter(User.id == patient_id).first()
+            if patient:
+                patient_name = patient.full_name or patient.username
+        
         return {
             "report_id": report.id,
-            "message": "Report uploaded successfully",
-            "patient_name": patient_name_from_report or "Unknown",
-            "patient_id": patient_id
+            "message": "Report uploaded successfully and is being processed",
+            "patient_name": patient_name,
+            "patient_id": patient_id,
+            "processing_status": report.processing_status,
+            "job_id": job.id,
+            "status_url": f"/api/doctor/reports/{report.id}/status"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
+        if temp_path:
+            UploadStorage.discard(temp_path)
         logger.error(f"Error uploading report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1382,13 +1379,24 @@ async def confirm_duplicate_upload(
             ai_summary=existing_report.ai_summary or "",
             ai_key_findings=existing_report.ai_key_findings or [],
             parsed_data=existing_report.parsed_data or {},
-            ai_abnormal_values=existing_report.ai_abnormal_values or []
+            parser_version=existing_report.parser_version,
+            ai_abnormal_values=existing_report.ai_abnormal_values or [],
+            summary_version=existing_report.summary_version,
+            processing_status="completed" if existing_report.processing_status in (None, "completed") else "processing"
         )
+        # Copy the stored parse with its lab_results rows (stale ones are re-parsed on read)
+        if ParsedReportStore.is_current(existing_report):
+            ParsedReportStore.stamp(new_report, existing_report.parsed_data)
         
         db.add(new_report)
+        BlobStore.add_reference(db, new_report.file_path)
         db.commit()
         db.refresh(new_report)
         
+        # Original hasn't finished (or failed) processing, so process the copy on its own
+        if new_report.processing_status == "processing":
+            report_job_queue.enqueue(db, new_report.id)
+        
         # Get patient name
         patient_name = "Unknown"
         if new_report.patient_id:
@@ -1400,9 +1408,12 @@ async def confirm_duplicate_upload(
             "report_id": new_report.id,
             "message": "Report uploaded successfully as updated version",
             "patient_name": patient_name,
-            "patient_id": new_report.patient_id
+            "patient_id": new_report.patient_id,
+            "processing_status": new_report.processing_status
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error confirming duplicate upload: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1430,73 +1441,40 @@ async def upload_multiple_medical_reports(
                     errors.append(f"{file.filename}: Invalid file type")
                     continue
                 
-                # Save file
-                upload_dir = "uploads/reports"
-                os.makedirs(upload_dir, exist_ok=True)
-                
-                file_path = os.path.join(upload_dir, f"{datetime.now().timestamp()}_{file.filename}")
-                
-                with open(file_path, "wb") as f:
-                    content = await file.read()
-                    f.write(content)
+                # Stream file to disk in chunks, then store it content-addressed
+                temp_path, file_hash, file_size = await UploadStorage.stream_to_temp(file)
+                file_path = BlobStore.store(db, temp_path, file_hash, file_size, file_ext)
                 
-                # Extract text from file
-                extracted_text = ""
-                if file_ext == ".pdf":
-                    extracted_text = PDFProcessor.extract_text_from_pdf(file_path) or ""
-                elif file_ext in [".jpg", ".jpeg", ".png"]:
-                    extracted_text = PDFProcessor.extract_text_from_image(file_path) or ""
-                
-                # Extract patient name from text
-                patient_name_from_report = _extract_patient_name_from_text(extracted_text)
-                
-                # Find or create patient
-                patient_id = None
-                if patient_name_from_report:
-                    existing_patient = db.query(User).filter(
-                        (User.full_name.ilike(f"%{patient_name_from_report}%")) |
-                        (User.username.ilike(f"%{patient_name_from_report}%"))
-                    ).first()
-                    
-                    if existing_patient:
-                        patient_id = existing_patient.id
-                    else:
-                        new_patient = User(
-                            full_name=patient_name_from_report,
-                            username=patient_name_from_report.lower().replace(" ", "_"),
-                            email=f"{patient_name_from_report.lower().replace(' ', '_')}@example.com",
-                            hashed_password="",
-                            role="patient"
-                        )
-                        db.add(new_patient)
-                        db.commit()
-                        db.refresh(new_patient)
-                        patient_id = new_patient.id
-                
-                # Create report record
+                # Create report record; processing happens in the background job queue
                 report = MedicalReport(
-                    patient_id=patient_id,
+                    patient_id=None,
                     report_type="lab",
                     report_name=file.filename,
                     report_date=datetime.now(),
                     file_path=file_path,
                     file_type=file_ext,
-                    extracted_text=extracted_text,
+                    file_hash=file_hash,
+                    extracted_text="",
                     ai_summary="",
                     ai_key_findings=[],
                     parsed_data={},
-                    ai_abnormal_values=[]
+                    ai_abnormal_values=[],
+                    processing_status="processing"
                 )
                 
                 db.add(report)
                 db.commit()
                 db.refresh(report)
                 
+                job = report_job_queue.enqueue(db, report.id)
+                
                 uploaded_reports.append({
                     "report_id": report.id,
                     "filename": file.filename,
-                    "patient_name": patient_name_from_report or "Unknown",
-                    "patient_id": patient_id
+                    "patient_name": None,
+                    "patient_id": None,
+                    "processing_status": report.processing_status,
+                    "job_id": job.id
                 })
             except Exception as e:
                 logger.error(f"Error uploading {file.filename}: {e}")
@@ -1513,32 +1491,37 @@ async def upload_multiple_medical_reports(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _extract_patient_name_from_text(text: str) -> Optional[str]:
-    """Extract patient name from medical report text"""
-    if not text:
-        return None
+@router.get("/reports/{report_id}/status")
+async def get_report_processing_status(
+    report_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get background processing status for an uploaded report
+    """
+    report = db.query(MedicalReport).filter(MedicalReport.id == report_id).first()
     
-    # Common patterns for patient names in medical reports
-    name_patterns = [
-        r'(?:Name|Patient\s+Name|Patient)[:\s]+(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][a-zA-Z\s]+)',
-        r'(?:Name|Patient\s+Name|Patient)[:\s]+([A-Z][a-zA-Z\s]+)',
-        r'Name\s*:\s*(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?)\s+([A-Z][a-zA-Z\s]+)',
-        r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+Age\s*:',
-        r'Mr\.?\s+([A-Z][A-Z\s]+?)(?:\s+Age|\s+Gender|\s+Lab)',
-    ]
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
     
-    for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            # Clean up name (remove extra words)
-            name = re.sub(r'\s+(Age|Gender|Lab|Years|Year|Date).*$', '', name, flags=re.IGNORECASE).strip()
-            # Capitalize properly
-            name_parts = name.split()
-            formatted_name = ' '.join([part.capitalize() if part.isupper() else part.title() for part in name_parts])
-            return formatted_name
+    job = ReportJobQueue.get_latest_job(db, report_id)
     
-    return None
+    return {
+        "report_id": report.id,
+        "processing_status": report.processing_status or "completed",
+        "patient_id": report.patient_id,
+        "job": {
+            "id": job.id,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "error": job.error,
+            "attempts": job.attempts,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        } if job else None
+    }
 
 
 @router.get("/reports")
@@ -1706,7 +1689,7 @@ async def get_report(
         if patient and patient.full_name:
             patient_name = patient.full_name
         elif report.extracted_text:
-            extracted_name = _extract_patient_name_from_text(report.extracted_text)
+            extracted_name = ParsedReportStore.patient_name(db, report)
             if extracted_name:
                 patient_name = extracted_name
     
@@ -1719,83 +1702,11 @@ async def get_report(
         "report_date": report.report_date.strftime('%Y-%m-%d') if report.report_date else 'N/A',
         "extracted_text": report.extracted_text or "",
         "ai_summary": report.ai_summary or "",
+        "parsed_data": ParsedReportStore.ensure_parsed(db, report),
         "file_path": report.file_path
     }
 
 
-@router.get("/reports/{report_id}/file")
-async def get_report_file(
-    report_id: int,
-    db: Session = Depends(get_db)
-):
-    """
-    Get the original medical report file
-    Opens the file in a new browser tab
-    """
-    report = db.query(MedicalReport).filter(MedicalReport.id == report_id).first()
-    
-    if not report:
-        raise HTTPException(status_code=404, detail="Report not found")
-    
-    if not report.file_path:
-        raise HTTPException(status_code=404, detail="Report file path not found")
-    
-    # Fix path separator issues and make path relative to project root
-    file_path = report.file_path.replace('\\', '/').replace('//', '/')
-    
-    # Since server runs from backend/, we need to go up one level to find uploads/
-    if not file_path.startswith('/') and not file_path.startswith('..'):
-        file_path = os.path.join('..', file_path)
-    
-    # Normalize the path for the current OS
-    file_path = os.path.normpath(file_path)
-    
-    if not os.path.exists(file_path):
-        # Try alternative path constructions
-        alt_paths = [
-            report.file_path,  # Original path
-            report.file_path.replace('\\', '/'),  # Forward slashes
-            os.path.join('..', report.file_path.replace('\\', '/')),  # Relative to backend
-            report.file_path.replace('\\', os.sep)  # OS-specific separators
-        ]
-        
-        existing_path = None
-        for alt_path in alt_paths:
-            if os.path.exists(alt_path):
-                existing_path = alt_path
-                break
-        
-        if existing_path:
-            file_path = existing_path
-        else:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Report file not found. Tried paths: {', '.join(alt_paths)}"
-            )
-    
-    # Determine media type based on file extension
-    file_ext = os.path.splitext(file_path)[1].lower()
-    media_types = {
-        '.pdf': 'application/pdf',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png'
-    }
-    media_type = media_types.get(file_ext, 'application/octet-stream')
-    
-    # Get the original filename for display
-    filename = report.report_name or f"report_{report_id}{file_ext}"
-    if not filename.endswith(file_ext):
-        filename += file_ext
-    
-    return FileResponse(
-        path=file_path,
-        media_type=media_type,
-        filename=filename,
-        content_disposition_type="inline"  # Open in browser instead of downloading
-    )
-
-
 @router.delete("/reports/cleanup")
 async def cleanup_invalid_reports(
     db: Session = Depends(get_db)
@@ -1824,7 +1735,7 @@ async def cleanup_invalid_reports(
                     should_delete = True
                 # Check if extracted text has no patient name
                 elif report.extracted_text:
-                    extracted_name = _extract_patient_name_from_text(report.extracted_text)
+                    extracted_name = ParsedReportStore.patient_name(db, report)
                     if not extracted_name and not patient.full_name:
                         should_delete = True
             
@@ -1837,18 +1748,16 @@ async def cleanup_invalid_reports(
         
         # Delete reports
         deleted_count = 0
+        released_files = []
         for report in reports_to_delete:
-            # Delete file if exists
-            if report.file_path and os.path.exists(report.file_path):
-                try:
-                    os.remove(report.file_path)
-                except Exception as e:
-                    logger.warning(f"Could not delete file {report.file_path}: {e}")
+            # Release the stored file (removed once no other report uses it)
+            released_files.append(BlobStore.release(db, report))
             
             db.delete(report)
             deleted_count += 1
         
         db.commit()
+        BlobStore.delete_files(db, released_files)
         
         return {
             "message": f"Successfully deleted {deleted_count} invalid report(s)",
@@ -1900,31 +1809,21 @@ async def remove_duplicate_reports(
         
         # Delete duplicate reports
         deleted_count = 0
+        released_files = []
         deleted_hashes = set()
         
         for report in duplicates_to_remove:
-            # Only delete the file if it's not shared with other reports
-            # (Since multiple reports can share the same file_path)
+            # Drop this report's reference; for content-addressed files this is metadata-only
+            # since the kept report still points at the same blob
             file_hash = report.file_hash
-            if file_hash not in deleted_hashes:
-                # Check if any other report uses this file_path
-                other_reports_with_same_file = db.query(MedicalReport).filter(
-                    MedicalReport.file_path == report.file_path,
-                    MedicalReport.id != report.id
-                ).count()
-                
-                # Only delete file if no other reports use it
-                if other_reports_with_same_file == 0 and report.file_path and os.path.exists(report.file_path):
-                    try:
-                        os.remove(report.file_path)
-                    except Exception as e:
-                        logger.warning(f"Could not delete file {report.file_path}: {e}")
+            released_files.append(BlobStore.release(db, report))
             
             db.delete(report)
             deleted_count += 1
             deleted_hashes.add(file_hash)
         
         db.commit()
+        BlobStore.delete_files(db, released_files)
         
         return {
             "message": f"Successfully removed {deleted_count} duplicate report(s)",
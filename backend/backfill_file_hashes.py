@@ -0,0 +1,117 @@
+"""
+Backfill file_hash for medical reports uploaded before duplicate detection existed
+Run this script once after migrate_add_file_hash.py (also run as a background task on app startup)
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from database import SessionLocal
+from models import MedicalReport
+from config import get_settings
+from utils.upload_storage import UploadStorage
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _resolve_report_path(file_path: str) -> Optional[str]:
+    """Find a stored report file, tolerating Windows separators and a different working directory"""
+    if not file_path:
+        return None
+    normalized = file_path.replace("\\", os.sep)
+    for candidate in (file_path, normalized, os.path.join(PROJECT_ROOT, normalized)):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _hash_report_file(file_path: str) -> Optional[str]:
+    resolved = _resolve_report_path(file_path)
+    if not resolved:
+        return None
+    try:
+        return UploadStorage.hash_file(resolved)
+    except Exception as e:
+        logger.warning(f"Could not hash {file_path}: {e}")
+        return None
+
+
+def backfill_file_hashes(batch_size: Optional[int] = None, workers: Optional[int] = None) -> dict:
+    """Hash legacy report files in parallel and store file_hash, committing once per batch"""
+    batch_size = batch_size or settings.FILE_HASH_BACKFILL_BATCH_SIZE
+    workers = workers or settings.FILE_HASH_BACKFILL_WORKERS
+    missing_hash = (MedicalReport.file_hash.is_(None)) | (MedicalReport.file_hash == "")
+
+    db = SessionLocal()
+    try:
+        total = db.query(MedicalReport.id).filter(missing_hash).count()
+        if total == 0:
+            logger.info("[OK] All medical reports already have a file_hash")
+            return {"total": 0, "hashed": 0, "missing_files": 0}
+
+        logger.info(f"Backfilling file_hash for {total} medical reports...")
+        hashed = 0
+        missing_files = 0
+        processed = 0
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Keyset pagination so reports whose files are missing aren't rescanned
+                batch = db.query(MedicalReport.id, MedicalReport.file_path).filter(
+                    missing_hash,
+                    MedicalReport.id > last_id
+                ).order_by(MedicalReport.id).limit(batch_size).all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                hashes = list(executor.map(_hash_report_file, [row.file_path for row in batch]))
+                updates = [
+                    {"id": row.id, "file_hash": file_hash}
+                    for row, file_hash in zip(batch, hashes) if file_hash
+                ]
+                if updates:
+                    db.bulk_update_mappings(MedicalReport, updates)
+                    db.commit()
+
+                hashed += len(updates)
+                missing_files += len(batch) - len(updates)
+                processed += len(batch)
+                logger.info(f"Backfill progress: {processed}/{total} reports ({hashed} hashed, {missing_files} missing files)")
+
+        logger.info(f"[OK] Backfilled file_hash for {hashed} of {total} medical reports")
+        return {"total": total, "hashed": hashed, "missing_files": missing_files}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[ERROR] Error backfilling file hashes: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill file_hash for legacy medical reports")
+    parser.add_argument("--batch-size", type=int, default=None, help="Reports hashed and committed per batch")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel hashing threads")
+    args = parser.parse_args()
+
+    print("Running backfill: Hash legacy medical report files...")
+    try:
+        result = backfill_file_hashes(batch_size=args.batch_size, workers=args.workers)
+        print(f"[OK] Backfill completed: {result['hashed']} hashed, {result['missing_files']} files not found")
+    except Exception:
+        print("[ERROR] Backfill failed. Please check the error messages above.")
+        sys.exit(1)
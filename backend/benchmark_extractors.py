@@ -0,0 +1,155 @@
+"""
+Benchmark the report text extractors against a golden corpus
+Runs each extractor over the stored text reports (UPLOAD_DIR/*.txt) plus synthetic
+reports of growing size, prints reports/sec, p50/p99 latency and peak memory per
+extractor, and checks every output against the golden snapshot so a speed-up
+cannot silently change results. Use --update-golden after an intended change.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import glob
+import json
+import time
+import hashlib
+import tracemalloc
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+from config import get_settings
+from services.medical_report_rag import MedicalReportRAG
+from services.report_summarizer import ReportSummarizer
+from utils.patient_matching import PatientMatcher
+from benchmark_report_parser import build_report
+
+logging.basicConfig(level=logging.WARNING)
+settings = get_settings()
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "benchmark_golden.json")
+SYNTHETIC_SCALES = (1, 4, 16, 64)
+
+
+def load_corpus(corpus_dir: str) -> List[Tuple[str, str]]:
+    """(name, text) for every text report in corpus_dir plus the synthetic reports"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.txt"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            corpus.append((os.path.basename(path), f.read()))
+    for scale in SYNTHETIC_SCALES:
+        corpus.append((f"synthetic_x{scale}", build_report(scale)))
+    return corpus
+
+
+def build_extractors() -> Dict[str, Callable[[str], Any]]:
+    summarizer = ReportSummarizer()
+
+    def summarizer_categories(text: str) -> Any:
+        lab_values = summarizer._extract_lab_values(text, text.lower())
+        return summarizer._parse_into_categories(text, text.lower(), lab_values, [], [])
+
+    extractors = {
+        f"rag_{engine}": MedicalReportRAG(engine=engine)._extract_with_knowledge_base
+        for engine in MedicalReportRAG.ENGINES
+    }
+    extractors["summarizer_lab_values"] = lambda text: summarizer._extract_lab_values(text, text.lower())
+    extractors["summarizer_categories"] = summarizer_categories
+    extractors["patient_name"] = PatientMatcher.extract_patient_name
+    # Every summarize_report stage over one tokenised report (timings dropped)
+    extractors["report_pipeline"] = lambda text: summarizer.get_pipeline().run(text, report_type="lab")[0]
+    return extractors
+
+
+def digest(output: Any) -> str:
+    """Stable fingerprint of an extractor output"""
+    encoded = json.dumps(output, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_extractor(extract: Callable[[str], Any], corpus: List[Tuple[str, str]], repeat: int) -> Dict[str, Any]:
+    """Timings over repeat passes, then one traced pass for peak memory and outputs"""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            report_start = time.perf_counter()
+            extract(text)
+            latencies.append(time.perf_counter() - report_start)
+    elapsed = time.perf_counter() - start
+
+    # Traced separately since tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    outputs = {name: digest(extract(text)) for name, text in corpus}
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "reports_per_sec": len(latencies) / elapsed if elapsed else float("inf"),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_kb": peak / 1024,
+        "outputs": outputs,
+    }
+
+
+def compare_golden(golden: Dict[str, Dict[str, str]], name: str, outputs: Dict[str, str]) -> List[str]:
+    """Corpus entries whose output differs from the golden snapshot"""
+    expected = golden.get(name, {})
+    return [doc for doc, value in outputs.items() if doc in expected and expected[doc] != value]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark report extractors against golden outputs")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          settings.UPLOAD_DIR),
+                        help="Directory of .txt reports")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the corpus")
+    parser.add_argument("--only", default=None, help="Comma-separated extractor names")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden snapshot file")
+    parser.add_argument("--update-golden", action="store_true", help="Rewrite the golden snapshot")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    extractors = build_extractors()
+    if args.only:
+        extractors = {name: extractors[name] for name in args.only.split(",")}
+
+    golden = {}
+    if os.path.exists(args.golden):
+        with open(args.golden, encoding="utf-8") as f:
+            golden = json.load(f)
+
+    print(f"Corpus: {len(corpus)} reports ({sum(len(text) for _, text in corpus)} chars)")
+    print(f"{'extractor':<24}{'reports/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'peak KB':>10}  golden")
+    failures = 0
+    for name, extract in extractors.items():
+        result = run_extractor(extract, corpus, args.repeat)
+        if args.update_golden:
+            golden[name] = result["outputs"]
+            status = "updated"
+        elif name not in golden:
+            status = "missing"
+        else:
+            changed = compare_golden(golden, name, result["outputs"])
+            failures += len(changed)
+            status = "ok" if not changed else f"CHANGED: {', '.join(changed[:5])}" + (" ..." if len(changed) > 5 else "")
+        print(f"{name:<24}{result['reports_per_sec']:>11.1f}{result['p50_ms']:>9.3f}"
+              f"{result['p99_ms']:>9.3f}{result['peak_kb']:>10.1f}  {status}")
+
+    if args.update_golden:
+        with open(args.golden, "w", encoding="utf-8") as f:
+            json.dump(golden, f, indent=1, sort_keys=True)
+        print(f"[OK] Golden snapshot written to {args.golden}")
+    elif failures:
+        print(f"[ERROR] {failures} outputs differ from the golden snapshot")
+        sys.exit(1)
+    else:
+        print("[OK] All outputs match the golden snapshot")
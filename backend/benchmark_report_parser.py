@@ -0,0 +1,108 @@
+"""
+Benchmark the lab report parser engines
+Times the per-alias regex engine against the single-pass scanner while growing
+(a) the length of the report and (b) the size of the knowledge base.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import copy
+import time
+import logging
+from typing import Any, Dict, List
+from services.medical_report_rag import MedicalReportRAG
+
+logging.basicConfig(level=logging.WARNING)
+
+REPORT_ROWS = [
+    "Hemoglobin: 13.8 g/dL (13.0 - 17.0)",
+    "PCV: 42.1 % (40 - 50)",
+    "RBC Count: 4.9 mill/mm³ (4.5 - 5.5)",
+    "MCV: 86 fL (83 - 101)",
+    "Total Leukocyte Count: 7,600 /cmm (4,000 - 11,000)",
+    "Neutrophils: 62 %",
+    "Lymphocytes: 30 %",
+    "Platelet Count: 2.4 lakh/mm³ (1.5 - 4.5)",
+    "ESR: 12 mm/hr (0 - 20)",
+    "SGPT: 31 U/L (<41)",
+    "SGOT: 28 U/L (10 - 40)",
+    "CRP: 3.1 mg/L (0 - 5)",
+]
+FILLER_ROWS = [
+    "Total Cholesterol: 182 mg/dL (<200)",
+    "Fasting Blood Sugar: 92 mg/dL (70 - 100)",
+    "Remarks: correlate clinically.",
+]
+
+
+def build_report(scale: int) -> str:
+    """Report header and lab rows followed by scale-1 blocks of unrelated panels"""
+    lines = ["Name : Mr. TEST PATIENT Age : 40 Years Gender : Male", "Lab No. : BENCH1", "HEMOGRAM"]
+    lines += REPORT_ROWS
+    for block in range(scale - 1):
+        lines.append(f"ADDITIONAL PANEL {block + 1}")
+        lines += FILLER_ROWS * 4
+    return "\n".join(lines)
+
+
+def build_knowledge(scale: int) -> Dict[str, Any]:
+    """Default knowledge base plus (scale-1) x its CBC analytes under synthetic names"""
+    knowledge = copy.deepcopy(MedicalReportRAG.MEDICAL_KNOWLEDGE)
+    base_metrics = MedicalReportRAG.MEDICAL_KNOWLEDGE["cbc_patterns"]["rbc_metrics"]
+    for copy_index in range(1, scale):
+        for test_info in base_metrics:
+            knowledge["cbc_patterns"]["rbc_metrics"].append({
+                **test_info,
+                "name": f"{test_info['name']} X{copy_index}",
+                "aliases": [f"{alias} X{copy_index}" for alias in test_info["aliases"]],
+            })
+    return knowledge
+
+
+def time_parse(parser: MedicalReportRAG, text: str, repeat: int) -> float:
+    """Best-of-3 mean milliseconds per parse"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parser._extract_with_knowledge_base(text)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def run_benchmark(scales: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    parsers = {engine: MedicalReportRAG(engine=engine) for engine in MedicalReportRAG.ENGINES}
+    for scale in scales:
+        text = build_report(scale)
+        row = {"axis": "report length", "scale": scale, "chars": len(text)}
+        for engine, parser in parsers.items():
+            row[engine] = time_parse(parser, text, repeat)
+        results.append(row)
+
+    text = build_report(1)
+    for scale in scales:
+        knowledge = build_knowledge(scale)
+        row = {"axis": "knowledge base", "scale": scale, "chars": len(text)}
+        for engine in MedicalReportRAG.ENGINES:
+            row[engine] = time_parse(MedicalReportRAG(knowledge=knowledge, engine=engine), text, repeat)
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark report parser engines")
+    parser.add_argument("--scales", default="1,2,4,8,16", help="Comma-separated growth factors")
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per timing")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    print(f"{'axis':<16}{'scale':>6}{'chars':>9}{'regex ms':>11}{'scanner ms':>12}")
+    for result in run_benchmark(scales, args.repeat):
+        print(f"{result['axis']:<16}{result['scale']:>6}{result['chars']:>9}"
+              f"{result['regex']:>11.3f}{result['scanner']:>12.3f}")
@@ -0,0 +1,217 @@
+"""
+Bulk import of an existing report archive (e.g. when onboarding a clinic)
+Walks a directory, skips files already in the database (by file_hash), extracts text
+in parallel, links patients in batches and inserts reports one transaction per batch.
+Progress is checkpointed so an interrupted run resumes where it stopped.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional
+from database import SessionLocal, engine, Base
+from models import MedicalReport
+from config import get_settings
+from services.parsed_report_store import ParsedReportStore
+from utils.blob_store import BlobStore
+from utils.extraction_pool import ExtractionPool, extract_pages
+from utils.patient_matching import PatientMatcher
+from utils.pdf_processor import PDFProcessor
+from utils.upload_storage import UploadStorage
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+IMPORT_EXTENSIONS = [".pdf", ".jpg", ".jpeg", ".png"]
+CHECKPOINT_FILENAME = ".bulk_import_checkpoint.json"
+
+
+def iter_report_files(directory: str) -> Iterator[str]:
+    """Walk directory in a stable (sorted) order so checkpoints stay valid between runs"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for filename in sorted(files):
+            if filename.startswith("."):
+                continue
+            if os.path.splitext(filename)[1].lower() in IMPORT_EXTENSIONS:
+                yield os.path.join(root, filename)
+
+
+def _walk_key(relative_path: str) -> tuple:
+    """Sort key matching iter_report_files order: at each level files come before subdirectories"""
+    parts = relative_path.split(os.sep)
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+
+def load_checkpoint(checkpoint_path: str) -> dict:
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r") as f:
+            return json.load(f)
+    return {"last_path": None, "processed": 0, "imported": 0, "duplicates": 0}
+
+
+def save_checkpoint(checkpoint_path: str, checkpoint: dict):
+    # Write-then-rename so a crash never leaves a truncated checkpoint
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, checkpoint_path)
+
+
+def _store_copy(db, source_path: str, file_hash: str, file_ext: str) -> str:
+    """Copy an archive file into the blob store, leaving the original in place"""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".import_", suffix=".part", dir=settings.UPLOAD_DIR)
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, temp_path)
+        return BlobStore.store(db, temp_path, file_hash, os.path.getsize(source_path), file_ext)
+    except Exception:
+        UploadStorage.discard(temp_path)
+        raise
+
+
+def import_batch(db, paths: List[str], hash_executor: ThreadPoolExecutor, report_type: str) -> dict:
+    """Import one batch of files in a single transaction"""
+    hashes = list(hash_executor.map(UploadStorage.hash_file, paths))
+
+    # Deduplicate against the database and within the batch
+    existing_hashes = {
+        row.file_hash for row in db.query(MedicalReport.file_hash).filter(
+            MedicalReport.file_hash.in_(set(hashes))
+        ).all()
+    }
+    new_files = []
+    seen = set(existing_hashes)
+    for path, file_hash in zip(paths, hashes):
+        if file_hash in seen:
+            continue
+        seen.add(file_hash)
+        new_files.append((path, file_hash, os.path.splitext(path)[1].lower()))
+
+    if not new_files:
+        return {"imported": 0, "duplicates": len(paths)}
+
+    # Extract text for the new files across the process pool
+    executor = ExtractionPool.get_executor()
+    page_lists = executor.map(extract_pages, [f[0] for f in new_files], [f[2] for f in new_files])
+    texts = [PDFProcessor.join_pages(pages) for pages in page_lists]
+
+    # Resolve all patients named in this batch at once
+    patient_names = [PatientMatcher.extract_patient_name(text) for text in texts]
+    patient_ids = PatientMatcher.resolve_patients(db, patient_names)
+
+    for (path, file_hash, file_ext), text, patient_name in zip(new_files, texts, patient_names):
+        report = MedicalReport(
+            patient_id=patient_ids.get(patient_name),
+            report_type=report_type,
+            report_name=os.path.basename(path),
+            report_date=datetime.fromtimestamp(os.path.getmtime(path)),
+            file_path=_store_copy(db, path, file_hash, file_ext),
+            file_type=file_ext,
+            file_hash=file_hash,
+            extracted_text=text,
+            ai_summary="",
+            ai_key_findings=[],
+            parsed_data={},
+            ai_abnormal_values=[],
+            processing_status="completed"
+        )
+        ParsedReportStore.stamp(report, ParsedReportStore.parse_text(text))
+        db.add(report)
+
+    db.commit()
+    return {"imported": len(new_files), "duplicates": len(paths) - len(new_files)}
+
+
+def bulk_import(directory: str, batch_size: int = 200, hash_workers: int = 4, report_type: str = "lab",
+                checkpoint_path: Optional[str] = None, reset: bool = False) -> dict:
+    """Import every report file under directory, resuming from the checkpoint if one exists"""
+    directory = os.path.abspath(directory)
+    checkpoint_path = checkpoint_path or os.path.join(directory, CHECKPOINT_FILENAME)
+    checkpoint = {"last_path": None, "processed": 0, "imported": 0, "duplicates": 0} if reset else load_checkpoint(checkpoint_path)
+
+    if checkpoint["last_path"]:
+        logger.info(f"Resuming after {checkpoint['last_path']} ({checkpoint['processed']} files already processed)")
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=hash_workers) as hash_executor:
+            files = iter_report_files(directory)
+            if checkpoint["last_path"]:
+                # Skip everything up to and including the last committed file
+                last_key = _walk_key(checkpoint["last_path"])
+                files = (path for path in files if _walk_key(os.path.relpath(path, directory)) > last_key)
+
+            batch = []
+            for path in files:
+                batch.append(path)
+                if len(batch) >= batch_size:
+                    _run_batch(db, batch, hash_executor, report_type, directory, checkpoint, checkpoint_path)
+                    batch = []
+            if batch:
+                _run_batch(db, batch, hash_executor, report_type, directory, checkpoint, checkpoint_path)
+
+        logger.info(f"[OK] Import finished: {checkpoint['imported']} imported, {checkpoint['duplicates']} duplicates skipped")
+        return checkpoint
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[ERROR] Bulk import stopped: {e}")
+        raise
+    finally:
+        db.close()
+        ExtractionPool.shutdown()
+
+
+def _run_batch(db, batch, hash_executor, report_type, directory, checkpoint, checkpoint_path):
+    result = import_batch(db, batch, hash_executor, report_type)
+    checkpoint["last_path"] = os.path.relpath(batch[-1], directory)
+    checkpoint["processed"] += len(batch)
+    checkpoint["imported"] += result["imported"]
+    checkpoint["duplicates"] += result["duplicates"]
+    save_checkpoint(checkpoint_path, checkpoint)
+    logger.info(f"Import progress: {checkpoint['processed']} files processed "
+                f"({checkpoint['imported']} imported, {checkpoint['duplicates']} duplicates)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import a directory of medical reports")
+    parser.add_argument("directory", help="Directory to import (searched recursively)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Files per transaction")
+    parser.add_argument("--hash-workers", type=int, default=4, help="Parallel hashing threads")
+    parser.add_argument("--report-type", default="lab", help="report_type for imported reports")
+    parser.add_argument("--checkpoint", default=None, help=f"Checkpoint file (default: <directory>/{CHECKPOINT_FILENAME})")
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint and start over")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"[ERROR] Not a directory: {args.directory}")
+        sys.exit(1)
+
+    print(f"Running bulk import of {args.directory}...")
+    try:
+        result = bulk_import(
+            args.directory,
+            batch_size=args.batch_size,
+            hash_workers=args.hash_workers,
+            report_type=args.report_type,
+            checkpoint_path=args.checkpoint,
+            reset=args.reset
+        )
+        print(f"[OK] Bulk import completed: {result['imported']} imported, {result['duplicates']} duplicates skipped")
+    except Exception:
+        print("[ERROR] Bulk import failed. Rerun the same command to resume from the last checkpoint.")
+        sys.exit(1)
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pathlib import Path
+from typing import Dict
 import os
 
 
@@ -45,6 +46,73 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 10 * 1024 * 1024
     ALLOWED_EXTENSIONS: list = [".pdf", ".jpg", ".jpeg", ".png", ".docx"]
     
+    # Report uploads are streamed to disk in fixed-size chunks
+    UPLOAD_DIR: str = "uploads/reports"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    
+    # Legacy reports without file_hash are hashed in the background at startup
+    FILE_HASH_BACKFILL_ON_STARTUP: bool = True
+    FILE_HASH_BACKFILL_BATCH_SIZE: int = 100
+    FILE_HASH_BACKFILL_WORKERS: int = 4
+    
+    # Background report processing (extraction, parsing, summarisation)
+    REPORT_JOB_WORKERS: int = os.cpu_count() or 2
+    REPORT_JOB_MAX_ATTEMPTS: int = 3
+    REPORT_JOB_RETRY_DELAY_SECONDS: float = 5.0  # Wait before retrying a job that raised
+    
+    # Text extraction/OCR process pool; workers are recycled to bound pdfplumber/PIL leaks
+    EXTRACTION_WORKERS: int = os.cpu_count() or 2
+    EXTRACTION_MAX_TASKS_PER_CHILD: int = 50
+    # PDFs with at least this many pages are extracted in parallel page chunks
+    PDF_PARALLEL_MIN_PAGES: int = 8
+    PDF_PAGES_PER_CHUNK: int = 4
+    
+    # OCR for image uploads and PDF pages without a text layer
+    OCR_ENABLED: bool = True
+    OCR_MIN_TEXT_CHARS: int = 20  # Pages with less extractable text than this are OCR'd
+    OCR_RESOLUTION: int = 200  # DPI used to rasterise PDF pages
+    OCR_GRAYSCALE: bool = True
+    OCR_MAX_DIMENSION: int = 2500  # Longest side in pixels; larger images are downscaled
+    OCR_BINARIZE: bool = False  # Tesseract binarises internally; enable for noisy scans
+    OCR_BINARIZE_THRESHOLD: int = 150
+    
+    # Persistent extraction cache keyed by (file hash, extractor version); LRU-evicted above this size
+    EXTRACTION_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    
+    # Persistent cache of LLM responses (query understanding) keyed by normalised input, mode,
+    # model and system prompt; entries expire after the TTL and are LRU-evicted above the limit
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_MEMORY_ENTRIES: int = 1024  # Most recently used entries also held in process memory
+    
+    # Shared OpenAI gateway (services/llm_gateway.py): request timeout, retries, pooled connections
+    # per event loop, concurrent calls per model across the whole process (app and background
+    # workers together), and how long a call may queue for a free slot
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_DEFAULT_CONCURRENCY: int = 8
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {"gpt-4o": 4}
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    
+    # Chat intent detection: the local rules' answer is used when its confidence is at least this;
+    # less certain queries go to OpenAI (1.0 sends everything but the pre-checks to OpenAI)
+    QUERY_RULES_CONFIDENCE_THRESHOLD: float = 0.8
+    
+    # Lab report parsing: "regex" (per-alias patterns) or "scanner" (single pass over report rows).
+    # The engines don't produce identical output yet, and changing the engine re-parses every
+    # stored report at startup, so the scanner is opt-in
+    REPORT_PARSER_ENGINE: str = "regex"
+    # Reports parsed by an older parser version are re-parsed in the background at startup
+    REPORT_REPARSE_ON_STARTUP: bool = True
+    REPORT_REPARSE_BATCH_SIZE: int = 100
+    
+    # Bulk re-summarisation of reports with missing or stale AI summaries (admin /jobs endpoints)
+    RESUMMARIZE_BATCH_SIZE: int = 50
+    RESUMMARIZE_WORKERS: int = 2
+    RESUMMARIZE_THROTTLE_SECONDS: float = 0.0
+    
     ABDM_BASE_URL: str = "https://healthidsbx.abdm.gov.in"
     ABDM_CLIENT_ID: str = ""
     ABDM_CLIENT_SECRET: str = ""
@@ -2,17 +2,27 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from database import engine, Base
+from database import engine, Base, SessionLocal
 from config import get_settings
 from api import doctor_routes, patient_routes, admin_routes
 from api.auth_routes import router as auth_router
+from migrate_add_processing_status import migrate_add_processing_status
+from migrate_add_parser_version import migrate_add_parser_version
+from migrate_add_summary_version import migrate_add_summary_version
+from backfill_file_hashes import backfill_file_hashes
+from reparse_stale_reports import reparse_stale_reports
+from utils.extraction_cache import ExtractionCache
+from utils.llm_response_cache import LLMResponseCache
+from utils.extraction_pool import ExtractionPool
+from services.llm_gateway import LLMGateway
 
 settings = get_settings()
 logging.basicConfig(level=logging.INFO)
 
-Base.metadata.create_all(bind=engine)
 
 # Get absolute path to frontend build directories
 import os
@@ -27,10 +37,48 @@ print(f"FRONTEND_BUILD_PATH exists: {FRONTEND_BUILD_PATH.exists()}")
 print(f"EXPERT_BUILD_PATH: {EXPERT_BUILD_PATH}")
 print(f"EXPERT_BUILD_PATH exists: {EXPERT_BUILD_PATH.exists()}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs here rather than at import time, so processes that merely import
+    # this module (spawned extraction workers when it is __main__) don't migrate the DB
+    Base.metadata.create_all(bind=engine)
+    migrate_add_processing_status()
+    migrate_add_parser_version()
+    migrate_add_summary_version()
+    
+    # Drop cached extractions made by an older extractor version and expired LLM responses
+    db = SessionLocal()
+    try:
+        ExtractionCache.purge_stale_versions(db)
+        LLMResponseCache.purge_expired(db)
+    finally:
+        db.close()
+    
+    # Background report processing; requeues jobs interrupted by the last shutdown
+    doctor_routes.report_job_queue.start()
+    
+    # Continue re-summarisation runs interrupted by the last shutdown
+    admin_routes.summary_runner.recover()
+    
+    # Hash legacy reports off the event loop so duplicate detection can rely on file_hash
+    if settings.FILE_HASH_BACKFILL_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, backfill_file_hashes)
+    
+    # Bring parsed_data up to the current parser version; reads re-parse lazily meanwhile
+    if settings.REPORT_REPARSE_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, reparse_stale_reports)
+    yield
+    doctor_routes.report_job_queue.shutdown()
+    admin_routes.summary_runner.shutdown()
+    await LLMGateway.get().close()
+    ExtractionPool.shutdown()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    description="AI-powered Doctor Assistant Platform"
+    description="AI-powered Doctor Assistant Platform",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -930,6 +978,7 @@ else:
         }
 
 if __name__ == "__main__":
+    # Prefer serve.py: extraction workers re-import __main__, and this module builds the whole app
     import uvicorn
     print(f"\n🚀 Starting Dr. Jii Medical Assistant on http://localhost:{settings.PORT}")
     print(f"🏠 Landing Page: http://localhost:{settings.PORT}/")
@@ -0,0 +1,49 @@
+"""
+Migration script to add processing_status column to medical_reports table
+Run this script once to update the database schema (also run on app startup)
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import engine
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_add_processing_status():
+    """Add processing_status column to medical_reports table if it doesn't exist"""
+    try:
+        with engine.connect() as conn:
+            # Check if column already exists (SQLite specific)
+            result = conn.execute(text("PRAGMA table_info(medical_reports)"))
+            columns = [row[1] for row in result]
+            
+            if 'processing_status' in columns:
+                logger.info("[OK] Column 'processing_status' already exists in medical_reports table")
+                return True
+            
+            # Add the column; existing reports were processed inline so they are complete
+            logger.info("Adding 'processing_status' column to medical_reports table...")
+            conn.execute(text("ALTER TABLE medical_reports ADD COLUMN processing_status VARCHAR DEFAULT 'completed'"))
+            conn.execute(text("UPDATE medical_reports SET processing_status = 'completed' WHERE processing_status IS NULL"))
+            conn.commit()
+            logger.info("[OK] Successfully added 'processing_status' column to medical_reports table")
+            return True
+            
+    except Exception as e:
+        logger.error(f"[ERROR] Error adding processing_status column: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Running migration: Add processing_status column to medical_reports table...")
+    success = migrate_add_processing_status()
+    if success:
+        print("[OK] Migration completed successfully!")
+    else:
+        print("[ERROR] Migration failed. Please check the error messages above.")
+        sys.exit(1)
@@ -0,0 +1,53 @@
+"""
+Migration script to add summary_version column to medical_reports table
+Run this script once to update the database schema (also run on app startup)
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import engine
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_add_summary_version():
+    """Add summary_version column to medical_reports table if it doesn't exist"""
+    try:
+        with engine.connect() as conn:
+            # Check if column already exists (SQLite specific)
+            result = conn.execute(text("PRAGMA table_info(medical_reports)"))
+            columns = [row[1] for row in result]
+            
+            if 'summary_version' in columns:
+                logger.info("[OK] Column 'summary_version' already exists in medical_reports table")
+                return True
+            
+            # Add the column; summaries already stored came from the first summarizer version,
+            # reports without one stay NULL and are picked up by the re-summarisation job
+            logger.info("Adding 'summary_version' column to medical_reports table...")
+            conn.execute(text("ALTER TABLE medical_reports ADD COLUMN summary_version VARCHAR"))
+            conn.execute(text(
+                "UPDATE medical_reports SET summary_version = '1' "
+                "WHERE ai_summary IS NOT NULL AND ai_summary != ''"
+            ))
+            conn.commit()
+            logger.info("[OK] Successfully added 'summary_version' column to medical_reports table")
+            return True
+            
+    except Exception as e:
+        logger.error(f"[ERROR] Error adding summary_version column: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Running migration: Add summary_version column to medical_reports table...")
+    success = migrate_add_summary_version()
+    if success:
+        print("[OK] Migration completed successfully!")
+    else:
+        print("[ERROR] Migration failed. Please check the error messages above.")
+        sys.exit(1)
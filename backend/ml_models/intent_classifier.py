@@ -1,54 +1,68 @@
 import logging
-from typing import Dict, Any
-import re
+from typing import Dict, Any, Optional
+from utils.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 class IntentClassifier:
+    # Each intent scores one point per keyword group with a whole-word match
+    INTENT_KEYWORDS = {
+        "symptom_query": [
+            ["symptom", "symptoms", "feeling", "pain", "ache", "hurt", "sick", "ill"],
+            ["headache", "fever", "cough", "cold", "nausea"]
+        ],
+        "medication_query": [
+            ["medicine", "medication", "drug", "prescription", "dose", "dosage"],
+            ["take", "taking", "should i take"]
+        ],
+        "test_query": [
+            ["test", "tests", "lab", "blood test", "x-ray", "scan", "mri", "ct"],
+            ["need test", "require test", "get tested"]
+        ],
+        "appointment": [
+            ["appointment", "schedule", "book", "consult", "consultation"],
+            ["see doctor", "visit", "meet doctor"]
+        ],
+        "emergency": [
+            ["emergency", "urgent", "severe", "critical", "help"],
+            ["chest pain", "difficulty breathing", "unconscious"]
+        ],
+        "general_info": [
+            ["what is", "tell me about", "information", "explain"],
+            ["how to", "when to", "why"]
+        ]
+    }
+    
+    _matcher: Optional[KeywordMatcher] = None
+    
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Keyword automaton over every intent's vocabulary, shared by all instances"""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(
+                (keyword, (intent, group_index))
+                for intent, groups in cls.INTENT_KEYWORDS.items()
+                for group_index, keywords in enumerate(groups)
+                for keyword in keywords
+            )
+        return cls._matcher
+    
     def __init__(self):
-        self.intent_patterns = {
-            "symptom_query": [
-                r"\b(symptom|symptoms|feeling|pain|ache|hurt|sick|ill)\b",
-                r"\b(headache|fever|cough|cold|nausea)\b"
-            ],
-            "medication_query": [
-                r"\b(medicine|medication|drug|prescription|dose|dosage)\b",
-                r"\b(take|taking|should i take)\b"
-            ],
-            "test_query": [
-                r"\b(test|tests|lab|blood test|x-ray|scan|mri|ct)\b",
-                r"\b(need test|require test|get tested)\b"
-            ],
-            "appointment": [
-                r"\b(appointment|schedule|book|consult|consultation)\b",
-                r"\b(see doctor|visit|meet doctor)\b"
-            ],
-            "emergency": [
-                r"\b(emergency|urgent|severe|critical|help)\b",
-                r"\b(chest pain|difficulty breathing|unconscious)\b"
-            ],
-            "general_info": [
-                r"\b(what is|tell me about|information|explain)\b",
-                r"\b(how to|when to|why)\b"
-            ]
-        }
+        self.intent_keywords = self.INTENT_KEYWORDS
+        self.matcher = self.get_matcher()
     
     def classify(self, text: str) -> Dict[str, Any]:
-        text_lower = text.lower()
-        scores = {}
-        
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                if re.search(pattern, text_lower):
-                    score += 1
-            scores[intent] = score
+        matched_groups = set(self.matcher.matched_payloads(text, whole_words=True))
+        scores = {
+            intent: sum(1 for group_index in range(len(groups)) if (intent, group_index) in matched_groups)
+            for intent, groups in self.intent_keywords.items()
+        }
         
         if max(scores.values()) == 0:
             return {"intent": "general_info", "confidence": 0.5}
         
         best_intent = max(scores, key=scores.get)
-        confidence = min(scores[best_intent] / len(self.intent_patterns[best_intent]), 1.0)
+        confidence = min(scores[best_intent] / len(self.intent_keywords[best_intent]), 1.0)
         
         return {
             "intent": best_intent,
@@ -1,65 +1,77 @@
 import logging
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from utils.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 class MedicalNER:
+    SYMPTOM_KEYWORDS = [
+        "fever", "cough", "headache", "pain", "ache", "nausea",
+        "vomiting", "diarrhea", "fatigue", "weakness", "dizziness",
+        "shortness of breath", "chest pain", "abdominal pain"
+    ]
+    
+    MEDICATION_KEYWORDS = [
+        "aspirin", "ibuprofen", "paracetamol", "amoxicillin",
+        "metformin", "insulin", "lisinopril", "atorvastatin"
+    ]
+    
+    TEST_KEYWORDS = [
+        "blood test", "x-ray", "mri", "ct scan", "ultrasound",
+        "ecg", "blood pressure", "glucose test", "cholesterol"
+    ]
+    
+    SEVERITY_KEYWORDS = ["mild", "moderate", "severe", "extreme", "slight"]
+    
+    # Entity types in the order they are reported for the same start offset
+    KEYWORD_TYPES = [
+        ("symptom", SYMPTOM_KEYWORDS),
+        ("medication", MEDICATION_KEYWORDS),
+        ("test", TEST_KEYWORDS),
+        ("severity", SEVERITY_KEYWORDS),
+    ]
+    
+    _matcher: Optional[KeywordMatcher] = None
+    
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Keyword automaton over every entity vocabulary, shared by all instances"""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(
+                (keyword, (type_rank, keyword_rank, entity_type))
+                for type_rank, (entity_type, keywords) in enumerate(cls.KEYWORD_TYPES)
+                for keyword_rank, keyword in enumerate(keywords)
+            )
+        return cls._matcher
+    
     def __init__(self):
-        self.symptom_keywords = [
-            "fever", "cough", "headache", "pain", "ache", "nausea",
-            "vomiting", "diarrhea", "fatigue", "weakness", "dizziness",
-            "shortness of breath", "chest pain", "abdominal pain"
-        ]
+        self.symptom_keywords = self.SYMPTOM_KEYWORDS
+        self.medication_keywords = self.MEDICATION_KEYWORDS
+        self.test_keywords = self.TEST_KEYWORDS
+        self.severity_keywords = self.SEVERITY_KEYWORDS
         
-        self.medication_keywords = [
-            "aspirin", "ibuprofen", "paracetamol", "amoxicillin",
-            "metformin", "insulin", "lisinopril", "atorvastatin"
-        ]
-        
-        self.test_keywords = [
-            "blood test", "x-ray", "mri", "ct scan", "ultrasound",
-            "ecg", "blood pressure", "glucose test", "cholesterol"
-        ]
-        
-        self.duration_pattern = r"\b(\d+)\s*(day|days|week|weeks|month|months|year|years|hour|hours)\b"
-        self.severity_keywords = ["mild", "moderate", "severe", "extreme", "slight"]
+        self.duration_pattern = re.compile(r"\b(\d+)\s*(day|days|week|weeks|month|months|year|years|hour|hours)\b", re.IGNORECASE)
+        self.matcher = self.get_matcher()
     
     def extract_entities(self, text: str) -> List[Dict[str, Any]]:
-        entities = []
-        text_lower = text.lower()
+        # First occurrence of each keyword, found in a single pass over the text
+        first_matches = {}
+        for match in self.matcher.find_all(text):
+            first_matches.setdefault(match.payload, match)
         
-        for symptom in self.symptom_keywords:
-            if symptom in text_lower:
-                start_idx = text_lower.find(symptom)
-                entities.append({
-                    "type": "symptom",
-                    "value": symptom,
-                    "start": start_idx,
-                    "end": start_idx + len(symptom)
-                })
-        
-        for medication in self.medication_keywords:
-            if medication in text_lower:
-                start_idx = text_lower.find(medication)
-                entities.append({
-                    "type": "medication",
-                    "value": medication,
-                    "start": start_idx,
-                    "end": start_idx + len(medication)
-                })
-        
-        for test in self.test_keywords:
-            if test in text_lower:
-                start_idx = text_lower.find(test)
-                entities.append({
-                    "type": "test",
-                    "value": test,
-                    "start": start_idx,
-                    "end": start_idx + len(test)
-                })
+        keyword_entities = [
+            {
+                "type": payload[2],
+                "value": match.term,
+                "start": match.start,
+                "end": match.end
+            }
+            for payload, match in sorted(first_matches.items(), key=lambda item: item[0][:2])
+        ]
+        entities = [entity for entity in keyword_entities if entity["type"] != "severity"]
         
-        duration_matches = re.finditer(self.duration_pattern, text, re.IGNORECASE)
+        duration_matches = self.duration_pattern.finditer(text)
         for match in duration_matches:
             entities.append({
                 "type": "duration",
@@ -68,15 +80,7 @@ class MedicalNER:
                 "end": match.end()
             })
         
-        for severity in self.severity_keywords:
-            if severity in text_lower:
-                start_idx = text_lower.find(severity)
-                entities.append({
-                    "type": "severity",
-                    "value": severity,
-                    "start": start_idx,
-                    "end": start_idx + len(severity)
-                })
+        entities.extend(entity for entity in keyword_entities if entity["type"] == "severity")
         
         return sorted(entities, key=lambda x: x["start"])
     
@@ -1,35 +1,56 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from models import TriageLevel
+from utils.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 class TriageClassifier:
+    EMERGENCY_KEYWORDS = [
+        "chest pain", "difficulty breathing", "unconscious",
+        "severe bleeding", "stroke symptoms", "heart attack",
+        "suicidal", "seizure", "severe trauma"
+    ]
+    
+    URGENT_KEYWORDS = [
+        "high fever", "severe pain", "vomiting blood",
+        "unable to move", "severe headache", "confusion"
+    ]
+    
+    GP_KEYWORDS = [
+        "persistent cough", "mild fever", "rash",
+        "minor pain", "cold", "flu symptoms"
+    ]
+    
+    _matcher: Optional[KeywordMatcher] = None
+    
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Keyword automaton over all triage levels, shared by all instances"""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(
+                [(keyword, "emergency") for keyword in cls.EMERGENCY_KEYWORDS] +
+                [(keyword, "urgent") for keyword in cls.URGENT_KEYWORDS] +
+                [(keyword, "gp") for keyword in cls.GP_KEYWORDS]
+            )
+        return cls._matcher
+    
     def __init__(self):
-        self.emergency_keywords = [
-            "chest pain", "difficulty breathing", "unconscious",
-            "severe bleeding", "stroke symptoms", "heart attack",
-            "suicidal", "seizure", "severe trauma"
-        ]
-        
-        self.urgent_keywords = [
-            "high fever", "severe pain", "vomiting blood",
-            "unable to move", "severe headache", "confusion"
-        ]
-        
-        self.gp_keywords = [
-            "persistent cough", "mild fever", "rash",
-            "minor pain", "cold", "flu symptoms"
-        ]
+        self.emergency_keywords = self.EMERGENCY_KEYWORDS
+        self.urgent_keywords = self.URGENT_KEYWORDS
+        self.gp_keywords = self.GP_KEYWORDS
+        self.matcher = self.get_matcher()
     
     def classify_triage(self, symptoms: List[Dict[str, Any]], text: str = "") -> Dict[str, Any]:
         text_lower = (text or "").lower()
         symptom_texts = " ".join([s.get("name", "") + " " + s.get("description", "") for s in symptoms]).lower()
         combined_text = text_lower + " " + symptom_texts
         
-        emergency_score = sum(1 for keyword in self.emergency_keywords if keyword in combined_text)
-        urgent_score = sum(1 for keyword in self.urgent_keywords if keyword in combined_text)
-        gp_score = sum(1 for keyword in self.gp_keywords if keyword in combined_text)
+        # Distinct keywords found per level, in one pass over the text
+        matched = {(match.payload, match.term) for match in self.matcher.find_all(combined_text)}
+        emergency_score = sum(1 for level, _ in matched if level == "emergency")
+        urgent_score = sum(1 for level, _ in matched if level == "urgent")
+        gp_score = sum(1 for level, _ in matched if level == "gp")
         
         severity_check = any(s.get("severity", "").lower() == "severe" for s in symptoms)
         
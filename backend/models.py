@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey, JSON, Enum as SQLEnum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -136,12 +136,135 @@ class MedicalReport(Base):
     
     # Parsed Report Data (Structured)
     parsed_data = Column(JSON)  # Structured data: patient_info, cbc_hemogram, urine_re, infection_screens, liver_function, inflammation_marker, key_highlights
+    processing_status = Column(String, default="completed")  # processing, completed, failed
+    parser_version = Column(String)  # Parser that produced parsed_data; stale rows are re-parsed
+    summary_version = Column(String)  # Summarizer that produced the ai_* fields; stale rows are re-summarised
     
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     patient = relationship("User", back_populates="medical_reports")
     consultation = relationship("Consultation", back_populates="reports")
+    jobs = relationship("ReportJob", back_populates="report", cascade="all, delete-orphan")
+    lab_results = relationship("LabResult", back_populates="report", cascade="all, delete-orphan")
+
+
+class LabResult(Base):
+    __tablename__ = "lab_results"
+    __table_args__ = (
+        Index("ix_lab_results_analyte_flag", "analyte", "flag"),
+        Index("ix_lab_results_patient_analyte_date", "patient_id", "analyte", "report_date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("medical_reports.id"), index=True, nullable=False)
+    patient_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
+    # One numeric result from the report's parsed_data
+    analyte = Column(String, nullable=False)  # Canonical test name, e.g. "Hemoglobin", "TLC"
+    value = Column(Float, nullable=False)
+    unit = Column(String)
+    ref_low = Column(Float, nullable=True)
+    ref_high = Column(Float, nullable=True)
+    flag = Column(String)  # High, Low, Normal
+    
+    report_date = Column(DateTime)  # Copied from the report so patient history queries stay on the index
+    
+    # Relationships
+    report = relationship("MedicalReport", back_populates="lab_results")
+
+
+class ReportBlob(Base):
+    __tablename__ = "report_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String, unique=True, index=True, nullable=False)  # MD5 of file content
+    file_path = Column(String, unique=True, nullable=False)  # Content-addressed path derived from file_hash
+    file_size = Column(Integer)
+    ref_count = Column(Integer, default=0)  # Number of MedicalReport rows pointing at this blob
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ExtractionCacheEntry(Base):
+    __tablename__ = "extraction_cache"
+    __table_args__ = (
+        UniqueConstraint("file_hash", "extractor_version", name="uq_extraction_cache_hash_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String, index=True, nullable=False)
+    extractor_version = Column(String, nullable=False)
+    
+    # Extracted Output
+    text = Column(Text)
+    pages = Column(JSON)  # Per-page text
+    size_bytes = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime, index=True)
+
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True, nullable=False)  # Hash of purpose, model, prompt and input
+    purpose = Column(String, index=True)  # e.g. query_understanding
+    model = Column(String)
+    
+    # Parsed LLM response
+    response = Column(JSON)
+    hit_count = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime, index=True)
+    last_accessed_at = Column(DateTime, index=True)
+
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("medical_reports.id"), index=True)
+    
+    # Progress
+    status = Column(String, default="queued", index=True)  # queued, processing, completed, failed
+    stage = Column(String, default="queued")  # queued, matching_patient, extracting, summarizing, completed
+    progress = Column(Integer, default=0)  # 0-100
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    report = relationship("MedicalReport", back_populates="jobs")
+
+
+class SummaryRun(Base):
+    __tablename__ = "summary_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Progress; reports are visited in id order and cursor_report_id is committed
+    # with each batch, so an interrupted run resumes after the last committed batch
+    status = Column(String, default="running", index=True)  # running, paused, completed, cancelled, failed
+    cursor_report_id = Column(Integer, default=0)
+    total = Column(Integer, default=0)  # Reports needing a summary when the run started
+    processed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    
+    # Throttling (read again before every batch)
+    batch_size = Column(Integer)
+    workers = Column(Integer)
+    throttle_seconds = Column(Float, default=0.0)  # Pause between batches
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 
 class KnowledgeBase(Base):
@@ -0,0 +1,94 @@
+"""
+Re-parse medical reports whose parsed_data was produced by an older parser version
+Run this script after changing the report parser (also run as a background task on app startup)
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from typing import Optional
+from sqlalchemy import or_
+from database import SessionLocal, engine, Base
+from models import MedicalReport
+from config import get_settings
+from services.parsed_report_store import ParsedReportStore
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def reparse_stale_reports(batch_size: Optional[int] = None) -> dict:
+    """Re-parse stale reports in id order, committing once per batch"""
+    batch_size = batch_size or settings.REPORT_REPARSE_BATCH_SIZE
+    current_version = ParsedReportStore.current_version()
+    stale = (
+        or_(MedicalReport.parser_version.is_(None), MedicalReport.parser_version != current_version),
+        MedicalReport.processing_status == "completed",
+        MedicalReport.extracted_text.isnot(None),
+        MedicalReport.extracted_text != ""
+    )
+
+    db = SessionLocal()
+    try:
+        total = db.query(MedicalReport.id).filter(*stale).count()
+        if total == 0:
+            logger.info(f"[OK] All parsed reports are at parser version {current_version}")
+            return {"total": 0, "reparsed": 0, "failed": 0}
+
+        logger.info(f"Re-parsing {total} medical reports with parser version {current_version}...")
+        reparsed = 0
+        failed = 0
+        last_id = 0
+
+        while True:
+            # Keyset pagination so reports that fail to parse aren't retried in a loop
+            batch = db.query(MedicalReport).filter(
+                *stale,
+                MedicalReport.id > last_id
+            ).order_by(MedicalReport.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for report in batch:
+                try:
+                    ParsedReportStore.stamp(report, ParsedReportStore.parse_text(report.extracted_text))
+                    reparsed += 1
+                except Exception as e:
+                    logger.warning(f"Could not re-parse report {report.id}: {e}")
+                    failed += 1
+            db.commit()
+            # Parsed rows hold the full report text; don't keep them in the session
+            db.expunge_all()
+            logger.info(f"Re-parse progress: {reparsed + failed}/{total} reports ({failed} failed)")
+
+        logger.info(f"[OK] Re-parsed {reparsed} of {total} medical reports")
+        return {"total": total, "reparsed": reparsed, "failed": failed}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[ERROR] Error re-parsing reports: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-parse reports left by an older parser version")
+    parser.add_argument("--batch-size", type=int, default=None, help="Reports re-parsed and committed per batch")
+    args = parser.parse_args()
+
+    print("Running re-parse: Update parsed_data for stale medical reports...")
+    Base.metadata.create_all(bind=engine)  # lab_results table
+    try:
+        result = reparse_stale_reports(batch_size=args.batch_size)
+        print(f"[OK] Re-parse completed: {result['reparsed']} re-parsed, {result['failed']} failed")
+    except Exception:
+        print("[ERROR] Re-parse failed. Please check the error messages above.")
+        sys.exit(1)
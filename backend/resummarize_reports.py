@@ -0,0 +1,74 @@
+"""
+Generate AI summaries for reports whose summary is missing or from an older summarizer
+Runs in the foreground; the same job can be started from the admin /jobs endpoints.
+An interrupted run can be continued with --resume <run id>.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import SessionLocal, engine, Base
+from models import SummaryRun
+from migrate_add_summary_version import migrate_add_summary_version
+from services.summary_runner import SummaryRunner
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-summarise reports with missing or stale AI summaries")
+    parser.add_argument("--batch-size", type=int, default=None, help="Reports summarised and committed per batch")
+    parser.add_argument("--workers", type=int, default=None, help="Reports summarised in parallel")
+    parser.add_argument("--throttle", type=float, default=None, help="Seconds to pause between batches")
+    parser.add_argument("--resume", type=int, default=None, help="Continue an interrupted run by id")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)  # summary_runs table
+    migrate_add_summary_version()
+
+    runner = SummaryRunner()
+    db = SessionLocal()
+    try:
+        if args.resume:
+            run = db.query(SummaryRun).filter(SummaryRun.id == args.resume).first()
+            if not run:
+                print(f"[ERROR] Summary run {args.resume} not found")
+                sys.exit(1)
+            if run.status not in SummaryRunner.ACTIVE_STATUSES:
+                print(f"[ERROR] Summary run {run.id} is already {run.status}")
+                sys.exit(1)
+            run.status = "running"
+            db.commit()
+        else:
+            run = runner.create_run(db, batch_size=args.batch_size, workers=args.workers,
+                                    throttle_seconds=args.throttle)
+        run_id = run.id
+        print(f"Running summary run {run_id}: {run.total} reports need a summary...")
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    try:
+        runner.run(run_id)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; continue with --resume {run_id}")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        progress = SummaryRunner.progress(db.query(SummaryRun).filter(SummaryRun.id == run_id).first())
+    finally:
+        db.close()
+    if progress["status"] == "completed":
+        print(f"[OK] Summary run {run_id} completed: {progress['processed']} summarised, {progress['failed']} failed")
+    else:
+        print(f"[ERROR] Summary run {run_id} stopped ({progress['status']}): {progress['error'] or ''}")
+        sys.exit(1)
@@ -0,0 +1,21 @@
+"""
+Server entry point: python backend/serve.py (or cd backend && python serve.py)
+
+Extraction worker processes are started with "spawn", which re-imports the
+parent's __main__ module in every worker. Everything here sits under the
+__main__ guard, so workers import only the extraction code instead of the
+whole app (routes, services, startup migrations) as they would when
+main.py itself is the entry point.
+"""
+
+if __name__ == "__main__":
+    import uvicorn
+    from config import get_settings
+
+    settings = get_settings()
+    print(f"\n🚀 Starting Dr. Jii Medical Assistant on http://localhost:{settings.PORT}")
+    print(f"🏠 Landing Page: http://localhost:{settings.PORT}/")
+    print(f"👨‍⚕️ Expert Dashboard: http://localhost:{settings.PORT}/expert/")
+    print(f"💬 Chat Frontend: http://localhost:{settings.PORT}/frontend/")
+    print(f"📚 API Docs: http://localhost:{settings.PORT}/docs\n")
+    uvicorn.run("main:app", host=settings.HOST, port=settings.PORT)
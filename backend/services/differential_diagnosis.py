@@ -1,14 +1,30 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from config import get_settings
+from utils.keyword_matcher import KeywordMatcher
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
 class DifferentialDiagnosisService:
+    # Symptom keywords (substring match) -> finding they indicate
+    FINDING_KEYWORDS = [
+        ("fever", "fever"),
+        ("head", "headache"),
+    ]
+    
+    _matcher: Optional[KeywordMatcher] = None
+    
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Finding keyword automaton, shared by all instances"""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(cls.FINDING_KEYWORDS)
+        return cls._matcher
+    
     def __init__(self):
-        pass
+        self.matcher = self.get_matcher()
     
     async def generate_differential_diagnosis(self, symptoms: List[Dict[str, Any]], patient_history: Dict[str, Any], neo4j_session = None) -> List[Dict[str, Any]]:
         diagnoses = []
@@ -16,8 +32,9 @@ class DifferentialDiagnosisService:
         symptom_names = [s.get('name', '').lower() for s in symptoms]
         symptom_texts = ' '.join([s.get('name', '').lower() + ' ' + s.get('description', '').lower() for s in symptoms])
         has_severe = any(s.get('severity', '').lower() == 'severe' for s in symptoms)
-        has_fever = any('fever' in s.get('name', '').lower() or 'fever' in s.get('description', '').lower() for s in symptoms)
-        has_headache = any('head' in s.get('name', '').lower() or 'headache' in s.get('name', '').lower() or 'head' in s.get('description', '').lower() for s in symptoms)
+        findings = set(self.matcher.matched_payloads(symptom_texts))
+        has_fever = "fever" in findings
+        has_headache = "headache" in findings
         
         # Severe headache + fever - possible meningitis
         if has_headache and has_fever and has_severe:
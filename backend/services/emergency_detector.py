@@ -1,59 +1,82 @@
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import re
+from utils.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 
 class EmergencyDetector:
+    # Define emergency red flags
+    RED_FLAGS = {
+        "cardiac": [
+            "chest pain", "chest pressure", "crushing chest pain",
+            "pain radiating to arm", "pain radiating to jaw",
+            "severe shortness of breath", "irregular heartbeat",
+            "loss of consciousness", "syncope"
+        ],
+        "neurological": [
+            "sudden severe headache", "worst headache of life",
+            "severe headache", "high pain in the head", "head pain",
+            "headache with fever", "headache and fever",
+            "loss of consciousness", "seizure", "convulsion",
+            "sudden confusion", "difficulty speaking", "slurred speech",
+            "facial drooping", "arm weakness", "leg weakness",
+            "sudden vision loss", "double vision", "sudden dizziness",
+            "neck stiffness", "stiff neck"
+        ],
+        "respiratory": [
+            "severe difficulty breathing", "unable to speak in sentences",
+            "gasping for air", "blue lips", "blue fingernails",
+            "choking", "airway obstruction"
+        ],
+        "trauma": [
+            "severe bleeding", "uncontrolled bleeding",
+            "bleeding that won't stop", "severe injury",
+            "major trauma", "deep wound", "head injury"
+        ],
+        "abdominal": [
+            "severe abdominal pain", "rigid abdomen",
+            "distended abdomen", "vomiting blood", "blood in stool",
+            "black tarry stool"
+        ],
+        "poisoning": [
+            "overdose", "poisoning", "toxic ingestion",
+            "chemical exposure"
+        ],
+        "allergic": [
+            "severe allergic reaction", "anaphylaxis",
+            "throat swelling", "difficulty swallowing",
+            "widespread rash with breathing difficulty"
+        ],
+        "psychiatric": [
+            "suicidal thoughts", "homicidal thoughts",
+            "harm to self", "harm to others"
+        ]
+    }
+    
+    # (category, flag) pairs in reporting order, and the automaton/word index over them
+    _flag_list: List[Tuple[str, str]] = []
+    _matcher: Optional[KeywordMatcher] = None
+    _flags_by_word: Dict[str, List[int]] = {}
+    
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """Build the red flag automaton and word index once, shared by all instances"""
+        if cls._matcher is None:
+            flag_list = [(category, flag) for category, flags in cls.RED_FLAGS.items() for flag in flags]
+            flags_by_word: Dict[str, List[int]] = {}
+            for index, (_, flag) in enumerate(flag_list):
+                for word in set(flag.lower().split()):
+                    flags_by_word.setdefault(word, []).append(index)
+            cls._flag_list = flag_list
+            cls._flags_by_word = flags_by_word
+            cls._matcher = KeywordMatcher((flag, index) for index, (_, flag) in enumerate(flag_list))
+        return cls._matcher
+    
     def __init__(self):
-        # Define emergency red flags
-        self.red_flags = {
-            "cardiac": [
-                "chest pain", "chest pressure", "crushing chest pain",
-                "pain radiating to arm", "pain radiating to jaw",
-                "severe shortness of breath", "irregular heartbeat",
-                "loss of consciousness", "syncope"
-            ],
-            "neurological": [
-                "sudden severe headache", "worst headache of life",
-                "severe headache", "high pain in the head", "head pain",
-                "headache with fever", "headache and fever",
-                "loss of consciousness", "seizure", "convulsion",
-                "sudden confusion", "difficulty speaking", "slurred speech",
-                "facial drooping", "arm weakness", "leg weakness",
-                "sudden vision loss", "double vision", "sudden dizziness",
-                "neck stiffness", "stiff neck"
-            ],
-            "respiratory": [
-                "severe difficulty breathing", "unable to speak in sentences",
-                "gasping for air", "blue lips", "blue fingernails",
-                "choking", "airway obstruction"
-            ],
-            "trauma": [
-                "severe bleeding", "uncontrolled bleeding",
-                "bleeding that won't stop", "severe injury",
-                "major trauma", "deep wound", "head injury"
-            ],
-            "abdominal": [
-                "severe abdominal pain", "rigid abdomen",
-                "distended abdomen", "vomiting blood", "blood in stool",
-                "black tarry stool"
-            ],
-            "poisoning": [
-                "overdose", "poisoning", "toxic ingestion",
-                "chemical exposure"
-            ],
-            "allergic": [
-                "severe allergic reaction", "anaphylaxis",
-                "throat swelling", "difficulty swallowing",
-                "widespread rash with breathing difficulty"
-            ],
-            "psychiatric": [
-                "suicidal thoughts", "homicidal thoughts",
-                "harm to self", "harm to others"
-            ]
-        }
+        self.red_flags = self.RED_FLAGS
+        self.matcher = self.get_matcher()
         
         # Vital sign thresholds
         self.vital_thresholds = {
@@ -87,15 +110,13 @@ class EmergencyDetector:
         for symptom in symptoms:
             symptom_text = symptom.get('name', '').lower() + " " + symptom.get('description', '').lower()
             
-            for category, flags in self.red_flags.items():
-                for flag in flags:
-                    if self._fuzzy_match(flag, symptom_text):
-                        red_flags_found.append({
-                            "category": category,
-                            "flag": flag,
-                            "symptom": symptom.get('name')
-                        })
-                        is_emergency = True
+            for category, flag in self._match_red_flags(symptom_text):
+                red_flags_found.append({
+                    "category": category,
+                    "flag": flag,
+                    "symptom": symptom.get('name')
+                })
+                is_emergency = True
             
             # Check severity
             severity = symptom.get('severity', '').lower()
@@ -158,23 +179,24 @@ class EmergencyDetector:
         
         return is_emergency, red_flags_found, triage_level
     
-    def _fuzzy_match(self, pattern: str, text: str) -> bool:
+    def _match_red_flags(self, text: str) -> List[Tuple[str, str]]:
         """
-        Check if pattern matches text with some flexibility
+        Red flags matching text with some flexibility: every word of the flag
+        appears in the text (in any order), or the flag appears as a substring
         """
-        # Simple word-based matching
-        pattern_words = set(pattern.lower().split())
-        text_words = set(text.lower().split())
-        
-        # Check if all pattern words are in text
-        if pattern_words.issubset(text_words):
-            return True
+        # Substring matches, in one pass over the text
+        matched = {match.payload for match in self.matcher.find_all(text)}
         
-        # Check if pattern appears as substring
-        if pattern.lower() in text.lower():
-            return True
+        # Word-based matching: count how many of each flag's words the text contains
+        word_hits: Dict[int, int] = {}
+        for word in set(text.lower().split()):
+            for index in self._flags_by_word.get(word, []):
+                word_hits[index] = word_hits.get(index, 0) + 1
+        for index, hits in word_hits.items():
+            if hits == len(set(self._flag_list[index][1].lower().split())):
+                matched.add(index)
         
-        return False
+        return [self._flag_list[index] for index in sorted(matched)]
     
     def _check_vital_signs(self, vital_signs: Dict[str, float]) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,156 @@
+"""
+Batch flagging of extracted lab values against reference ranges
+"""
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from utils.unit_converter import UnitConverter
+
+logger = logging.getLogger(__name__)
+
+
+class LabFlag(NamedTuple):
+    test: str
+    reference_key: Optional[str]  # Matched reference_ranges key, None if no range applies
+    status: Optional[str]  # High, Low, Normal; None without a reference range
+    deviation: float  # Distance outside the range as a fraction of its width, 0 inside it
+
+
+class LabFlagger:
+    """
+    Flags the extracted lab values of many reports at once. Reference ranges are
+    converted to canonical units once and held in arrays, and every unit seen is
+    resolved once into a conversion factor and canonical unit code. A batch is
+    then matched to its ranges, converted and compared with a few array
+    operations rather than a reference-table scan and unit lookup per value.
+    """
+
+    # Indexed by the vectorised comparison code (-1 selects "Low")
+    STATUS_CODES = ("Normal", "High", "Low")
+
+    def __init__(self, reference_ranges: Dict[str, Tuple[float, float, str]]):
+        # Insertion order matters: the first key contained in a test name wins
+        self.reference_ranges = reference_ranges
+        self.keys = list(reference_ranges)
+        self._match_cache: Dict[str, int] = {}
+
+        # Printed units -> code; each code's conversion factor and canonical unit
+        # (a unit that doesn't convert is its own canonical unit)
+        self._lock = threading.Lock()
+        self._unit_codes: Dict[Optional[str], int] = {}
+        self._unit_factors: List[float] = []
+        self._unit_canonical: List[int] = []
+        self._canonical_names: Dict[Optional[str], int] = {}
+
+        lows, highs, units = [], [], []
+        for min_ref, max_ref, ref_unit in reference_ranges.values():
+            low, unit = UnitConverter.convert(min_ref, ref_unit)
+            high, _ = UnitConverter.convert(max_ref, ref_unit)
+            lows.append(low)
+            highs.append(high)
+            units.append(ref_unit)
+        ranges = list(reference_ranges.values())
+        self.lows = np.array(lows, dtype=float)
+        self.highs = np.array(highs, dtype=float)
+        # Bounds as printed, for values whose unit doesn't convert into the range's
+        self.min_refs = np.array([entry[0] for entry in ranges], dtype=float)
+        self.max_refs = np.array([entry[1] for entry in ranges], dtype=float)
+        self.ref_unit_codes = np.array([self._unit_code(unit) for unit in units], dtype=np.intp)
+        self.ref_canonical = np.array(self._unit_canonical, dtype=np.intp)[self.ref_unit_codes]
+
+    def _unit_code(self, unit: Optional[str]) -> int:
+        """Code of a printed unit, resolving it through UnitConverter the first time it is seen"""
+        code = self._unit_codes.get(unit)
+        if code is not None:
+            return code
+        with self._lock:
+            if unit not in self._unit_codes:
+                canonical = UnitConverter.canonical_unit(unit)
+                canonical_unit, factor = canonical if canonical is not None else (unit, 1.0)
+                canonical_code = self._canonical_code(canonical_unit)
+                self._unit_codes[unit] = len(self._unit_factors)
+                self._unit_factors.append(factor)
+                self._unit_canonical.append(canonical_code)
+            return self._unit_codes[unit]
+
+    def _canonical_code(self, canonical_unit: Optional[str]) -> int:
+        """Integer standing for a canonical unit name, so units compare as integers (lock held)"""
+        return self._canonical_names.setdefault(canonical_unit, len(self._canonical_names))
+
+    def match(self, test_name: str) -> Optional[int]:
+        """Index of the reference range for a test name (cached per name)"""
+        index = self._match_index(test_name)
+        return index if index >= 0 else None
+
+    def _match_index(self, test_name: str) -> int:
+        """match() with -1 for no range, as stored in the index arrays"""
+        index = self._match_cache.get(test_name)
+        if index is None:
+            test_lower = test_name.lower()
+            index = next((index for index, key in enumerate(self.keys) if key in test_lower), -1)
+            self._match_cache[test_name] = index
+        return index
+
+    @staticmethod
+    def flag_arrays(values: Sequence[float], lows: Sequence[float],
+                    highs: Sequence[float]) -> Tuple[List[str], List[float]]:
+        """Status and deviation for parallel arrays of values and range bounds"""
+        values = np.asarray(values, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        highs = np.asarray(highs, dtype=float)
+        width = np.where(highs > lows, highs - lows, 1.0)
+        # 1 above the range, -1 below it, 0 inside
+        codes = (values > highs).astype(np.int8) - (values < lows).astype(np.int8)
+        deviation = (np.maximum(values - highs, 0.0) + np.maximum(lows - values, 0.0)) / width
+        return [LabFlagger.STATUS_CODES[code] for code in codes.tolist()], deviation.tolist()
+
+    def flag_batch(self, reports: Sequence[Dict[str, Dict[str, Any]]]) -> List[List[LabFlag]]:
+        """
+        Flags for each report's lab values ({test name: {"value", "unit", ...}} as
+        returned by ReportSummarizer._extract_lab_values), in the same order
+        """
+        positions = []  # (report index, test name)
+        indices, values, unit_codes = [], [], []
+        for report_index, lab_values in enumerate(reports):
+            for test_name, value_info in lab_values.items():
+                positions.append((report_index, test_name))
+                indices.append(self._match_index(test_name))
+                values.append(value_info['value'])
+                # -1: no printed unit, the range's own unit applies
+                unit = value_info.get('unit')
+                unit_codes.append(self._unit_code(unit) if unit else -1)
+
+        results: List[List[LabFlag]] = [[] for _ in reports]
+        if not positions:
+            return results
+
+        indices = np.array(indices, dtype=np.intp)
+        matched = indices >= 0
+        ref = indices[matched]
+        statuses: List[str] = []
+        deviations: List[float] = []
+        if ref.size:
+            raw = np.array(values, dtype=float)[matched]
+            codes = np.array(unit_codes, dtype=np.intp)[matched]
+            codes = np.where(codes >= 0, codes, self.ref_unit_codes[ref])
+            factors = np.array(self._unit_factors, dtype=float)[codes]
+            canonical = np.array(self._unit_canonical, dtype=np.intp)[codes]
+
+            # Units that don't convert into the range's unit are compared as printed
+            same_unit = canonical == self.ref_canonical[ref]
+            compared = np.where(same_unit, raw * factors, raw)
+            lows = np.where(same_unit, self.lows[ref], self.min_refs[ref])
+            highs = np.where(same_unit, self.highs[ref], self.max_refs[ref])
+            statuses, deviations = self.flag_arrays(compared, lows, highs)
+
+        flagged = 0
+        for (report_index, test_name), index in zip(positions, indices.tolist()):
+            if index < 0:
+                results[report_index].append(LabFlag(test_name, None, None, 0.0))
+                continue
+            results[report_index].append(
+                LabFlag(test_name, self.keys[index], statuses[flagged], deviations[flagged])
+            )
+            flagged += 1
+        return results
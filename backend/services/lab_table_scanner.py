@@ -0,0 +1,185 @@
+"""
+Single-pass scanner for lab result tables
+"""
+import re
+import logging
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScannedRow(NamedTuple):
+    section: str  # Knowledge base section, e.g. "rbc_metrics", "urine_chemical", "widal"
+    analyte: Dict[str, Any]  # Knowledge base entry for the test
+    label: str  # Text of the row that matched an alias
+    rest: str  # Remainder of the row after the label
+    line: str  # Whole row, used as context (e.g. pH reference range)
+
+
+class LabTableScanner:
+    """
+    Tokenises a report into lines once and matches the leading words of each line
+    against an alias dictionary, longest alias first. Parse time therefore grows with
+    the length of the report, not with the number of analytes in the knowledge base.
+    Value, unit and reference range are read from the same row as the test name.
+    """
+
+    # Tokens of a row label; "/" separates alternative names such as "SGPT/ALT"
+    TOKEN_PATTERN = re.compile(r'[^\s/:]+')
+    BULLET_PATTERN = re.compile(r'^[\s\-\*•·>]+')
+    VALUE_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([^\s(),;]*)')
+    TITER_PATTERN = re.compile(r'(?:1\s*:\s*)?(\d+|no\s+agglutination)', re.IGNORECASE)
+    PARENTHESES_PATTERN = re.compile(r'\([^)]*\)')
+    LEADING_SEPARATORS = ' \t:-=–'
+
+    # Aliases this short (TO, MP, Hb, pH) only match in their own or upper case
+    SHORT_ALIAS_LENGTH = 3
+
+    # Section headers: urine tests are only read inside a urine section, since names
+    # like "Glucose", "Protein" or "Blood" also appear in blood chemistry panels
+    URINE_HEADER_KEYWORDS = ("urine", "urinalysis")
+    OTHER_HEADER_KEYWORDS = ("blood", "hemogram", "haemogram", "cbc", "serum", "function",
+                             "profile", "screening", "widal", "malaria")
+    URINE_SECTIONS = ("urine_physical", "urine_chemical", "urine_microscopy")
+
+    NEGATIVE_MALARIA_PHRASE = "No malarial parasite seen"
+
+    def __init__(self, knowledge: Dict[str, Any]):
+        # alias tokens -> [(section, alias, analyte)]
+        self.aliases: Dict[Tuple[str, ...], List[Tuple[str, str, Dict[str, Any]]]] = {}
+        self.max_alias_tokens = 1
+        # Per-thread: one scanner is shared by the job queue's worker threads
+        self._local = threading.local()
+        self._build(knowledge)
+
+    @property
+    def last_scan_stats(self) -> Dict[str, int]:
+        """Lines read and rows found by the last scan finished on this thread"""
+        return getattr(self._local, "scan_stats", {})
+
+    def _add(self, section: str, analyte: Dict[str, Any], alias: str):
+        tokens = tuple(token.lower() for token in self.TOKEN_PATTERN.findall(alias))
+        if not tokens:
+            return
+        self.aliases.setdefault(tokens, []).append((section, alias, analyte))
+        self.max_alias_tokens = max(self.max_alias_tokens, len(tokens))
+
+    def _build(self, knowledge: Dict[str, Any]):
+        cbc = knowledge["cbc_patterns"]
+        for test_info in cbc["rbc_metrics"]:
+            for alias in test_info["aliases"]:
+                self._add("rbc_metrics", test_info, alias)
+        for alias in cbc["wbc"]["tlc"]["aliases"]:
+            self._add("tlc", cbc["wbc"]["tlc"], alias)
+        for cell_type in cbc["wbc"]["differential"]:
+            self._add("differential", {"name": cell_type}, cell_type)
+        for test_info in cbc["platelets"]:
+            for alias in test_info["aliases"]:
+                self._add("platelets", test_info, alias)
+        for alias in cbc["esr"]["aliases"]:
+            self._add("esr", cbc["esr"], alias)
+
+        for kind, test_names in knowledge["urine_patterns"].items():
+            for test_name in test_names:
+                self._add(f"urine_{kind}", {"name": test_name}, test_name)
+                # Tables write both "RBC" and "RBCs", "Ketone" and "Ketones"
+                if test_name.endswith("s") and " " not in test_name:
+                    self._add(f"urine_{kind}", {"name": test_name}, test_name[:-1])
+
+        infection = knowledge["infection_patterns"]
+        malaria = {"name": "Malaria"}
+        for alias in infection["malaria"] + [self.NEGATIVE_MALARIA_PHRASE]:
+            self._add("malaria", malaria, alias)
+        for antigen_info in infection["widal"]["antigens"]:
+            for alias in antigen_info["aliases"]:
+                self._add("widal", antigen_info, alias)
+
+        for test_info in knowledge["liver_patterns"]:
+            for alias in test_info["aliases"]:
+                self._add("liver", test_info, alias)
+        for test_info in knowledge["inflammation_patterns"]:
+            for alias in test_info["aliases"]:
+                self._add("inflammation", test_info, alias)
+
+    def scan(self, text: str) -> List[ScannedRow]:
+        """Return every row of the report that starts with a known test name, in report order"""
+        return list(self.iter_rows(text))
+
+    def iter_rows(self, text: str) -> Iterator[ScannedRow]:
+        lines = [self.BULLET_PATTERN.sub('', line).strip() for line in text.splitlines()]
+        in_urine = False
+        rows = 0
+
+        for index, line in enumerate(lines):
+            if not line:
+                continue
+
+            row = self._match_row(line, in_urine)
+
+            # Value printed on the following line of a table
+            if row is not None and not row.rest.strip(self.LEADING_SEPARATORS) and index + 1 < len(lines):
+                next_line = lines[index + 1]
+                if next_line and self._match_row(next_line, in_urine) is None:
+                    row = row._replace(rest=next_line, line=f"{line} {next_line}")
+
+            # A test name with no result is a heading ("MALARIA"), except for sentences
+            # that are results on their own
+            if row is not None and not row.rest.strip(self.LEADING_SEPARATORS) \
+                    and row.label.lower() != self.NEGATIVE_MALARIA_PHRASE.lower():
+                row = None
+
+            if row is None:
+                if self._is_header(line):
+                    lower = line.lower()
+                    if any(keyword in lower for keyword in self.URINE_HEADER_KEYWORDS):
+                        in_urine = True
+                    elif any(keyword in lower for keyword in self.OTHER_HEADER_KEYWORDS):
+                        in_urine = False
+                continue
+
+            rows += 1
+            yield row
+
+        self._local.scan_stats = {"lines": len(lines), "rows": rows}
+
+    def _match_row(self, line: str, in_urine: bool) -> Optional[ScannedRow]:
+        """Longest alias matching the leading tokens of line"""
+        tokens = list(islice(self.TOKEN_PATTERN.finditer(line), self.max_alias_tokens))
+        for count in range(len(tokens), 0, -1):
+            candidates = self.aliases.get(tuple(match.group(0).lower() for match in tokens[:count]))
+            if not candidates:
+                continue
+
+            label_end = tokens[count - 1].end()
+            label = line[:label_end]
+            for section, alias, analyte in self._rank(candidates, in_urine):
+                if len(alias) <= self.SHORT_ALIAS_LENGTH and label not in (alias, alias.upper()):
+                    continue
+                return ScannedRow(section, analyte, label, line[label_end:], line)
+        return None
+
+    def _rank(self, candidates, in_urine: bool):
+        """Urine entries win inside a urine section and are ignored outside one"""
+        if in_urine:
+            return sorted(candidates, key=lambda candidate: candidate[0] not in self.URINE_SECTIONS)
+        return [candidate for candidate in candidates if candidate[0] not in self.URINE_SECTIONS]
+
+    def _is_header(self, line: str) -> bool:
+        return not any(char.isdigit() for char in line) and (line.isupper() or line.endswith(':'))
+
+    def read_value(self, rest: str) -> Optional[Tuple[str, str, str]]:
+        """(number, unit, remainder) for the first number in a row, or None"""
+        match = self.VALUE_PATTERN.search(rest)
+        if not match:
+            return None
+        return match.group(1), match.group(2), rest[match.end():]
+
+    def read_text(self, rest: str) -> str:
+        """Text result of a row, without a trailing parenthesised reference"""
+        return rest.strip(self.LEADING_SEPARATORS).split('(', 1)[0].strip()
+
+    def read_titer(self, rest: str) -> Optional[str]:
+        match = self.TITER_PATTERN.search(self.PARENTHESES_PATTERN.sub('', rest))
+        return match.group(1) if match else None
@@ -0,0 +1,240 @@
+"""
+Shared gateway for OpenAI chat completions
+Every service calls the model through LLMGateway.get(): one async client with a
+pooled HTTP connection per event loop, a process-wide concurrency limit per
+model and request/queue timeouts, so a slow upstream queues LLM calls instead
+of occupying the thread pool the rest of the app needs.
+"""
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Coroutine, Dict, List, Optional, TypeVar
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Try to import OpenAI
+try:
+    from openai import AsyncOpenAI, APITimeoutError
+    OPENAI_AVAILABLE = True
+except ImportError:
+    APITimeoutError = TimeoutError
+    OPENAI_AVAILABLE = False
+    logger.warning("OpenAI library not available. LLM features are disabled.")
+
+# httpx (an OpenAI dependency) is only needed to size the connection pool
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+
+class LLMUnavailableError(RuntimeError):
+    """No OpenAI client is configured (library missing or OPENAI_API_KEY unset)"""
+
+
+class LLMQueueTimeoutError(TimeoutError):
+    """A call waited longer than LLM_QUEUE_TIMEOUT_SECONDS for a free slot"""
+
+
+class _LoopState:
+    """Client and semaphores of one event loop (asyncio objects can't be shared between loops)"""
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+class LLMGateway:
+    """
+    Async chat completions with per-model concurrency limits and metrics.
+
+    The app's event loop keeps one client for its lifetime; background worker
+    threads run their coroutines with run(), which gives them a client for their
+    own loop and closes it when the coroutine is done.
+    Limits (LLM_MODEL_CONCURRENCY, else LLM_DEFAULT_CONCURRENCY) apply per model
+    to the whole process: a call needs a slot on its own loop's semaphore and
+    one of the model's process-wide slots, which every loop shares. Calls beyond
+    the limit wait in a queue whose depth is reported by stats().
+    """
+    
+    # How often a call waiting for a slot held by another event loop checks again
+    PROCESS_SLOT_POLL_SECONDS = 0.05
+
+    _instance: Optional["LLMGateway"] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> "LLMGateway":
+        """Gateway shared by every service"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = LLMGateway()
+        return cls._instance
+
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._process_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    @property
+    def available(self) -> bool:
+        return OPENAI_AVAILABLE and bool(settings.OPENAI_API_KEY)
+
+    def _create_client(self) -> Any:
+        options: Dict[str, Any] = {
+            "api_key": settings.OPENAI_API_KEY,
+            "timeout": settings.LLM_TIMEOUT_SECONDS,
+            "max_retries": settings.LLM_MAX_RETRIES,
+        }
+        if HTTPX_AVAILABLE:
+            options["http_client"] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS),
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            )
+        return AsyncOpenAI(**options)
+
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = _LoopState(self._create_client())
+                self._loops[loop] = state
+            return state
+
+    @staticmethod
+    def concurrency(model: str) -> int:
+        return settings.LLM_MODEL_CONCURRENCY.get(model, settings.LLM_DEFAULT_CONCURRENCY)
+
+    def _semaphore(self, state: _LoopState, model: str) -> asyncio.Semaphore:
+        if model not in state.semaphores:
+            state.semaphores[model] = asyncio.Semaphore(self.concurrency(model))
+        return state.semaphores[model]
+    
+    def _process_semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if model not in self._process_slots:
+                self._process_slots[model] = threading.BoundedSemaphore(self.concurrency(model))
+            return self._process_slots[model]
+    
+    async def _wait_for_slot(self, semaphore: asyncio.Semaphore, process_slots: threading.BoundedSemaphore):
+        """Queue on this loop's semaphore, then for a process-wide slot (never blocks the loop)"""
+        await semaphore.acquire()
+        try:
+            while not process_slots.acquire(blocking=False):
+                await asyncio.sleep(self.PROCESS_SLOT_POLL_SECONDS)
+        except BaseException:
+            semaphore.release()
+            raise
+
+    def _record(self, model: str, **changes: float):
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                "calls": 0, "errors": 0, "timeouts": 0, "queue_timeouts": 0,
+                "in_flight": 0, "waiting": 0, "max_waiting": 0, "latency_total": 0.0
+            })
+            for key, change in changes.items():
+                stats[key] += change
+            stats["max_waiting"] = max(stats["max_waiting"], stats["waiting"])
+
+    async def _acquire(self, model: str) -> asyncio.Semaphore:
+        """Wait for a free slot for model; raises LLMQueueTimeoutError after LLM_QUEUE_TIMEOUT_SECONDS"""
+        if not self.available:
+            raise LLMUnavailableError("OpenAI is not configured")
+        semaphore = self._semaphore(self._loop_state(), model)
+        process_slots = self._process_semaphore(model)
+        if not semaphore.locked() and process_slots.acquire(blocking=False):
+            await semaphore.acquire()  # Free slot: doesn't wait
+        else:
+            self._record(model, waiting=1)
+            try:
+                await asyncio.wait_for(self._wait_for_slot(semaphore, process_slots),
+                                       timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self._record(model, queue_timeouts=1)
+                raise LLMQueueTimeoutError(f"No free {model} slot after {settings.LLM_QUEUE_TIMEOUT_SECONDS}s")
+            finally:
+                self._record(model, waiting=-1)
+        self._record(model, in_flight=1)
+        return semaphore
+
+    def _release(self, semaphore: asyncio.Semaphore, model: str, started: float, error: Optional[BaseException]):
+        semaphore.release()
+        self._process_semaphore(model).release()
+        self._record(
+            model,
+            in_flight=-1,
+            calls=1,
+            errors=1 if error is not None else 0,
+            timeouts=1 if isinstance(error, (asyncio.TimeoutError, APITimeoutError)) else 0,
+            latency_total=time.perf_counter() - started
+        )
+
+    async def chat(self, model: str, messages: List[Dict[str, str]],
+                   on_token: Optional[Callable[[str], Any]] = None, **params) -> str:
+        """
+        Content of the first choice of a chat completion (params as for
+        chat.completions.create). With on_token the completion is streamed and
+        on_token gets each piece of content as it arrives; the full content is
+        still returned.
+        """
+        semaphore = await self._acquire(model)
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            client = self._loop_state().client
+            if on_token is None:
+                response = await client.chat.completions.create(model=model, messages=messages, **params)
+                return response.choices[0].message.content or ""
+
+            stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **params)
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    on_token(chunk.choices[0].delta.content)
+            return "".join(parts)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release(semaphore, model, started, error)
+
+    async def close(self):
+        """Close the running event loop's client (app shutdown, end of run())"""
+        with self._lock:
+            state = self._loops.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.close()
+    
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        asyncio.run for worker threads (no running loop): runs coroutine on a new
+        event loop and closes the client that loop created before returning
+        """
+        async def run_and_close() -> T:
+            try:
+                return await coroutine
+            finally:
+                await self.close()
+        return asyncio.run(run_and_close())
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model call counts, errors, in-flight calls, queue depth and mean latency since startup"""
+        with self._lock:
+            models = {model: dict(stats) for model, stats in self._stats.items()}
+            loops = len(self._loops)
+        for model, stats in models.items():
+            stats["concurrency"] = self.concurrency(model)
+            stats["mean_latency_ms"] = round(1000 * stats.pop("latency_total") / stats["calls"], 1) if stats["calls"] else None
+        return {"available": self.available, "event_loops": loops, "models": models}
@@ -1,26 +1,22 @@
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 import logging
-import asyncio
 import json
 from config import get_settings
+from services.llm_gateway import LLMGateway
+from utils.single_flight import SingleFlight
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI library not available.")
 
 
 class MedicalInfoService:
+    # Identical concurrent questions, shared by every instance
+    inflight = SingleFlight("medical_info")
+    
     def __init__(self):
-        self.client = None
-        if OPENAI_AVAILABLE and settings.OPENAI_API_KEY:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        else:
+        self.llm = LLMGateway.get()
+        if not self.llm.available:
             logger.warning("OPENAI_API_KEY not set. Medical knowledge will use fallback knowledge base.")
         
         self.knowledge_base = {
@@ -56,15 +52,17 @@ class MedicalInfoService:
             }
         }
     
-    async def get_medical_information(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def get_medical_information(self, query: str, context: Dict[str, Any] = None,
+                                      on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Get medical information using OpenAI for real-time knowledge and news.
         Falls back to knowledge base if OpenAI is not available.
+        on_token receives the answer as it streams from OpenAI.
         """
         query_lower = query.lower()
         
         # Use OpenAI for real-time medical knowledge and news
-        if self.client:
+        if self.llm.available:
             try:
                 logger.info(f"Using OpenAI for medical knowledge query: {query}")
                 
@@ -82,21 +80,22 @@ When answering:
 
 Format your response clearly with proper structure and bullet points where appropriate."""
 
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self.client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
+                # Callers asking the same question at the same time share one OpenAI call.
+                # It always streams so that streaming callers joining it still get tokens.
+                answer = await self.inflight.do(
+                    ("gpt-3.5-turbo", query),
+                    lambda emit: self.llm.chat(
+                        "gpt-3.5-turbo",
+                        [
                             {"role": "system", "content": system_prompt},
                             {"role": "user", "content": query}
                         ],
                         temperature=0.7,
-                        max_tokens=1000
-                    )
+                        max_tokens=1000,
+                        on_token=emit
+                    ),
+                    on_chunk=on_token
                 )
-                
-                answer = response.choices[0].message.content
                 confidence = 0.85
                 sources = [{"content": "OpenAI GPT-3.5-turbo with medical knowledge", "metadata": "ai_generated"}]
                 
@@ -5,85 +5,334 @@ Uses Retrieval-Augmented Generation to accurately extract structured data from m
 import json
 import re
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Optional, Pattern, Tuple
 from config import get_settings
+from services.lab_table_scanner import LabTableScanner
+from services.llm_gateway import LLMGateway
+from utils.unit_converter import UnitConverter
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI library not available for RAG model.")
+
+class PatternRegistry:
+    """
+    Compiled extraction patterns, built once from the medical knowledge base.
+
+    Patterns are grouped per analyte as (section, name) -> [(alias, [compiled patterns])]
+    in the same priority order the extractors try them, so parsing a report only runs
+    precompiled regex objects.
+    """
+    
+    def __init__(self, knowledge: Dict[str, Any]):
+        self.analytes: Dict[Tuple[str, str], List[Tuple[str, List[Pattern]]]] = {}
+        self.context_patterns: Dict[str, Pattern] = {}
+        self._build(knowledge)
+    
+    def get(self, section: str, name: str) -> List[Tuple[str, List[Pattern]]]:
+        return self.analytes.get((section, name), [])
+    
+    def context_pattern(self, alias: str) -> Pattern:
+        """Pattern capturing the text that follows a test name (used to find its reference range)"""
+        pattern = self.context_patterns.get(alias)
+        if pattern is None:
+            pattern = re.compile(rf'{re.escape(alias)}[^.]{{0,300}}', re.IGNORECASE)
+            self.context_patterns[alias] = pattern
+        return pattern
+    
+    def stats(self) -> Dict[str, int]:
+        """Size of the registry"""
+        return {
+            "analytes": len(self.analytes),
+            "patterns": sum(len(patterns) for entries in self.analytes.values() for _, patterns in entries),
+            "context_patterns": len(self.context_patterns)
+        }
+    
+    def _add(self, section: str, name: str, alias: str, patterns: List[Optional[str]]):
+        compiled = [re.compile(pattern, re.IGNORECASE) for pattern in patterns if pattern is not None]
+        self.analytes.setdefault((section, name), []).append((alias, compiled))
+        if section in ("cbc", "liver", "inflammation"):
+            self.context_pattern(alias)
+    
+    def _build(self, knowledge: Dict[str, Any]):
+        cbc = knowledge["cbc_patterns"]
+        
+        # RBC metrics - multiple patterns to catch different formats
+        for test_info in cbc["rbc_metrics"]:
+            unit = test_info["unit"]
+            for alias in test_info["aliases"]:
+                self._add("cbc", test_info["name"], alias, [
+                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({unit}|g/dl|g%|%)',
+                    rf'{re.escape(alias)}\s+(\d+(?:\.\d+)?)\s*({unit}|g/dl|g%|%)',
+                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({unit}|g/dl|g%|%)',
+                    rf'{re.escape(alias)}\s+Count\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(mill/mm³|million/μl)',  # For RBC Count
+                    rf'PCV\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(%|%)',  # Specific for PCV
+                    rf'Hematocrit\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(%|%)',  # Alternative for PCV
+                ])
+        
+        # TLC
+        tlc_info = cbc["wbc"]["tlc"]
+        for alias in tlc_info["aliases"]:
+            self._add("cbc", tlc_info["name"], alias, [
+                rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
+                rf'{re.escape(alias)}\s+(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
+                rf'Total\s+Leukocyte\s+Count\s*[:\-]\s*(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
+            ])
+        
+        # Differential percentages and absolute counts
+        for cell_type in cbc["wbc"]["differential"]:
+            self._add("cbc_differential_percent", cell_type, cell_type, [rf'{cell_type}[:\s]+(\d+(?:\.\d+)?)\s*%'])
+            self._add("cbc_absolute_counts", cell_type, cell_type, [rf'{cell_type}[:\s]+(\d+(?:,\d+)?)\s*(?:/cmm|/mm³)'])
+        
+        # Platelets
+        for test_info in cbc["platelets"]:
+            unit = test_info["unit"]
+            for alias in test_info["aliases"]:
+                self._add("cbc", test_info["name"], alias, [
+                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({unit}|lakh|/mm³|lakh/mm³)',
+                    rf'{re.escape(alias)}\s+Count\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({unit}|lakh|/mm³|lakh/mm³)',
+                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({unit}|lakh|/mm³|lakh/mm³)',
+                ])
+        
+        # ESR
+        esr_info = cbc["esr"]
+        for alias in esr_info["aliases"]:
+            self._add("cbc", esr_info["name"], alias, [
+                rf'{re.escape(alias)}\s*[:\-]\s*(\d+)\s*({esr_info["unit"]}|mm/hr)',
+                rf'{re.escape(alias)}\s+(\d+)\s*({esr_info["unit"]}|mm/hr)',
+                rf'Erythrocyte\s+Sedimentation\s+Rate\s*[:\-]\s*(\d+)\s*({esr_info["unit"]}|mm/hr)',
+            ])
+        
+        # Urine R/E
+        urine = knowledge["urine_patterns"]
+        for test_name in urine["physical"]:
+            self._add("urine_physical", test_name, test_name, [
+                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
+                rf'{test_name}\s*:\s*([^.\n]+)',
+                rf'pH\s*[:\-]\s*(\d+(?:\.\d+)?)',  # Specific for pH
+                rf'Specific\s+Gravity\s*[:\-]\s*(\d+(?:\.\d+)?)',  # Specific for Specific Gravity
+            ])
+        for test_name in urine["chemical"]:
+            self._add("urine_chemical", test_name, test_name, [
+                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
+                rf'{test_name}\s*:\s*([^.\n]+)',
+                rf'Leukocyte\s+Esterase\s*[:\-]\s*([^.\n]+)',  # Specific for Leukocyte Esterase
+            ])
+        for test_name in urine["microscopy"]:
+            self._add("urine_microscopy", test_name, test_name, [
+                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
+                rf'{test_name}\s*:\s*([^.\n]+)',
+                rf'Pus\s+cells[:\s]+([^.\n]+)',
+                rf'RBCs?\s*[:\-]\s*([^.\n]+)',  # Specific for RBCs
+            ])
+        
+        # Infection screens
+        self._add("malaria", "Malaria", "Malaria", [
+            r'(?:Malaria|Malarial\s+Parasite|MP|Blood\s+Parasite)[:\s]+([^.\n]+)',
+            r'No\s+malarial\s+parasite\s+seen',
+            r'Malarial\s+Parasite[:\s]+([^.\n]+)',
+        ])
+        for antigen_info in knowledge["infection_patterns"]["widal"]["antigens"]:
+            for alias in antigen_info["aliases"]:
+                self._add("widal", antigen_info["name"], alias, [
+                    rf'{re.escape(alias)}\s*[:\-]\s*(?:1:)?(\d+|no\s+agglutination)',
+                    rf'{re.escape(alias)}\s+\([^)]+\)\s*[:\-]\s*(?:1:)?(\d+|no\s+agglutination)',
+                    rf'S\.\s+typhi\s+O\s*\(TO\)\s*[:\-]\s*(?:1:)?(\d+)' if 'O' in alias else None,
+                    rf'S\.\s+typhi\s+H\s*\(TH\)\s*[:\-]\s*(?:1:)?(\d+)' if 'H' in alias else None,
+                ])
+        
+        # Liver function
+        for test_info in knowledge["liver_patterns"]:
+            for alias in test_info["aliases"]:
+                self._add("liver", test_info["name"], alias, [
+                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|U/L)'
+                ])
+        
+        # Inflammation markers
+        for test_info in knowledge["inflammation_patterns"]:
+            for alias in test_info["aliases"]:
+                self._add("inflammation", test_info["name"], alias, [
+                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
+                    rf'C-Reactive\s+Protein\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
+                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
+                ])
 
 
 class MedicalReportRAG:
     """RAG model for medical report parsing with structured knowledge base"""
     
-    def __init__(self):
-        self.client = None
-        if OPENAI_AVAILABLE and settings.OPENAI_API_KEY:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Medical knowledge base - patterns and reference ranges
-        self.medical_knowledge = {
-            "cbc_patterns": {
-                "rbc_metrics": [
-                    {"name": "Hemoglobin", "aliases": ["Hb", "HGB", "Hemoglobin"], "unit": "g/dL", "ref_range": "13 – 17"},
-                    {"name": "PCV", "aliases": ["PCV", "Hematocrit", "HCT"], "unit": "%", "ref_range": "40 – 50"},
-                    {"name": "RBC Count", "aliases": ["RBC", "Red Blood Cell Count"], "unit": "mill/mm³", "ref_range": "4.5 – 5.5"},
-                    {"name": "MCV", "aliases": ["MCV", "Mean Corpuscular Volume"], "unit": "fL", "ref_range": "83 – 101"},
-                    {"name": "MCH", "aliases": ["MCH", "Mean Corpuscular Hemoglobin"], "unit": "pg", "ref_range": "27 – 32"},
-                    {"name": "MCHC", "aliases": ["MCHC", "Mean Corpuscular Hemoglobin Concentration"], "unit": "g/dL", "ref_range": "31.5 – 34.5"},
-                    {"name": "RDW", "aliases": ["RDW", "Red Cell Distribution Width"], "unit": "%", "ref_range": "11.6 – 14"},
-                ],
-                "wbc": {
-                    "tlc": {"name": "TLC", "aliases": ["TLC", "Total Leukocyte Count", "Total Leucocyte Count", "WBC"], "unit": "/cmm", "ref_range": "4,400 – 11,000"},
-                    "differential": ["Neutrophils", "Lymphocytes", "Monocytes", "Eosinophils", "Basophils"]
-                },
-                "platelets": [
-                    {"name": "Platelet Count", "aliases": ["Platelet", "PLT", "Thrombocyte"], "unit": "lakh/mm³", "ref_range": "1.5 – 4.5 lakh"},
-                    {"name": "MPV", "aliases": ["MPV", "Mean Platelet Volume"], "unit": "fL", "ref_range": "6.5 – 12"},
-                ],
-                "esr": {"name": "ESR", "aliases": ["ESR", "Erythrocyte Sedimentation Rate"], "unit": "mm/hr", "ref_range": "1 – 30"}
-            },
-            "urine_patterns": {
-                "physical": ["Colour", "Color", "pH", "Specific Gravity", "Appearance"],
-                "chemical": ["Glucose", "Protein", "Ketones", "Bilirubin", "Urobilinogen", "Blood", "Nitrite", "Leukocyte Esterase"],
-                "microscopy": ["RBCs", "Pus cells", "WBC", "Epithelial cells", "Crystals", "Casts", "Bacteria"]
-            },
-            "infection_patterns": {
-                "malaria": ["Malaria", "Malarial Parasite", "MP", "Blood Parasite"],
-                "widal": {
-                    "antigens": [
-                        {"name": "S. typhi O (TO)", "aliases": ["TO", "O Antigen", "S. typhi O"], "significant": "≥1:80"},
-                        {"name": "S. typhi H (TH)", "aliases": ["TH", "H Antigen", "S. typhi H"], "significant": "≥1:160"},
-                        {"name": "S. paratyphi A (AH)", "aliases": ["AH", "A Antigen", "S. paratyphi A"]},
-                        {"name": "S. paratyphi B (BH)", "aliases": ["BH", "B Antigen", "S. paratyphi B"]}
-                    ]
-                }
+    # Medical knowledge base - patterns and reference ranges
+    MEDICAL_KNOWLEDGE = {
+        "cbc_patterns": {
+            "rbc_metrics": [
+                {"name": "Hemoglobin", "aliases": ["Hb", "HGB", "Hemoglobin"], "unit": "g/dL", "ref_range": "13 – 17"},
+                {"name": "PCV", "aliases": ["PCV", "Hematocrit", "HCT"], "unit": "%", "ref_range": "40 – 50"},
+                {"name": "RBC Count", "aliases": ["RBC", "Red Blood Cell Count"], "unit": "mill/mm³", "ref_range": "4.5 – 5.5"},
+                {"name": "MCV", "aliases": ["MCV", "Mean Corpuscular Volume"], "unit": "fL", "ref_range": "83 – 101"},
+                {"name": "MCH", "aliases": ["MCH", "Mean Corpuscular Hemoglobin"], "unit": "pg", "ref_range": "27 – 32"},
+                {"name": "MCHC", "aliases": ["MCHC", "Mean Corpuscular Hemoglobin Concentration"], "unit": "g/dL", "ref_range": "31.5 – 34.5"},
+                {"name": "RDW", "aliases": ["RDW", "Red Cell Distribution Width"], "unit": "%", "ref_range": "11.6 – 14"},
+            ],
+            "wbc": {
+                "tlc": {"name": "TLC", "aliases": ["TLC", "Total Leukocyte Count", "Total Leucocyte Count", "WBC"], "unit": "/cmm", "ref_range": "4,400 – 11,000"},
+                "differential": ["Neutrophils", "Lymphocytes", "Monocytes", "Eosinophils", "Basophils"]
             },
-            "liver_patterns": [
-                {"name": "ALT / SGPT", "aliases": ["ALT", "SGPT", "Alanine Aminotransferase"], "unit": "U/L", "ref_range": "<41"},
-                {"name": "AST / SGOT", "aliases": ["AST", "SGOT", "Aspartate Aminotransferase"], "unit": "U/L", "ref_range": "10 – 40"},
+            "platelets": [
+                {"name": "Platelet Count", "aliases": ["Platelet", "PLT", "Thrombocyte"], "unit": "lakh/mm³", "ref_range": "1.5 – 4.5 lakh"},
+                {"name": "MPV", "aliases": ["MPV", "Mean Platelet Volume"], "unit": "fL", "ref_range": "6.5 – 12"},
             ],
-            "inflammation_patterns": [
-                {"name": "CRP", "aliases": ["CRP", "C-Reactive Protein"], "unit": "mg/L", "ref_range": "0 – 5"},
-            ]
-        }
+            "esr": {"name": "ESR", "aliases": ["ESR", "Erythrocyte Sedimentation Rate"], "unit": "mm/hr", "ref_range": "1 – 30"}
+        },
+        "urine_patterns": {
+            "physical": ["Colour", "Color", "pH", "Specific Gravity", "Appearance"],
+            "chemical": ["Glucose", "Protein", "Ketones", "Bilirubin", "Urobilinogen", "Blood", "Nitrite", "Leukocyte Esterase"],
+            "microscopy": ["RBCs", "Pus cells", "WBC", "Epithelial cells", "Crystals", "Casts", "Bacteria"]
+        },
+        "infection_patterns": {
+            "malaria": ["Malaria", "Malarial Parasite", "MP", "Blood Parasite"],
+            "widal": {
+                "antigens": [
+                    {"name": "S. typhi O (TO)", "aliases": ["TO", "O Antigen", "S. typhi O"], "significant": "≥1:80"},
+                    {"name": "S. typhi H (TH)", "aliases": ["TH", "H Antigen", "S. typhi H"], "significant": "≥1:160"},
+                    {"name": "S. paratyphi A (AH)", "aliases": ["AH", "A Antigen", "S. paratyphi A"]},
+                    {"name": "S. paratyphi B (BH)", "aliases": ["BH", "B Antigen", "S. paratyphi B"]}
+                ]
+            }
+        },
+        "liver_patterns": [
+            {"name": "ALT / SGPT", "aliases": ["ALT", "SGPT", "Alanine Aminotransferase"], "unit": "U/L", "ref_range": "<41"},
+            {"name": "AST / SGOT", "aliases": ["AST", "SGOT", "Aspartate Aminotransferase"], "unit": "U/L", "ref_range": "10 – 40"},
+        ],
+        "inflammation_patterns": [
+            {"name": "CRP", "aliases": ["CRP", "C-Reactive Protein"], "unit": "mg/L", "ref_range": "0 – 5"},
+        ]
+    }
+    
+    # Patient info patterns
+    NAME_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+        r'Name\s*:\s*(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][A-Z\s]+)',
+        r'(?:Name|Patient\s+Name|Patient)[:\s]+(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][A-Z\s]+)',
+        r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+Age',
+        r'Mr\.?\s+([A-Z][A-Z\s]+?)(?:\s+Age|\s+Gender|\s+Lab)',
+        r'Name\s*:\s*Mr\.?\s+([A-Z][A-Z\s]+)',
+    ]]
+    PATIENT_FIELD_PATTERNS = {key: [re.compile(pattern, re.IGNORECASE) for pattern in patterns] for key, patterns in {
+        'age': [
+            r'(?:Age|Age\s*:)[:\s]+(\d+)',
+            r'(\d+)\s+Years?\s+Gender',
+            r'Age\s*:\s*(\d+)',
+        ],
+        'gender': [
+            r'(?:Gender|Sex|Gender\s*:)[:\s]+(Male|Female|M|F)',
+            r'Gender\s*:\s*(Male|Female)',
+        ],
+        'lab_no': [
+            r'(?:Lab\s+No|Lab\s+Number|Lab\s+No\s*:)[:\s]+([A-Z0-9]+)',
+            r'Lab\s+No\.?\s*:\s*([A-Z0-9]+)',
+            r'Lab\s+No\.?\s*([A-Z0-9]+)',
+            r'Lab\s+Number\s*:\s*([A-Z0-9]+)',
+        ],
+        'sample_collected': [
+            r'(?:Sample\s+Collected|Collected|Collected\s*:)[:\s]+([\d/]+)',
+            r'Collected\s*:\s*([\d/]+)',
+            r'Reported\s*:\s*([\d/]+)',
+        ],
+    }.items()}
+    
+    # Reference range patterns: (kind, compiled) where kind is "<", ">" or "range"
+    REF_RANGE_PATTERNS = [
+        ("range", re.compile(r'\(([\d\.]+)\s*[-–]\s*([\d\.]+)')),
+        ("range", re.compile(r'([\d\.]+)\s*[-–]\s*([\d\.]+)\s*\)')),
+        ("range", re.compile(r'([\d,]+)\s*[-–]\s*([\d,]+)')),  # With commas
+        ("<", re.compile(r'<([\d\.]+)')),
+        (">", re.compile(r'>([\d\.]+)')),
+        ("range", re.compile(r'([\d\.]+)\s+to\s+([\d\.]+)')),
+    ]
+    # Reference ranges printed in the same row as the result (single-pass scanner)
+    ROW_REF_RANGE_PATTERNS = [
+        ("range", re.compile(r'([\d,]+(?:\.\d+)?)\s*[-–]\s*([\d,]+(?:\.\d+)?)')),
+        ("<", re.compile(r'<\s*([\d\.]+)')),
+        (">", re.compile(r'>\s*([\d\.]+)')),
+        ("range", re.compile(r'([\d\.]+)\s+to\s+([\d\.]+)')),
+    ]
     
-    async def parse_report(self, extracted_text: str) -> Dict[str, Any]:
-        """Parse medical report using RAG approach"""
-        if not self.client:
+    ENGINES = ("scanner", "regex")
+    
+    # Bump when extraction output (or what is stored from it, e.g. lab_results rows)
+    # changes so stored reports are re-parsed
+    PARSER_VERSION = "3"
+    
+    _registry: Optional[PatternRegistry] = None
+    _scanner: Optional[LabTableScanner] = None
+    
+    @classmethod
+    def get_registry(cls) -> PatternRegistry:
+        """Compiled pattern registry, shared by every parser instance"""
+        if cls._registry is None:
+            cls._registry = PatternRegistry(cls.MEDICAL_KNOWLEDGE)
+            logger.info(f"Built medical report pattern registry: {cls._registry.stats()}")
+        return cls._registry
+    
+    @classmethod
+    def get_scanner(cls) -> LabTableScanner:
+        """Single-pass lab table scanner, shared by every parser instance"""
+        if cls._scanner is None:
+            cls._scanner = LabTableScanner(cls.MEDICAL_KNOWLEDGE)
+        return cls._scanner
+    
+    def __init__(self, knowledge: Optional[Dict[str, Any]] = None, engine: Optional[str] = None):
+        self.llm = LLMGateway.get()
+        
+        self.engine = engine or settings.REPORT_PARSER_ENGINE
+        if self.engine not in self.ENGINES:
+            raise ValueError(f"Unknown report parser engine '{self.engine}', expected one of {self.ENGINES}")
+        
+        if knowledge is None:
+            self.medical_knowledge = self.MEDICAL_KNOWLEDGE
+            self.patterns = self.get_registry()
+            self.scanner = self.get_scanner()
+        else:
+            # Custom knowledge base (benchmarks): compiled for this instance only
+            self.medical_knowledge = knowledge
+            self.patterns = PatternRegistry(knowledge)
+            self.scanner = LabTableScanner(knowledge)
+        
+        # Per-thread: parsers are shared by the job queue's worker threads
+        self._local = threading.local()
+    
+    @classmethod
+    def parser_version(cls, engine: Optional[str] = None) -> str:
+        """Version stamp stored with parsed_data (parser version and engine)"""
+        return f"{cls.PARSER_VERSION}-{engine or settings.REPORT_PARSER_ENGINE}"
+    
+    @property
+    def last_pattern_stats(self) -> Dict[str, int]:
+        """Number of patterns run, per section, for the last report parsed on this thread"""
+        return getattr(self._local, "pattern_stats", {})
+    
+    def _search(self, section: str, pattern: Pattern, text: str):
+        """Run one precompiled pattern, counting it against the current report"""
+        stats = self.last_pattern_stats
+        stats[section] = stats.get(section, 0) + 1
+        return pattern.search(text)
+    
+    async def parse_report(self, extracted_text: str,
+                           structured_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Parse medical report using RAG approach. structured_context is the result of
+        _extract_with_knowledge_base when the caller already has it (report pipeline).
+        """
+        if not self.llm.available:
             logger.warning("OpenAI client not available, using enhanced regex parsing")
+            if structured_context is not None:
+                return self._build_final_structure(structured_context)
             return self._parse_with_enhanced_regex(extracted_text)
         
         try:
             # Step 1: Extract structured information using knowledge base
-            structured_context = self._extract_with_knowledge_base(extracted_text)
+            if structured_context is None:
+                structured_context = self._extract_with_knowledge_base(extracted_text)
             
             # Step 2: Use LLM with RAG context to refine and complete extraction
             parsed_data = await self._rag_extraction(extracted_text, structured_context)
@@ -95,6 +344,10 @@ class MedicalReportRAG:
     
     def _extract_with_knowledge_base(self, text: str) -> Dict[str, Any]:
         """Extract data using medical knowledge base patterns"""
+        self._local.pattern_stats = {}
+        if self.engine == "scanner":
+            return self._extract_with_scanner(text)
+        
         context = {
             "patient_info": self._extract_patient_info(text),
             "cbc_data": self._extract_cbc_data(text),
@@ -103,23 +356,125 @@ class MedicalReportRAG:
             "liver_data": self._extract_liver_data(text),
             "inflammation_data": self._extract_inflammation_data(text),
         }
+        logger.debug(f"Ran {sum(self.last_pattern_stats.values())} extraction patterns: {self.last_pattern_stats}")
         return context
     
+    def _extract_with_scanner(self, text: str) -> Dict[str, Any]:
+        """
+        Single-pass alternative to the per-alias regex extractors: rows are found by
+        the LabTableScanner and interpreted with the same formatting helpers, giving
+        the same context structure.
+        """
+        cbc_data = {"rbc_metrics": [], "wbc_differential": {}, "platelets": [], "esr": []}
+        diff_percent = []
+        abs_counts = []
+        urine_data = {"physical": [], "chemical": [], "microscopy": []}
+        infection_data = {"malaria": {}, "widal": []}
+        liver_data = []
+        inflammation_data = []
+        measured = {
+            "rbc_metrics": cbc_data["rbc_metrics"],
+            "platelets": cbc_data["platelets"],
+            "esr": cbc_data["esr"],
+            "liver": liver_data,
+            "inflammation": inflammation_data,
+        }
+        
+        for row in self.scanner.iter_rows(text):
+            name = row.analyte["name"]
+            
+            if row.section in measured:
+                entries = measured[row.section]
+                reading = self.scanner.read_value(row.rest)
+                if not reading or any(item["test"] == name for item in entries):
+                    continue
+                value, unit, remainder = reading
+                ref_range = self._parse_reference_range(remainder, row.analyte["ref_range"], self.ROW_REF_RANGE_PATTERNS)
+                entries.append({
+                    "test": name,
+                    "result": f"{value} {unit or row.analyte['unit']}",
+                    "reference": ref_range,
+                    "status": self._determine_status(float(value.replace(',', '')), ref_range, unit or row.analyte["unit"])
+                })
+            
+            elif row.section == "tlc":
+                reading = self.scanner.read_value(row.rest)
+                if not reading or "tlc" in cbc_data["wbc_differential"]:
+                    continue
+                value, unit, remainder = reading
+                ref_range = self._parse_reference_range(remainder, row.analyte["ref_range"], self.ROW_REF_RANGE_PATTERNS)
+                cbc_data["wbc_differential"]["tlc"] = self._format_tlc(
+                    value, unit or row.analyte["unit"], float(value.replace(',', '')), ref_range
+                )
+            
+            elif row.section == "differential":
+                reading = self.scanner.read_value(row.rest)
+                if not reading:
+                    continue
+                value, unit, _ = reading
+                counts = diff_percent if unit.startswith('%') else abs_counts if '/' in unit else None
+                if counts is not None and not any(item["type"] == name for item in counts):
+                    counts.append({"type": name, "value": value})
+            
+            elif row.section == "urine_physical":
+                if not any(item["test"] == name for item in urine_data["physical"]):
+                    urine_data["physical"].append({
+                        "test": name,
+                        "result": self._format_urine_physical(name, self.scanner.read_text(row.rest), row.line),
+                        "status": "Normal"
+                    })
+            
+            elif row.section == "urine_chemical":
+                if not any(item["test"] == name for item in urine_data["chemical"]):
+                    urine_data["chemical"].append(self._format_urine_chemical(name, self.scanner.read_text(row.rest)))
+            
+            elif row.section == "urine_microscopy":
+                entry = self._format_urine_microscopy(name, self.scanner.read_text(row.rest))
+                if not any(item["test"] == entry["test"] for item in urine_data["microscopy"]):
+                    urine_data["microscopy"].append(entry)
+            
+            elif row.section == "malaria":
+                if infection_data["malaria"]:
+                    continue
+                negative = row.label.lower() == self.scanner.NEGATIVE_MALARIA_PHRASE.lower()
+                malaria = self._format_malaria(row.label if negative else self.scanner.read_text(row.rest))
+                if malaria:
+                    infection_data["malaria"] = malaria
+            
+            elif row.section == "widal":
+                titer = self.scanner.read_titer(row.rest)
+                entry = self._format_widal(row.analyte, titer) if titer else None
+                if entry and not any(item["antigen"] == name for item in infection_data["widal"]):
+                    infection_data["widal"].append(entry)
+        
+        cbc_data["wbc_differential"]["differential_percent"] = diff_percent
+        cbc_data["wbc_differential"]["absolute_counts"] = abs_counts
+        
+        # Add "Others: Nil" if not present
+        if not any(item["test"] == "Others" for item in urine_data["microscopy"]):
+            urine_data["microscopy"].append({
+                "test": "Others",
+                "result": "Nil",
+                "status": "Normal"
+            })
+        
+        logger.debug(f"Scanned report: {self.scanner.last_scan_stats}")
+        return {
+            "patient_info": self._extract_patient_info(text),
+            "cbc_data": cbc_data,
+            "urine_data": urine_data,
+            "infection_data": infection_data,
+            "liver_data": liver_data,
+            "inflammation_data": inflammation_data,
+        }
+    
     def _extract_patient_info(self, text: str) -> Dict[str, Any]:
         """Extract patient information"""
         info = {}
         
         # Extract full name with title - improved patterns
-        name_patterns = [
-            r'Name\s*:\s*(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][A-Z\s]+)',
-            r'(?:Name|Patient\s+Name|Patient)[:\s]+(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][A-Z\s]+)',
-            r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+Age',
-            r'Mr\.?\s+([A-Z][A-Z\s]+?)(?:\s+Age|\s+Gender|\s+Lab)',
-            r'Name\s*:\s*Mr\.?\s+([A-Z][A-Z\s]+)',
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in self.NAME_PATTERNS:
+            match = self._search("patient_info", pattern, text)
             if match:
                 name = match.group(1).strip()
                 # Clean up name (remove extra words like "Age", "Gender", etc.)
@@ -145,32 +500,9 @@ class MedicalReportRAG:
                 break
         
         # Extract other info - improved patterns
-        patterns = {
-            'age': [
-                r'(?:Age|Age\s*:)[:\s]+(\d+)',
-                r'(\d+)\s+Years?\s+Gender',
-                r'Age\s*:\s*(\d+)',
-            ],
-            'gender': [
-                r'(?:Gender|Sex|Gender\s*:)[:\s]+(Male|Female|M|F)',
-                r'Gender\s*:\s*(Male|Female)',
-            ],
-            'lab_no': [
-                r'(?:Lab\s+No|Lab\s+Number|Lab\s+No\s*:)[:\s]+([A-Z0-9]+)',
-                r'Lab\s+No\.?\s*:\s*([A-Z0-9]+)',
-                r'Lab\s+No\.?\s*([A-Z0-9]+)',
-                r'Lab\s+Number\s*:\s*([A-Z0-9]+)',
-            ],
-            'sample_collected': [
-                r'(?:Sample\s+Collected|Collected|Collected\s*:)[:\s]+([\d/]+)',
-                r'Collected\s*:\s*([\d/]+)',
-                r'Reported\s*:\s*([\d/]+)',
-            ],
-        }
-        
-        for key, pattern_list in patterns.items():
+        for key, pattern_list in self.PATIENT_FIELD_PATTERNS.items():
             for pattern in pattern_list:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("patient_info", pattern, text)
                 if match:
                     value = match.group(1).strip()
                     if key == 'gender':
@@ -192,19 +524,10 @@ class MedicalReportRAG:
         # Extract RBC metrics - improved patterns
         for test_info in self.medical_knowledge["cbc_patterns"]["rbc_metrics"]:
             found = False
-            for alias in test_info["aliases"]:
-                # Multiple patterns to catch different formats
-                patterns = [
-                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|g/dl|g%|%)',
-                    rf'{re.escape(alias)}\s+(\d+(?:\.\d+)?)\s*({test_info["unit"]}|g/dl|g%|%)',
-                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|g/dl|g%|%)',
-                    rf'{re.escape(alias)}\s+Count\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(mill/mm³|million/μl)',  # For RBC Count
-                    rf'PCV\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(%|%)',  # Specific for PCV
-                    rf'Hematocrit\s*[:\-]\s*(\d+(?:\.\d+)?)\s*(%|%)',  # Alternative for PCV
-                ]
-                
+            # Multiple patterns per alias to catch different formats
+            for alias, patterns in self.patterns.get("cbc", test_info["name"]):
                 for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
+                    match = self._search("cbc", pattern, text)
                     if match:
                         value = match.group(1)
                         unit = match.group(2) if len(match.groups()) > 1 else test_info["unit"]
@@ -212,7 +535,7 @@ class MedicalReportRAG:
                         # Find reference range in context
                         test_context = self._get_test_context(text, alias, match.start(), match.end())
                         ref_range = self._find_reference_range(test_context, alias, test_info["ref_range"])
-                        status = self._determine_status(float(value), ref_range)
+                        status = self._determine_status(float(value), ref_range, unit)
                         
                         # Check if already added
                         if not any(item["test"] == test_info["name"] for item in cbc_data["rbc_metrics"]):
@@ -229,15 +552,9 @@ class MedicalReportRAG:
         
         # Extract TLC - improved patterns
         tlc_info = self.medical_knowledge["cbc_patterns"]["wbc"]["tlc"]
-        for alias in tlc_info["aliases"]:
-            patterns = [
-                rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
-                rf'{re.escape(alias)}\s+(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
-                rf'Total\s+Leukocyte\s+Count\s*[:\-]\s*(\d+(?:,\d+)?)\s*({tlc_info["unit"]}|/cmm|/mm³)',
-            ]
-            
+        for alias, patterns in self.patterns.get("cbc", tlc_info["name"]):
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("cbc", pattern, text)
                 if match:
                     value_str = match.group(1).replace(',', '')
                     value = float(value_str)
@@ -246,29 +563,7 @@ class MedicalReportRAG:
                     # Get context for reference range
                     test_context = self._get_test_context(text, alias, match.start(), match.end())
                     ref_range = self._find_reference_range(test_context, alias, tlc_info["ref_range"])
-                    status = self._determine_status(value, ref_range)
-                    
-                    # Format TLC with commas
-                    tlc_value = match.group(1)
-                    if ',' not in tlc_value:
-                        # Add comma formatting for numbers >= 1000
-                        try:
-                            num_value = int(tlc_value.replace(',', ''))
-                            if num_value >= 1000:
-                                tlc_value = f"{num_value:,}"
-                        except:
-                            pass
-                    
-                    # Format reference range with commas
-                    default_ref = tlc_info["ref_range"]
-                    if ',' not in ref_range and ref_range != default_ref:
-                        ref_range = self._format_reference_range_with_commas(ref_range)
-                    
-                    cbc_data["wbc_differential"]["tlc"] = {
-                        "result": f"{tlc_value} {unit}",
-                        "reference": ref_range,
-                        "status": status
-                    }
+                    cbc_data["wbc_differential"]["tlc"] = self._format_tlc(match.group(1), unit, value, ref_range)
                     break
             if "tlc" in cbc_data["wbc_differential"]:
                 break
@@ -276,8 +571,8 @@ class MedicalReportRAG:
         # Extract differential percentages
         diff_percent = []
         for cell_type in self.medical_knowledge["cbc_patterns"]["wbc"]["differential"]:
-            pattern = rf'{cell_type}[:\s]+(\d+(?:\.\d+)?)\s*%'
-            match = re.search(pattern, text, re.IGNORECASE)
+            _, patterns = self.patterns.get("cbc_differential_percent", cell_type)[0]
+            match = self._search("cbc", patterns[0], text)
             if match:
                 diff_percent.append({
                     "type": cell_type,
@@ -288,8 +583,8 @@ class MedicalReportRAG:
         # Extract absolute counts
         abs_counts = []
         for cell_type in self.medical_knowledge["cbc_patterns"]["wbc"]["differential"]:
-            pattern = rf'{cell_type}[:\s]+(\d+(?:,\d+)?)\s*(?:/cmm|/mm³)'
-            match = re.search(pattern, text, re.IGNORECASE)
+            _, patterns = self.patterns.get("cbc_absolute_counts", cell_type)[0]
+            match = self._search("cbc", patterns[0], text)
             if match:
                 abs_counts.append({
                     "type": cell_type,
@@ -300,22 +595,16 @@ class MedicalReportRAG:
         # Extract Platelets - improved patterns
         for test_info in self.medical_knowledge["cbc_patterns"]["platelets"]:
             found = False
-            for alias in test_info["aliases"]:
-                patterns = [
-                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|lakh|/mm³|lakh/mm³)',
-                    rf'{re.escape(alias)}\s+Count\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|lakh|/mm³|lakh/mm³)',
-                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|lakh|/mm³|lakh/mm³)',
-                ]
-                
+            for alias, patterns in self.patterns.get("cbc", test_info["name"]):
                 for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
+                    match = self._search("cbc", pattern, text)
                     if match:
                         value = match.group(1)
                         unit = match.group(2) if len(match.groups()) > 1 else test_info["unit"]
                         
                         test_context = self._get_test_context(text, alias, match.start(), match.end())
                         ref_range = self._find_reference_range(test_context, alias, test_info["ref_range"])
-                        status = self._determine_status(float(value), ref_range)
+                        status = self._determine_status(float(value), ref_range, unit)
                         
                         # Check if already added
                         if not any(item["test"] == test_info["name"] for item in cbc_data["platelets"]):
@@ -332,22 +621,16 @@ class MedicalReportRAG:
         
         # Extract ESR - improved patterns
         esr_info = self.medical_knowledge["cbc_patterns"]["esr"]
-        for alias in esr_info["aliases"]:
-            patterns = [
-                rf'{re.escape(alias)}\s*[:\-]\s*(\d+)\s*({esr_info["unit"]}|mm/hr)',
-                rf'{re.escape(alias)}\s+(\d+)\s*({esr_info["unit"]}|mm/hr)',
-                rf'Erythrocyte\s+Sedimentation\s+Rate\s*[:\-]\s*(\d+)\s*({esr_info["unit"]}|mm/hr)',
-            ]
-            
+        for alias, patterns in self.patterns.get("cbc", esr_info["name"]):
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("cbc", pattern, text)
                 if match:
                     value = match.group(1)
                     unit = match.group(2) if len(match.groups()) > 1 else esr_info["unit"]
                     
                     test_context = self._get_test_context(text, alias, match.start(), match.end())
                     ref_range = self._find_reference_range(test_context, alias, esr_info["ref_range"])
-                    status = self._determine_status(float(value), ref_range)
+                    status = self._determine_status(float(value), ref_range, unit)
                     
                     if not cbc_data["esr"]:  # Only add if not already present
                         cbc_data["esr"].append({
@@ -362,6 +645,31 @@ class MedicalReportRAG:
         
         return cbc_data
     
+    def _format_tlc(self, tlc_value: str, unit: str, value: float, ref_range: str) -> Dict[str, str]:
+        """TLC entry with comma-formatted count and reference range"""
+        status = self._determine_status(value, ref_range, unit)
+        
+        # Format TLC with commas
+        if ',' not in tlc_value:
+            # Add comma formatting for numbers >= 1000
+            try:
+                num_value = int(tlc_value.replace(',', ''))
+                if num_value >= 1000:
+                    tlc_value = f"{num_value:,}"
+            except:
+                pass
+        
+        # Format reference range with commas
+        default_ref = self.medical_knowledge["cbc_patterns"]["wbc"]["tlc"]["ref_range"]
+        if ',' not in ref_range and ref_range != default_ref:
+            ref_range = self._format_reference_range_with_commas(ref_range)
+        
+        return {
+            "result": f"{tlc_value} {unit}",
+            "reference": ref_range,
+            "status": status
+        }
+    
     def _extract_urine_data(self, text: str) -> Dict[str, Any]:
         """Extract Urine R/E data - improved to avoid duplicates"""
         urine_data = {
@@ -372,34 +680,12 @@ class MedicalReportRAG:
         
         # Extract physical - clean results
         for test_name in self.medical_knowledge["urine_patterns"]["physical"]:
-            patterns = [
-                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
-                rf'{test_name}\s*:\s*([^.\n]+)',
-                rf'pH\s*[:\-]\s*(\d+(?:\.\d+)?)',  # Specific for pH
-                rf'Specific\s+Gravity\s*[:\-]\s*(\d+(?:\.\d+)?)',  # Specific for Specific Gravity
-            ]
+            _, patterns = self.patterns.get("urine_physical", test_name)[0]
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("urine", pattern, text)
                 if match:
-                    result = match.group(1).strip()
-                    # Clean duplicate values
-                    result = self._clean_duplicate_values(result)
-                    
-                    # Special handling for pH
-                    if test_name.lower() == "ph":
-                        # Look for reference range in parentheses
-                        ph_context = self._get_test_context(text, "pH", match.start(), match.end())
-                        ref_match = re.search(r'\(([^)]+)\)', ph_context)
-                        if ref_match:
-                            result = f"{result} ({ref_match.group(1)})"
-                    else:
-                        # Remove reference ranges from result for other tests
-                        result = re.sub(r'\([^)]*\)', '', result).strip()
-                    
-                    # Format result properly
-                    if test_name.lower() in ["colour", "color"]:
-                        result = result.lower()  # "Pale yellow" not "Pale Yellow"
-                    
+                    ph_context = self._get_test_context(text, "pH", match.start(), match.end())
+                    result = self._format_urine_physical(test_name, match.group(1), ph_context)
                     if not any(item["test"] == test_name for item in urine_data["physical"]):
                         urine_data["physical"].append({
                             "test": test_name,
@@ -410,79 +696,24 @@ class MedicalReportRAG:
         
         # Extract chemical - clean results
         for test_name in self.medical_knowledge["urine_patterns"]["chemical"]:
-            patterns = [
-                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
-                rf'{test_name}\s*:\s*([^.\n]+)',
-                rf'Leukocyte\s+Esterase\s*[:\-]\s*([^.\n]+)',  # Specific for Leukocyte Esterase
-            ]
+            _, patterns = self.patterns.get("urine_chemical", test_name)[0]
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("urine", pattern, text)
                 if match:
-                    result = match.group(1).strip()
-                    # Clean duplicate values
-                    result = self._clean_duplicate_values(result)
-                    
-                    # Special handling for Blood - check if it's a number (should be "Absent")
-                    if test_name.lower() == "blood":
-                        # If result contains numbers, it's likely a misread value
-                        if re.search(r'\d+', result):
-                            result = "Absent"
-                        elif "absent" in result.lower() or "negative" in result.lower() or "nil" in result.lower():
-                            result = "Absent"
-                    
-                    # Normalize common values
-                    result_lower = result.lower()
-                    if "nil" in result_lower or "negative" in result_lower:
-                        result = "Negative"
-                    elif "absent" in result_lower:
-                        result = "Absent"
-                    elif "normal" in result_lower:
-                        result = "Normal"
-                    
+                    entry = self._format_urine_chemical(test_name, match.group(1))
                     if not any(item["test"] == test_name for item in urine_data["chemical"]):
-                        urine_data["chemical"].append({
-                            "test": test_name,
-                            "result": result,
-                            "status": "Normal" if "negative" in result.lower() or "normal" in result.lower() or "absent" in result.lower() else "Abnormal"
-                        })
+                        urine_data["chemical"].append(entry)
                     break
         
         # Extract microscopy - clean results
         for test_name in self.medical_knowledge["urine_patterns"]["microscopy"]:
-            patterns = [
-                rf'{test_name}[:\s]+([^.\n]+?)(?:\s+\(|$)',
-                rf'{test_name}\s*:\s*([^.\n]+)',
-                rf'Pus\s+cells[:\s]+([^.\n]+)',
-                rf'RBCs?\s*[:\-]\s*([^.\n]+)',  # Specific for RBCs
-            ]
+            _, patterns = self.patterns.get("urine_microscopy", test_name)[0]
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = self._search("urine", pattern, text)
                 if match:
-                    result = match.group(1).strip()
-                    # Clean duplicate values
-                    result = self._clean_duplicate_values(result)
-                    # Remove reference ranges and extra text
-                    result = re.sub(r'\([^)]*\)', '', result).strip()
-                    result = re.sub(r'\d+-\d+\s+WBC/hpf', '', result).strip()  # Remove "0-5 WBC/hpf"
-                    result = re.sub(r'\d+-\d+\s+Epi\s+cells/hpf', '', result).strip()  # Remove "0-5 Epi cells/hpf"
-                    result = result.strip()
-                    
-                    # Normalize
-                    if "nil" in result.lower() or "none" in result.lower():
-                        result = "Nil" if "nil" in result.lower() else "None"
-                    elif result == "":
-                        result = "Nil"
-                    
-                    test_key = "Pus cells (WBC)" if "pus" in test_name.lower() else test_name
-                    if test_name.lower() == "rbc":
-                        test_key = "RBCs"
-                    
-                    if not any(item["test"] == test_key for item in urine_data["microscopy"]):
-                        urine_data["microscopy"].append({
-                            "test": test_key,
-                            "result": result,
-                            "status": "Normal" if "nil" in result.lower() or "none" in result.lower() or result == "0-1" or result == "0–1" else "Abnormal"
-                        })
+                    entry = self._format_urine_microscopy(test_name, match.group(1))
+                    if not any(item["test"] == entry["test"] for item in urine_data["microscopy"]):
+                        urine_data["microscopy"].append(entry)
                     break
         
         # Add "Others: Nil" if not present
@@ -495,6 +726,84 @@ class MedicalReportRAG:
         
         return urine_data
     
+    def _format_urine_physical(self, test_name: str, result: str, ph_context: str) -> str:
+        """Clean a Urine R/E physical result"""
+        result = result.strip()
+        # Clean duplicate values
+        result = self._clean_duplicate_values(result)
+        
+        # Special handling for pH
+        if test_name.lower() == "ph":
+            # Look for reference range in parentheses
+            ref_match = re.search(r'\(([^)]+)\)', ph_context)
+            if ref_match:
+                result = f"{result} ({ref_match.group(1)})"
+        else:
+            # Remove reference ranges from result for other tests
+            result = re.sub(r'\([^)]*\)', '', result).strip()
+        
+        # Format result properly
+        if test_name.lower() in ["colour", "color"]:
+            result = result.lower()  # "Pale yellow" not "Pale Yellow"
+        
+        return result
+    
+    def _format_urine_chemical(self, test_name: str, result: str) -> Dict[str, str]:
+        """Clean and normalize a Urine R/E chemical result"""
+        result = result.strip()
+        # Clean duplicate values
+        result = self._clean_duplicate_values(result)
+        
+        # Special handling for Blood - check if it's a number (should be "Absent")
+        if test_name.lower() == "blood":
+            # If result contains numbers, it's likely a misread value
+            if re.search(r'\d+', result):
+                result = "Absent"
+            elif "absent" in result.lower() or "negative" in result.lower() or "nil" in result.lower():
+                result = "Absent"
+        
+        # Normalize common values
+        result_lower = result.lower()
+        if "nil" in result_lower or "negative" in result_lower:
+            result = "Negative"
+        elif "absent" in result_lower:
+            result = "Absent"
+        elif "normal" in result_lower:
+            result = "Normal"
+        
+        return {
+            "test": test_name,
+            "result": result,
+            "status": "Normal" if "negative" in result.lower() or "normal" in result.lower() or "absent" in result.lower() else "Abnormal"
+        }
+    
+    def _format_urine_microscopy(self, test_name: str, result: str) -> Dict[str, str]:
+        """Clean and normalize a Urine R/E microscopy result"""
+        result = result.strip()
+        # Clean duplicate values
+        result = self._clean_duplicate_values(result)
+        # Remove reference ranges and extra text
+        result = re.sub(r'\([^)]*\)', '', result).strip()
+        result = re.sub(r'\d+-\d+\s+WBC/hpf', '', result).strip()  # Remove "0-5 WBC/hpf"
+        result = re.sub(r'\d+-\d+\s+Epi\s+cells/hpf', '', result).strip()  # Remove "0-5 Epi cells/hpf"
+        result = result.strip()
+        
+        # Normalize
+        if "nil" in result.lower() or "none" in result.lower():
+            result = "Nil" if "nil" in result.lower() else "None"
+        elif result == "":
+            result = "Nil"
+        
+        test_key = "Pus cells (WBC)" if "pus" in test_name.lower() else test_name
+        if test_name.lower() == "rbc":
+            test_key = "RBCs"
+        
+        return {
+            "test": test_key,
+            "result": result,
+            "status": "Normal" if "nil" in result.lower() or "none" in result.lower() or result == "0-1" or result == "0–1" else "Abnormal"
+        }
+    
     def _clean_duplicate_values(self, text: str) -> str:
         """Remove duplicate values from text"""
         # Split by common separators
@@ -535,37 +844,18 @@ class MedicalReportRAG:
         }
         
         # Extract Malaria - improved
-        malaria_patterns = [
-            r'(?:Malaria|Malarial\s+Parasite|MP|Blood\s+Parasite)[:\s]+([^.\n]+)',
-            r'No\s+malarial\s+parasite\s+seen',
-            r'Malarial\s+Parasite[:\s]+([^.\n]+)',
-        ]
-        
+        _, malaria_patterns = self.patterns.get("malaria", "Malaria")[0]
         for pattern in malaria_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search("infection", pattern, text)
             if match:
-                if 'no malarial parasite seen' in pattern.lower():
-                    infection_data["malaria"] = {
-                        "result": "No malarial parasite seen",
-                        "status": "Negative"
-                    }
+                if 'no malarial parasite seen' in pattern.pattern.lower():
+                    infection_data["malaria"] = self._format_malaria("no malarial parasite seen")
                     break
                 else:
-                    result = match.group(1).strip() if match.groups() else ""
-                    result_lower = result.lower()
-                    if 'not seen' in result_lower or 'negative' in result_lower or 'no' in result_lower or 'nil' in result_lower:
-                        infection_data["malaria"] = {
-                            "result": "No malarial parasite seen",
-                            "status": "Negative"
-                        }
-                    elif 'parasite' in result_lower and 'identification' in result_lower:
-                        # This is likely a section header, look for actual result
+                    malaria = self._format_malaria(match.group(1).strip() if match.groups() else "")
+                    if malaria is None:
                         continue
-                    else:
-                        infection_data["malaria"] = {
-                            "result": "No malarial parasite seen" if not result or result == "" else result,
-                            "status": "Negative" if 'not seen' in result_lower or 'negative' in result_lower else "Positive"
-                        }
+                    infection_data["malaria"] = malaria
                     break
         
         # Default if not found or if result is invalid
@@ -578,68 +868,77 @@ class MedicalReportRAG:
         # Extract Widal - improved patterns
         for antigen_info in self.medical_knowledge["infection_patterns"]["widal"]["antigens"]:
             found = False
-            for alias in antigen_info["aliases"]:
-                patterns = [
-                    rf'{re.escape(alias)}\s*[:\-]\s*(?:1:)?(\d+|no\s+agglutination)',
-                    rf'{re.escape(alias)}\s+\([^)]+\)\s*[:\-]\s*(?:1:)?(\d+|no\s+agglutination)',
-                    rf'S\.\s+typhi\s+O\s*\(TO\)\s*[:\-]\s*(?:1:)?(\d+)' if 'O' in alias else None,
-                    rf'S\.\s+typhi\s+H\s*\(TH\)\s*[:\-]\s*(?:1:)?(\d+)' if 'H' in alias else None,
-                ]
-                
+            for alias, patterns in self.patterns.get("widal", antigen_info["name"]):
                 for pattern in patterns:
-                    if pattern is None:
-                        continue
-                    match = re.search(pattern, text, re.IGNORECASE)
+                    match = self._search("infection", pattern, text)
                     if match:
-                        titer = match.group(1).strip()
-                        if 'no' in titer.lower() or 'nil' in titer.lower() or 'agglutination' in titer.lower():
+                        entry = self._format_widal(antigen_info, match.group(1))
+                        if entry:
                             if not any(item["antigen"] == antigen_info["name"] for item in infection_data["widal"]):
-                                infection_data["widal"].append({
-                                    "antigen": antigen_info["name"],
-                                    "result": "No agglutination",
-                                    "significance": "Not significant",
-                                    "status": "Negative"
-                                })
+                                infection_data["widal"].append(entry)
                             found = True
-                        else:
-                            try:
-                                titer_value = f"1:{titer}"
-                                is_significant = False
-                                if "significant" in antigen_info.get("significant", ""):
-                                    threshold_match = re.search(r'≥(\d+)', antigen_info["significant"])
-                                    if threshold_match:
-                                        threshold = int(threshold_match.group(1))
-                                        is_significant = int(titer) >= threshold
-                                
-                                if not any(item["antigen"] == antigen_info["name"] for item in infection_data["widal"]):
-                                    infection_data["widal"].append({
-                                        "antigen": antigen_info["name"],
-                                        "result": titer_value,
-                                        "significance": "Significant" if is_significant else "Not significant",
-                                        "status": "Positive" if is_significant else "Negative"
-                                    })
-                                found = True
-                            except ValueError:
-                                pass
                         break
                 if found:
                     break
         
         return infection_data
     
+    def _format_malaria(self, result: str) -> Optional[Dict[str, str]]:
+        """Malaria screen entry, or None when the matched text is only a section header"""
+        result_lower = result.lower()
+        if 'not seen' in result_lower or 'negative' in result_lower or 'no' in result_lower or 'nil' in result_lower:
+            return {
+                "result": "No malarial parasite seen",
+                "status": "Negative"
+            }
+        elif 'parasite' in result_lower and 'identification' in result_lower:
+            # This is likely a section header, look for actual result
+            return None
+        return {
+            "result": "No malarial parasite seen" if not result or result == "" else result,
+            "status": "Negative" if 'not seen' in result_lower or 'negative' in result_lower else "Positive"
+        }
+    
+    def _format_widal(self, antigen_info: Dict[str, Any], titer: str) -> Optional[Dict[str, str]]:
+        """Widal antigen entry for a titer, or None if the titer is unreadable"""
+        titer = titer.strip()
+        if 'no' in titer.lower() or 'nil' in titer.lower() or 'agglutination' in titer.lower():
+            return {
+                "antigen": antigen_info["name"],
+                "result": "No agglutination",
+                "significance": "Not significant",
+                "status": "Negative"
+            }
+        try:
+            titer_value = f"1:{titer}"
+            is_significant = False
+            if "significant" in antigen_info.get("significant", ""):
+                threshold_match = re.search(r'≥(\d+)', antigen_info["significant"])
+                if threshold_match:
+                    threshold = int(threshold_match.group(1))
+                    is_significant = int(titer) >= threshold
+            
+            return {
+                "antigen": antigen_info["name"],
+                "result": titer_value,
+                "significance": "Significant" if is_significant else "Not significant",
+                "status": "Positive" if is_significant else "Negative"
+            }
+        except ValueError:
+            return None
+    
     def _extract_liver_data(self, text: str) -> List[Dict[str, Any]]:
         """Extract Liver Function data"""
         liver_data = []
         
         for test_info in self.medical_knowledge["liver_patterns"]:
-            for alias in test_info["aliases"]:
-                pattern = rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|U/L)'
-                match = re.search(pattern, text, re.IGNORECASE)
+            for alias, patterns in self.patterns.get("liver", test_info["name"]):
+                match = self._search("liver", patterns[0], text)
                 if match:
                     value = match.group(1)
                     unit = match.group(2) if len(match.groups()) > 1 else test_info["unit"]
                     ref_range = self._find_reference_range(text, alias, test_info["ref_range"])
-                    status = self._determine_status(float(value), ref_range)
+                    status = self._determine_status(float(value), ref_range, unit)
                     
                     liver_data.append({
                         "test": test_info["name"],
@@ -657,22 +956,16 @@ class MedicalReportRAG:
         
         for test_info in self.medical_knowledge["inflammation_patterns"]:
             found = False
-            for alias in test_info["aliases"]:
-                patterns = [
-                    rf'{re.escape(alias)}\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
-                    rf'C-Reactive\s+Protein\s*[:\-]\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
-                    rf'{re.escape(alias)}\s*:\s*(\d+(?:\.\d+)?)\s*({test_info["unit"]}|mg/L)',
-                ]
-                
+            for alias, patterns in self.patterns.get("inflammation", test_info["name"]):
                 for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
+                    match = self._search("inflammation", pattern, text)
                     if match:
                         value = match.group(1)
                         unit = match.group(2) if len(match.groups()) > 1 else test_info["unit"]
                         
                         test_context = self._get_test_context(text, alias, match.start(), match.end())
                         ref_range = self._find_reference_range(test_context, alias, test_info["ref_range"])
-                        status = self._determine_status(float(value), ref_range)
+                        status = self._determine_status(float(value), ref_range, unit)
                         
                         # Check if already added
                         if not any(item["test"] == test_info["name"] for item in inflammation_data):
@@ -698,56 +991,36 @@ class MedicalReportRAG:
     def _find_reference_range(self, text: str, test_name: str, default_range: str) -> str:
         """Find reference range for a test in the text"""
         # Look for reference range near the test name
-        test_context = re.search(rf'{re.escape(test_name)}[^.]{{0,300}}', text, re.IGNORECASE)
+        test_context = self._search("reference_range", self.patterns.context_pattern(test_name), text)
         if test_context:
-            context = test_context.group(0)
-            # Try to find reference range patterns - improved
-            ref_patterns = [
-                r'\(([\d\.]+)\s*[-–]\s*([\d\.]+)',
-                r'([\d\.]+)\s*[-–]\s*([\d\.]+)\s*\)',
-                r'([\d,]+)\s*[-–]\s*([\d,]+)',  # With commas
-                r'<([\d\.]+)',
-                r'>([\d\.]+)',
-                r'([\d\.]+)\s+to\s+([\d\.]+)',
-            ]
-            for pattern in ref_patterns:
-                match = re.search(pattern, context)
-                if match:
-                    if '<' in pattern:
-                        return f"<{match.group(1)}"
-                    elif '>' in pattern:
-                        return f">{match.group(1)}"
-                    else:
-                        # Clean up commas
-                        lower = match.group(1).replace(',', '')
-                        upper = match.group(2).replace(',', '')
-                        return f"{lower} – {upper}"
+            return self._parse_reference_range(test_context.group(0), default_range)
         return default_range
     
-    def _determine_status(self, value: float, ref_range: str) -> str:
-        """Determine if value is High, Low, or Normal"""
-        if ref_range.startswith('<'):
-            max_val = float(re.search(r'<([\d\.]+)', ref_range).group(1))
-            return "High" if value >= max_val else "Normal"
-        elif ref_range.startswith('>'):
-            min_val = float(re.search(r'>([\d\.]+)', ref_range).group(1))
-            return "Low" if value <= min_val else "Normal"
-        else:
-            range_match = re.search(r'([\d\.]+)\s*[-–]\s*([\d\.]+)', ref_range)
-            if range_match:
-                lower = float(range_match.group(1))
-                upper = float(range_match.group(2))
-                if value > upper:
-                    return "High"
-                elif value < lower:
-                    return "Low"
+    def _parse_reference_range(self, context: str, default_range: str, patterns: Optional[List] = None) -> str:
+        """Normalize the first reference range found in context"""
+        # Try to find reference range patterns - improved
+        for kind, pattern in patterns or self.REF_RANGE_PATTERNS:
+            match = self._search("reference_range", pattern, context)
+            if match:
+                if kind == '<':
+                    return f"<{match.group(1)}"
+                elif kind == '>':
+                    return f">{match.group(1)}"
                 else:
-                    return "Normal"
-        return "Normal"
+                    # Clean up commas
+                    lower = match.group(1).replace(',', '')
+                    upper = match.group(2).replace(',', '')
+                    return f"{lower} – {upper}"
+        return default_range
+    
+    def _determine_status(self, value: float, ref_range: str, unit: Optional[str] = None) -> str:
+        """Determine if value is High, Low, or Normal (compared in canonical units)"""
+        canonical_value, _ = UnitConverter.convert(value, unit)
+        return UnitConverter.flag(canonical_value, UnitConverter.parse_range(ref_range, unit))
     
     async def _rag_extraction(self, text: str, structured_context: Dict[str, Any]) -> Dict[str, Any]:
         """Use LLM with RAG context to refine extraction"""
-        if not self.client:
+        if not self.llm.available:
             return self._build_final_structure(structured_context)
         
         try:
@@ -810,18 +1083,16 @@ Return ONLY valid JSON in this exact structure:
 
 Return ONLY JSON, no markdown:"""
 
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
+            result_text = (await self.llm.chat(
+                "gpt-4o",
+                [
                     {"role": "system", "content": "You are a medical data extraction expert. Extract all test values accurately and return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.0,
                 response_format={"type": "json_object"},
                 max_tokens=4000
-            )
-            
-            result_text = response.choices[0].message.content.strip()
+            )).strip()
             if result_text.startswith("```json"):
                 result_text = result_text[7:]
             if result_text.startswith("```"):
@@ -0,0 +1,158 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Set
+from sqlalchemy.orm import Session
+from models import MedicalReport, LabResult
+from services.medical_report_rag import MedicalReportRAG
+from utils.patient_matching import PatientMatcher
+from utils.unit_converter import UnitConverter
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedReportStore:
+    """
+    Structured report data is parsed once and stored on the report with the
+    parser version that produced it. Readers go through ensure_parsed, which
+    returns the stored JSON and only re-parses rows left by an older parser.
+    Only the local (deterministic) parse is stored, so a parser version always
+    identifies the same output, whichever path parsed the report.
+    """
+
+    _parser: Optional[MedicalReportRAG] = None
+    _test_aliases: Optional[Dict[str, Set[str]]] = None
+
+    @staticmethod
+    def current_version() -> str:
+        return MedicalReportRAG.parser_version()
+
+    @staticmethod
+    def parse_text(text: str, structured_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Parse report text with the local (non-LLM) parser. structured_context is the
+        knowledge-base extraction of text when the caller already has it (summarize_report).
+        """
+        if ParsedReportStore._parser is None:
+            ParsedReportStore._parser = MedicalReportRAG()
+        if structured_context is not None:
+            return ParsedReportStore._parser._build_final_structure(structured_context)
+        return ParsedReportStore._parser._parse_with_enhanced_regex(text)
+
+    @staticmethod
+    def stamp(report: MedicalReport, parsed_data: Optional[Dict[str, Any]], patient_name: Optional[str] = None):
+        """
+        Store parsed_data on report with the current parser version (the caller commits).
+        parsed_data must come from parse_text (or a report stamped at the current version).
+        patient_name is PatientMatcher.extract_patient_name of the report text if the
+        caller already has it (summarize_report returns it).
+        """
+        parsed_data = dict(parsed_data or {})
+        # Name as used for patient matching, so lookups don't rescan extracted_text
+        patient_info = dict(parsed_data.get("patient_info") or {})
+        if patient_name is None:
+            patient_name = PatientMatcher.extract_patient_name(report.extracted_text or "")
+        patient_info["extracted_name"] = patient_name
+        parsed_data["patient_info"] = patient_info
+
+        report.parsed_data = parsed_data
+        report.parser_version = ParsedReportStore.current_version()
+        # Replaces the report's previous rows (delete-orphan)
+        report.lab_results = ParsedReportStore.build_lab_results(report, parsed_data)
+
+    @staticmethod
+    def is_current(report: MedicalReport) -> bool:
+        return bool(report.parsed_data) and report.parser_version == ParsedReportStore.current_version()
+
+    @staticmethod
+    def ensure_parsed(db: Session, report: MedicalReport) -> Dict[str, Any]:
+        """Stored parsed_data, re-parsing (and committing) first if it is missing or stale"""
+        if ParsedReportStore.is_current(report):
+            return report.parsed_data
+
+        # Reports still being processed get parsed_data from their job
+        if report.processing_status != "completed" or not report.extracted_text:
+            return report.parsed_data or {}
+
+        try:
+            ParsedReportStore.stamp(report, ParsedReportStore.parse_text(report.extracted_text))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error re-parsing report {report.id}: {e}")
+        return report.parsed_data or {}
+
+    @staticmethod
+    def patient_name(db: Session, report: MedicalReport) -> Optional[str]:
+        """Patient name found in the report text (stored at parse time)"""
+        return ParsedReportStore.ensure_parsed(db, report).get("patient_info", {}).get("extracted_name")
+
+    @staticmethod
+    def iter_results(parsed_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Numeric lab results of a parsed report as {"test", "result", "reference", "status"}"""
+        cbc = parsed_data.get("cbc_hemogram") or {}
+        for key in ("rbc_metrics", "platelets", "esr"):
+            yield from cbc.get(key) or []
+
+        tlc = (cbc.get("wbc_differential") or {}).get("tlc")
+        if tlc:
+            yield {"test": "TLC", **tlc}
+
+        yield from parsed_data.get("liver_function") or []
+        yield from parsed_data.get("inflammation_marker") or []
+
+    @staticmethod
+    def build_lab_results(report: MedicalReport, parsed_data: Dict[str, Any]) -> List[LabResult]:
+        """lab_results rows for the numeric results in parsed_data, in canonical units"""
+        rows = []
+        for result in ParsedReportStore.iter_results(parsed_data):
+            printed = UnitConverter.split_value(result.get("result"))
+            if printed is None:
+                continue
+            number, printed_unit = printed[0], printed[1] or result.get("unit")
+            value, unit = UnitConverter.convert(number, printed_unit)
+            # The reference is in the printed unit of the result unless it names its own
+            reference = UnitConverter.parse_range(result.get("reference"), printed_unit)
+            rows.append(LabResult(
+                patient_id=report.patient_id,
+                analyte=result["test"],
+                value=value,
+                unit=unit or None,
+                ref_low=reference.low if reference else None,
+                ref_high=reference.high if reference else None,
+                flag=result.get("status"),
+                report_date=report.report_date
+            ))
+        return rows
+
+    @staticmethod
+    def test_aliases() -> Dict[str, Set[str]]:
+        """Stored test name -> lower-case names it is known by"""
+        if ParsedReportStore._test_aliases is None:
+            knowledge = MedicalReportRAG.MEDICAL_KNOWLEDGE
+            cbc = knowledge["cbc_patterns"]
+            tests = cbc["rbc_metrics"] + cbc["platelets"] + [cbc["esr"], cbc["wbc"]["tlc"]] + \
+                knowledge["liver_patterns"] + knowledge["inflammation_patterns"]
+            ParsedReportStore._test_aliases = {
+                test["name"]: {test["name"].lower()} | {alias.lower() for alias in test["aliases"]}
+                for test in tests
+            }
+        return ParsedReportStore._test_aliases
+
+    # Words a question may add after a test name ("wbc count", "hemoglobin level")
+    GENERIC_TEST_WORDS = ("count", "counts", "level", "levels", "value", "values")
+
+    @staticmethod
+    def matching_tests(lab_test: str) -> Set[str]:
+        """
+        Stored test names matching a lab test named in a question ("RBC", "wbc count",
+        "platelets"). Names are matched against each test's aliases as a whole, so
+        "mch" doesn't also select MCHC and "count" selects nothing.
+        """
+        words = lab_test.strip().lower().split()
+        candidates = {" ".join(words)}
+        if len(words) > 1 and words[-1] in ParsedReportStore.GENERIC_TEST_WORDS:
+            candidates.add(" ".join(words[:-1]))
+        candidates |= {candidate[:-1] for candidate in candidates if candidate.endswith("s")}
+        return {
+            name for name, aliases in ParsedReportStore.test_aliases().items()
+            if candidates & aliases
+        }
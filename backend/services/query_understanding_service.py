@@ -2,64 +2,63 @@
 Query Understanding Service using OpenAI
 Understands natural language queries and extracts intent and entities
 """
+import re
 import json
 import logging
-import asyncio
+import threading
 from typing import Dict, Any, Optional
 from config import get_settings
+from services.llm_gateway import LLMGateway
+from utils.llm_response_cache import LLMResponseCache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI library not available.")
 
 
 class QueryUnderstandingService:
     """Service to understand natural language queries using OpenAI"""
     
-    def __init__(self):
-        self.client = None
-        if OPENAI_AVAILABLE and settings.OPENAI_API_KEY:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        else:
-            logger.warning("OpenAI not available or API key not set. Query understanding will be limited.")
+    MODEL = "gpt-3.5-turbo"
     
-    async def understand_query(self, query: str, mode: str = None) -> Dict[str, Any]:
-        """
-        Understand a natural language query and extract intent and entities
-        
-        Returns:
-            {
-                "intent": "get_patient_report" | "count_reports" | "list_reports" | "search_patient" | "unknown",
-                "patient_name": str | None,
-                "confidence": float
-            }
-        """
-        # CRITICAL: Check for "all people/patients" BEFORE anything else
-        query_lower = query.lower()
-        if any(phrase in query_lower for phrase in ['all people', 'all patients', 'everyone', 'everybody', 'of all people', 'of all patients']):
-            if 'report' in query_lower or 'medical' in query_lower:
-                logger.info(f"PRE-CHECK: Query contains 'all people/patients', returning list_reports immediately")
-                return {"intent": "list_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.99}
-        
-        if not self.client:
-            # Fallback to simple pattern matching
-            return self._fallback_understanding(query)
-        
-        try:
-            mode_context = ""
-            if mode == "medical_report":
-                mode_context = "The user is in Medical Report mode. Focus on understanding queries about patient reports, summaries, prescriptions, and report analysis. However, task-related queries should still be recognized."
-            elif mode == "medical_knowledge":
-                mode_context = "The user is in Medical Knowledge mode. Focus on general medical information, latest news, articles, and research. However, task-related queries should still be recognized."
-            
-            system_prompt = f"""You are a medical assistant query understanding system. 
+    # Where understand_query got its answer: local rules, the LLM response cache, OpenAI,
+    # or the rules again because the OpenAI call failed
+    TIERS = ("rules", "cache", "llm", "rules_after_error")
+    _tier_counts: Dict[str, int] = {}
+    _tier_lock = threading.Lock()
+    
+    # Lab tests and conditions the rules recognise
+    LAB_TESTS = ['rbc', 'wbc', 'hemoglobin', 'hb', 'platelet', 'glucose', 'creatinine', 'cholesterol']
+    LAB_CONDITIONS = ['low', 'high', 'less', 'more', 'decreased', 'increased', 'abnormal']
+    # A keyword rule (count, list, tasks...) that matches alongside these words is probably
+    # a mixed query ("how many patients have low hemoglobin"); "less"/"more" are too common to count
+    LAB_VALUE_PATTERN = re.compile(
+        r'\b(?:rbc|wbc|hemoglobin|hb|platelets?|glucose|creatinine|cholesterol|low|high|decreased|increased|abnormal)\b'
+    )
+    # Confidence of rule results the LLM should check: keyword rules on mixed queries, and
+    # anything relying on the greedy name regexes. Kept below QUERY_RULES_CONFIDENCE_THRESHOLD.
+    AMBIGUOUS_RULE_CONFIDENCE = 0.6
+    NAME_RULE_CONFIDENCE = 0.6
+    # Words the name regexes pick up that are never patient names
+    NOT_NAMES = {'you', 'hav', 'have', 'i', 's', 'me', 'my', 'we', 'they', 'them', 'the', 'a', 'an',
+                 'him', 'her', 'his', 'this', 'that', 'person', 'guy', 'whose', 'patent', 'all',
+                 'people', 'patients'}
+    # "of Priya Sharma", "for Mr. Sharma", "have diabetes", "with anemia": a word after these
+    # that is not in ENTITY_STOPWORDS names a patient or condition the keyword rules ignore.
+    # Capitalized words after the first ("call Rahul") are taken as names too.
+    ENTITY_CLAUSE_PATTERN = re.compile(
+        r'\b(?:of|for|have|has|having|with)\s+(?=(?P<title>(?:mr|mrs|ms|dr|miss|master)\b)?\.?\s*(?P<word>[a-z]+))',
+        re.IGNORECASE
+    )
+    CAPITALIZED_WORD_PATTERN = re.compile(r'(?<=\s)[A-Z][a-z]+\b')
+    ENTITY_STOPWORDS = NOT_NAMES | {
+        'any', 'every', 'each', 'some', 'no', 'these', 'those', 'it', 'us', 'our', 'your',
+        'their', 'everyone', 'everybody', 'patient', 'report', 'reports', 'medical', 'task',
+        'tasks', 'name', 'names', 'today', 'tomorrow', 'now', 'been', 'got', 'to', 'in', 'on',
+        'at', 'for', 'of', 'from', 'about', 'and', 'or', 'so', 'pending', 'uploaded'
+    }
+    
+    SYSTEM_PROMPT = """You are a medical assistant query understanding system. 
 {mode_context}
 
 Analyze the user's query and extract the intent and relevant entities. Be smart about understanding common variations, typos, and natural language patterns.
@@ -164,24 +163,70 @@ CRITICAL RULES:
 6. Handle typos and variations gracefully
 7. When in doubt about intent, prioritize count_reports, list_reports, and get_all_patient_names over get_patient_report
 """
+    
+    def __init__(self):
+        self.llm = LLMGateway.get()
+        if not self.llm.available:
+            logger.warning("OpenAI not available or API key not set. Query understanding will be limited.")
+    
+    async def understand_query(self, query: str, mode: str = None) -> Dict[str, Any]:
+        """
+        Understand a natural language query and extract intent and entities.
+        Local rules answer first; OpenAI is only asked when their confidence is
+        below QUERY_RULES_CONFIDENCE_THRESHOLD.
+        
+        Returns:
+            {
+                "intent": "get_patient_report" | "count_reports" | "list_reports" | "search_patient" | "unknown",
+                "patient_name": str | None,
+                "confidence": float
+            }
+        """
+        # CRITICAL: Check for "all people/patients" BEFORE anything else
+        query_lower = query.lower()
+        if any(phrase in query_lower for phrase in ['all people', 'all patients', 'everyone', 'everybody', 'of all people', 'of all patients']):
+            if 'report' in query_lower or 'medical' in query_lower:
+                logger.info(f"PRE-CHECK: Query contains 'all people/patients', returning list_reports immediately")
+                self._record_tier("rules")
+                return {"intent": "list_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.99}
+        
+        # Tier 1: local rules; only queries they aren't confident about go to OpenAI
+        local_result = self._fallback_understanding(query)
+        if not self.llm.available or local_result.get("confidence", 0) >= settings.QUERY_RULES_CONFIDENCE_THRESHOLD:
+            self._record_tier("rules")
+            return local_result
+        
+        try:
+            mode_context = ""
+            if mode == "medical_report":
+                mode_context = "The user is in Medical Report mode. Focus on understanding queries about patient reports, summaries, prescriptions, and report analysis. However, task-related queries should still be recognized."
+            elif mode == "medical_knowledge":
+                mode_context = "The user is in Medical Knowledge mode. Focus on general medical information, latest news, articles, and research. However, task-related queries should still be recognized."
+            
+            system_prompt = self.SYSTEM_PROMPT.format(mode_context=mode_context)
 
-            # Run OpenAI call in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
+            # Phrasings already classified are answered from the response cache
+            cache_key = LLMResponseCache.make_key("query_understanding", self.MODEL, system_prompt, query, mode)
+            result = LLMResponseCache.get(cache_key)
+            if result is not None:
+                logger.info(f"Query understanding result (cached): {result}")
+                self._record_tier("cache")
+            else:
+                content = await self.llm.chat(
+                    self.MODEL,
+                    [
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": query}
                     ],
                     temperature=0.1,  # Lower temperature for more consistent results
                     response_format={"type": "json_object"}
                 )
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            logger.info(f"Query understanding result: {result}")
+                
+                result = json.loads(content)
+                logger.info(f"Query understanding result: {result}")
+                # Cached before post-processing, which runs again on every hit
+                LLMResponseCache.put(cache_key, result, "query_understanding", self.MODEL)
+                self._record_tier("llm")
             
             # Post-process to ensure common words are not treated as patient names
             if result.get("patient_name"):
@@ -227,51 +272,96 @@ CRITICAL RULES:
             
         except Exception as e:
             logger.error(f"Error understanding query with OpenAI: {e}")
-            return self._fallback_understanding(query)
+            self._record_tier("rules_after_error")
+            return local_result
+    
+    @classmethod
+    def _record_tier(cls, tier: str):
+        with cls._tier_lock:
+            cls._tier_counts[tier] = cls._tier_counts.get(tier, 0) + 1
+    
+    @classmethod
+    def routing_stats(cls) -> Dict[str, Any]:
+        """Queries answered by each tier since startup and their share of traffic"""
+        with cls._tier_lock:
+            counts = {tier: cls._tier_counts.get(tier, 0) for tier in cls.TIERS}
+        total = sum(counts.values())
+        return {
+            "total": total,
+            "counts": counts,
+            "share": {tier: round(count / total, 3) if total else 0.0 for tier, count in counts.items()},
+            "confidence_threshold": settings.QUERY_RULES_CONFIDENCE_THRESHOLD
+        }
+    
+    def _rule_confidence(self, confidence: float, query: str) -> float:
+        """Confidence of a keyword rule, lowered when the query also mentions lab values or names"""
+        if self.LAB_VALUE_PATTERN.search(query.lower()) or self._mentions_entity(query):
+            return min(confidence, self.AMBIGUOUS_RULE_CONFIDENCE)
+        return confidence
+    
+    def _mentions_entity(self, query: str) -> bool:
+        """Whether the query names a patient or a condition the keyword rules would ignore"""
+        clause_words = [
+            "" if match.group("title") else match.group("word").lower()
+            for match in self.ENTITY_CLAUSE_PATTERN.finditer(query)
+        ]
+        capitalized_words = [word.lower() for word in self.CAPITALIZED_WORD_PATTERN.findall(query)]
+        return any(word not in self.ENTITY_STOPWORDS for word in clause_words + capitalized_words)
+    
+    @staticmethod
+    def _has_word(query_lower: str, *words: str) -> bool:
+        """Whole-word (or plural) match of any of the keywords, so 'all' does not match "call" """
+        return bool(re.search(r'\b(?:' + '|'.join(map(re.escape, words)) + r')s?\b', query_lower))
+    
+    def _is_name(self, candidate: Optional[str]) -> bool:
+        """False for what the name regexes capture from "of him", "with them", "this person"..."""
+        return bool(candidate) and not all(word in self.NOT_NAMES for word in candidate.lower().split())
     
     def _fallback_understanding(self, query: str) -> Dict[str, Any]:
-        """Fallback pattern matching when OpenAI is not available"""
+        """
+        Pattern matching used before (or instead of) OpenAI. Keyword rules without
+        entities are confident unless the query also mentions lab values; results
+        that depend on extracting a name are never confident enough to skip OpenAI.
+        """
         query_lower = query.lower()
         
-        import re
-        
         # CRITICAL: Check for "all people/patients" FIRST - before anything else
-        if any(phrase in query_lower for phrase in ['all people', 'all patients', 'everyone', 'everybody', 'of all people', 'of all patients']):
-            if 'report' in query_lower or 'medical' in query_lower:
+        if self._has_word(query_lower, 'all people', 'all patients', 'everyone', 'everybody'):
+            if self._has_word(query_lower, 'report', 'medical'):
                 return {"intent": "list_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.99}
         
         # Check for count queries (before patient name extraction)
-        if 'how many' in query_lower and ('report' in query_lower or 'medical' in query_lower):
-            return {"intent": "count_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.9}
+        if self._has_word(query_lower, 'how many') and self._has_word(query_lower, 'report', 'medical'):
+            return {"intent": "count_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.9, query)}
         
         # Check for patient count queries
-        if 'how many' in query_lower and ('patient' in query_lower or 'patients' in query_lower):
-            return {"intent": "count_patients", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.9}
+        if self._has_word(query_lower, 'how many') and self._has_word(query_lower, 'patient'):
+            return {"intent": "count_patients", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.9, query)}
         
         # Check for list reports queries
-        if ('list' in query_lower or 'show' in query_lower or 'provide me' in query_lower) and 'report' in query_lower:
-            if 'all' in query_lower:
-                return {"intent": "list_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.95}
+        if self._has_word(query_lower, 'list', 'show', 'provide me') and self._has_word(query_lower, 'report'):
+            if self._has_word(query_lower, 'all'):
+                return {"intent": "list_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.95, query)}
         
         # Check for patient name queries - improved patterns
         patient_name_query_patterns = [
-            ('all' in query_lower or 'names' in query_lower or 'name' in query_lower) and 'patient' in query_lower,
-            'tell me' in query_lower and 'name' in query_lower and 'patient' in query_lower,
-            'what are' in query_lower and ('name' in query_lower or 'names' in query_lower) and 'patient' in query_lower,
-            'list' in query_lower and 'patient' in query_lower and 'name' in query_lower,
-            'show' in query_lower and 'patient' in query_lower and ('name' in query_lower or 'names' in query_lower),
-            'whose' in query_lower and 'medical report' in query_lower and ('name' in query_lower or 'names' in query_lower),
+            self._has_word(query_lower, 'all', 'name') and self._has_word(query_lower, 'patient'),
+            self._has_word(query_lower, 'tell me') and self._has_word(query_lower, 'name') and self._has_word(query_lower, 'patient'),
+            self._has_word(query_lower, 'what are') and self._has_word(query_lower, 'name') and self._has_word(query_lower, 'patient'),
+            self._has_word(query_lower, 'list') and self._has_word(query_lower, 'patient') and self._has_word(query_lower, 'name'),
+            self._has_word(query_lower, 'show') and self._has_word(query_lower, 'patient') and self._has_word(query_lower, 'name'),
+            self._has_word(query_lower, 'whose') and self._has_word(query_lower, 'medical report') and self._has_word(query_lower, 'name'),
         ]
         
         if any(patient_name_query_patterns):
-            return {"intent": "get_all_patient_names", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.9}
+            return {"intent": "get_all_patient_names", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.9, query)}
         
         # Check for medical analysis queries (analyze_medical_report)
         analysis_patterns = [
-            'medical analysis' in query_lower,
-            'analyze' in query_lower and ('this' in query_lower or 'him' in query_lower or 'her' in query_lower or 'person' in query_lower or 'guy' in query_lower),
-            'analysis' in query_lower and ('this' in query_lower or 'him' in query_lower or 'her' in query_lower or 'person' in query_lower or 'guy' in query_lower),
-            'provide' in query_lower and 'medical analysis' in query_lower
+            self._has_word(query_lower, 'medical analysis'),
+            self._has_word(query_lower, 'analyze') and self._has_word(query_lower, 'this', 'him', 'her', 'person', 'guy'),
+            self._has_word(query_lower, 'analysis') and self._has_word(query_lower, 'this', 'him', 'her', 'person', 'guy'),
+            self._has_word(query_lower, 'provide') and self._has_word(query_lower, 'medical analysis')
         ]
         
         if any(analysis_patterns):
@@ -286,29 +376,32 @@ CRITICAL RULES:
                 name_match = re.search(r'(?:of|for)\s+([A-Z][a-zA-Z\s]+?)(?:\s+medical|\s+analysis|$)', query, re.IGNORECASE)
                 if name_match:
                     patient_name = name_match.group(1).strip()
+            if not self._is_name(patient_name):
+                patient_name = None
             
-            return {"intent": "analyze_medical_report", "patient_name": patient_name, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.85}
+            confidence = self.NAME_RULE_CONFIDENCE if patient_name else self._rule_confidence(0.85, query)
+            return {"intent": "analyze_medical_report", "patient_name": patient_name, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": confidence}
         
         # Check for patient analysis queries (what's wrong)
-        if ('wrong' in query_lower or 'problem' in query_lower or 'issue' in query_lower) and 'patient' in query_lower:
+        if self._has_word(query_lower, 'wrong', 'problem', 'issue') and self._has_word(query_lower, 'patient'):
             # Try to extract patient name
             patient_match = re.search(r'(?:with|for|patient)\s+([A-Z][a-zA-Z\s]+)', query, re.IGNORECASE)
             patient_name = patient_match.group(1).strip() if patient_match else None
-            return {"intent": "analyze_patient", "patient_name": patient_name, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.8}
+            if not self._is_name(patient_name):
+                patient_name = None
+            return {"intent": "analyze_patient", "patient_name": patient_name, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self.NAME_RULE_CONFIDENCE}
         
         # Check for lab value queries
-        lab_tests = ['rbc', 'wbc', 'hemoglobin', 'hb', 'platelet', 'glucose', 'creatinine', 'cholesterol']
-        lab_conditions = ['low', 'high', 'less', 'more', 'decreased', 'increased', 'abnormal']
         found_lab_test = None
         found_condition = None
         
-        for test in lab_tests:
-            if test in query_lower:
+        for test in self.LAB_TESTS:
+            if self._has_word(query_lower, test):
                 found_lab_test = test.upper()
                 break
         
-        for condition in lab_conditions:
-            if condition in query_lower:
+        for condition in self.LAB_CONDITIONS:
+            if self._has_word(query_lower, condition):
                 found_condition = condition
                 break
         
@@ -316,30 +409,30 @@ CRITICAL RULES:
             return {"intent": "find_patients_by_lab_value", "patient_name": None, "task_name": None, "lab_test": found_lab_test, "lab_condition": found_condition, "confidence": 0.7}
         
         # Check for task queries - prioritize get_all_tasks and get_pending_tasks
-        if 'pending' in query_lower and 'task' in query_lower:
-            return {"intent": "get_pending_tasks", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.8}
+        if self._has_word(query_lower, 'pending') and self._has_word(query_lower, 'task'):
+            return {"intent": "get_pending_tasks", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.8, query)}
         
         # Check for "get_all_tasks" - look for patterns asking about all tasks
         is_get_all_tasks = any([
-            ('all' in query_lower or 'tell me' in query_lower or 'what are' in query_lower or 'what' in query_lower) and 'task' in query_lower,
-            'task' in query_lower and ('have' in query_lower or 'i have' in query_lower or 'do i have' in query_lower),
-            'show me' in query_lower and 'task' in query_lower,
-            'list' in query_lower and 'task' in query_lower
+            self._has_word(query_lower, 'all', 'tell me', 'what') and self._has_word(query_lower, 'task'),
+            self._has_word(query_lower, 'task') and self._has_word(query_lower, 'have'),
+            self._has_word(query_lower, 'show me') and self._has_word(query_lower, 'task'),
+            self._has_word(query_lower, 'list') and self._has_word(query_lower, 'task')
         ])
         
-        if is_get_all_tasks and not ('pending' in query_lower or 'completed' in query_lower or 'specific' in query_lower):
-            return {"intent": "get_all_tasks", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.85}
+        if is_get_all_tasks and not self._has_word(query_lower, 'pending', 'completed', 'specific'):
+            return {"intent": "get_all_tasks", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.85, query)}
         
-        if ('add' in query_lower or 'create' in query_lower or 'new' in query_lower) and 'task' in query_lower:
-            return {"intent": "create_task", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.8}
+        if self._has_word(query_lower, 'add', 'create', 'new') and self._has_word(query_lower, 'task'):
+            return {"intent": "create_task", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.8, query)}
         
         # Check for upload medical reports queries
-        if ('upload' in query_lower or 'add' in query_lower) and ('medical report' in query_lower or ('report' in query_lower and 'task' not in query_lower)):
-            return {"intent": "upload_medical_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": 0.85}
+        if self._has_word(query_lower, 'upload', 'add') and (self._has_word(query_lower, 'medical report') or (self._has_word(query_lower, 'report') and not self._has_word(query_lower, 'task'))):
+            return {"intent": "upload_medical_reports", "patient_name": None, "task_name": None, "lab_test": None, "lab_condition": None, "confidence": self._rule_confidence(0.85, query)}
         
         # Check for task search (specific task name) - only if it's clearly a search for a specific task
         # This should be a descriptive task name, not a general question
-        if 'task' in query_lower and not ('all' in query_lower or 'pending' in query_lower or 'completed' in query_lower or 'what' in query_lower or 'tell me' in query_lower or 'show me' in query_lower or 'list' in query_lower or 'have' in query_lower):
+        if self._has_word(query_lower, 'task') and not self._has_word(query_lower, 'all', 'pending', 'completed', 'what', 'tell me', 'show me', 'list', 'have'):
             # Extract task name from query
             task_name = query.strip()
             return {"intent": "search_task", "patient_name": None, "task_name": task_name, "lab_test": None, "lab_condition": None, "confidence": 0.7}
@@ -347,10 +440,10 @@ CRITICAL RULES:
         # Check for patient report queries (only if not a count query, not list_reports, and not a get_all_patient_names query)
         # Skip if this looks like a "get all patient names" query OR "list all reports" query
         is_get_all_names = any([
-            ('name' in query_lower or 'names' in query_lower) and 'patient' in query_lower and ('all' in query_lower or 'tell me' in query_lower or 'what are' in query_lower or 'list' in query_lower or 'show' in query_lower or 'whose' in query_lower)
+            self._has_word(query_lower, 'name') and self._has_word(query_lower, 'patient') and self._has_word(query_lower, 'all', 'tell me', 'what are', 'list', 'show', 'whose')
         ])
         
-        is_list_all_reports = any(phrase in query_lower for phrase in ['all people', 'all patients', 'everyone', 'everybody', 'of all people', 'of all patients'])
+        is_list_all_reports = self._has_word(query_lower, 'all people', 'all patients', 'everyone', 'everybody')
         
         patient_name = None
         if not is_get_all_names and not is_list_all_reports:
@@ -379,12 +472,12 @@ CRITICAL RULES:
         
         # Determine intent
         # If we already determined it's list_reports or count_reports, use that
-        if is_list_all_reports and ('report' in query_lower or 'medical' in query_lower):
+        if is_list_all_reports and self._has_word(query_lower, 'report', 'medical'):
             intent = "list_reports"
             patient_name = None
         elif patient_name and has_title:
             intent = "get_patient_report"
-        elif ('find' in query_lower or 'search' in query_lower) and 'patient' in query_lower:
+        elif self._has_word(query_lower, 'find', 'search') and self._has_word(query_lower, 'patient'):
             intent = "search_patient"
             # Try to extract patient name
             match = re.search(r'patient.*?([A-Z][a-zA-Z\s]+)', query, re.IGNORECASE)
@@ -399,6 +492,6 @@ CRITICAL RULES:
             "task_name": None,
             "lab_test": None,
             "lab_condition": None,
-            "confidence": 0.7 if patient_name else 0.5
+            "confidence": self.NAME_RULE_CONFIDENCE if patient_name else 0.5
         }
 
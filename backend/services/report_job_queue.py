@@ -0,0 +1,231 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from models import MedicalReport, ReportJob
+from services.parsed_report_store import ParsedReportStore
+from services.llm_gateway import LLMGateway
+from services.report_summarizer import ReportSummarizer
+from utils.extraction_cache import ExtractionCache
+from utils.extraction_pool import ExtractionPool
+from utils.patient_matching import PatientMatcher
+from utils.pdf_processor import PDFProcessor
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ReportJobQueue:
+    """
+    In-process report processing queue.
+
+    Jobs are persisted in the report_jobs table so the queue survives restarts;
+    a bounded thread pool runs extraction, patient matching and summarisation
+    outside the request/event loop, each job with its own DB session. A job that
+    raises is retried after REPORT_JOB_RETRY_DELAY_SECONDS until it has been tried
+    REPORT_JOB_MAX_ATTEMPTS times.
+    """
+
+    ACTIVE_STATUSES = ("queued", "processing")
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.REPORT_JOB_WORKERS
+        self.summarizer = ReportSummarizer()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker pool and requeue jobs interrupted by a previous shutdown"""
+        self._ensure_executor()
+        self._recover_jobs()
+        logger.info(f"Report job queue started with {self.max_workers} workers")
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker pool; unfinished jobs stay queued in the database"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+        logger.info("Report job queue stopped")
+
+    def enqueue(self, db: Session, report_id: int) -> ReportJob:
+        """Create a job for report_id and hand it to the worker pool"""
+        job = ReportJob(report_id=report_id, status="queued", stage="queued", progress=0, attempts=0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._submit(job.id)
+        return job
+
+    @staticmethod
+    def get_latest_job(db: Session, report_id: int) -> Optional[ReportJob]:
+        """Most recent job for a report, if any"""
+        return db.query(ReportJob).filter(
+            ReportJob.report_id == report_id
+        ).order_by(ReportJob.id.desc()).first()
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="report-job"
+                )
+            return self._executor
+
+    def _submit(self, job_id: int):
+        self._ensure_executor().submit(self._run_job, job_id)
+
+    def _recover_jobs(self):
+        """Requeue jobs left queued or mid-processing when the app last stopped"""
+        db = SessionLocal()
+        try:
+            jobs = db.query(ReportJob).filter(ReportJob.status.in_(self.ACTIVE_STATUSES)).all()
+            job_ids = []
+            for job in jobs:
+                if (job.attempts or 0) >= settings.REPORT_JOB_MAX_ATTEMPTS:
+                    self._mark_failed(db, job, "Exceeded maximum processing attempts")
+                    continue
+                job.status = "queued"
+                job.stage = "queued"
+                job_ids.append(job.id)
+            db.commit()
+
+            for job_id in job_ids:
+                self._submit(job_id)
+            if job_ids:
+                logger.info(f"Requeued {len(job_ids)} unfinished report jobs")
+        except Exception as e:
+            logger.error(f"Error recovering report jobs: {e}")
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: int):
+        db = SessionLocal()
+        try:
+            job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+            if not job or job.status not in self.ACTIVE_STATUSES:
+                return
+
+            report = db.query(MedicalReport).filter(MedicalReport.id == job.report_id).first()
+            if not report:
+                self._mark_failed(db, job, "Report not found")
+                db.commit()
+                return
+
+            job.status = "processing"
+            job.attempts = (job.attempts or 0) + 1
+            job.started_at = datetime.now()
+            report.processing_status = "processing"
+            db.commit()  # The attempt counts even if processing fails below
+            cached = ExtractionCache.get(db, report.file_hash)
+
+            # Link the report to a patient if the uploader didn't pick one. Patient details
+            # sit in the header, so for an uncached PDF only page one is read here.
+            patient_name = None
+            if not report.patient_id:
+                self._set_stage(db, job, "matching_patient", 10)
+                if cached:
+                    header_text = PDFProcessor.join_pages(cached["pages"][:1])
+                elif (report.file_type or "").lower() == ".pdf":
+                    header_text = PDFProcessor.join_pages(
+                        ExtractionPool.extract_pages(report.file_path, report.file_type, header_only=True)
+                    )
+                else:
+                    header_text = ""
+                patient_name = PatientMatcher.extract_patient_name(header_text)
+                if patient_name:
+                    report.patient_id = PatientMatcher.find_or_create_patient(db, patient_name)
+            self._set_stage(db, job, "extracting", 30)
+
+            # Reuse a cached extraction for byte-identical files; otherwise extract in the
+            # process pool so OCR-heavy batches use every core
+            if cached:
+                extracted_text = cached["text"]
+            else:
+                pages = ExtractionPool.extract_pages(report.file_path, report.file_type)
+                extracted_text = PDFProcessor.join_pages(pages)
+                ExtractionCache.put(db, report.file_hash, extracted_text, pages)
+            report.extracted_text = extracted_text
+
+            # Name not on page one (or an image upload): fall back to the full text
+            if not report.patient_id and not patient_name:
+                patient_name = PatientMatcher.extract_patient_name(extracted_text)
+                if patient_name:
+                    report.patient_id = PatientMatcher.find_or_create_patient(db, patient_name)
+            self._set_stage(db, job, "summarizing", 60)
+
+            # Parse and summarise (summarizer is async; this thread has no running loop)
+            result = LLMGateway.get().run(self.summarizer.summarize_report(extracted_text, report.report_type or "lab"))
+            report.ai_summary = result.get("summary", "")
+            report.ai_key_findings = result.get("key_findings", [])
+            report.ai_abnormal_values = result.get("abnormal_values", [])
+            report.summary_version = ReportSummarizer.SUMMARY_VERSION
+            # Stored parse is the local one (the same as a re-parse at this parser version), built
+            # from the knowledge-base extraction the summarizer already ran; parsed_data may be LLM-refined
+            ParsedReportStore.stamp(
+                report,
+                ParsedReportStore.parse_text(extracted_text, result.get("structured_context")),
+                result.get("patient_name")
+            )
+
+            report.processing_status = "completed"
+            job.status = "completed"
+            job.stage = "completed"
+            job.progress = 100
+            job.error = None
+            job.finished_at = datetime.now()
+            db.commit()
+            logger.info(f"Processed report {report.id} (job {job.id})")
+
+        except Exception as e:
+            logger.error(f"Error processing report job {job_id}: {e}")
+            db.rollback()
+            try:
+                job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+                if job and (job.attempts or 0) < settings.REPORT_JOB_MAX_ATTEMPTS:
+                    # Transient OCR/OpenAI errors: try again later
+                    job.status = "queued"
+                    job.stage = "queued"
+                    job.error = str(e)
+                    db.commit()
+                    self._retry_later(job.id)
+                elif job:
+                    self._mark_failed(db, job, str(e))
+                    db.commit()
+            except Exception as mark_error:
+                logger.error(f"Could not mark report job {job_id} as failed: {mark_error}")
+        finally:
+            db.close()
+
+    def _retry_later(self, job_id: int):
+        """Resubmit a failed job after the retry delay (it stays queued in the database meanwhile)"""
+        def resubmit():
+            with self._lock:
+                running = self._executor is not None
+            if running:  # After shutdown the job is picked up by _recover_jobs on the next start
+                self._submit(job_id)
+
+        timer = threading.Timer(settings.REPORT_JOB_RETRY_DELAY_SECONDS, resubmit)
+        timer.daemon = True
+        timer.start()
+        logger.info(f"Retrying report job {job_id} in {settings.REPORT_JOB_RETRY_DELAY_SECONDS}s")
+
+    @staticmethod
+    def _set_stage(db: Session, job: ReportJob, stage: str, progress: int):
+        job.stage = stage
+        job.progress = progress
+        db.commit()
+
+    @staticmethod
+    def _mark_failed(db: Session, job: ReportJob, error: str):
+        job.status = "failed"
+        job.error = error
+        job.finished_at = datetime.now()
+        report = db.query(MedicalReport).filter(MedicalReport.id == job.report_id).first()
+        if report:
+            report.processing_status = "failed"
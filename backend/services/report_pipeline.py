@@ -0,0 +1,64 @@
+"""
+Single-pass report analysis: a report is tokenised once into a ReportDocument
+and a list of named stages runs over it, each reading the document and the
+results of earlier stages
+"""
+import time
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReportDocument:
+    """Report text and the views of it shared by every stage"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.lines = text.split('\n')
+
+
+class PipelineStage(NamedTuple):
+    name: str  # Key of the stage's result in the context
+    run: Callable[[ReportDocument, Dict[str, Any]], Any]  # (document, context) -> result
+
+
+class ReportPipeline:
+    """
+    Runs stages in order over one ReportDocument. Each stage's return value is
+    stored in the context under its name for later stages; stages can be added,
+    replaced or removed by name, and every run reports per-stage timings.
+    """
+
+    def __init__(self, stages: Optional[List[PipelineStage]] = None):
+        self.stages: List[PipelineStage] = list(stages or [])
+
+    def names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    def add(self, stage: PipelineStage, before: Optional[str] = None) -> "ReportPipeline":
+        """Append a stage, or insert it before the named one; an existing stage of the same name is replaced"""
+        if stage.name in self.names() and before is None:
+            self.stages[self.names().index(stage.name)] = stage
+            return self
+        self.remove(stage.name)
+        index = self.names().index(before) if before is not None else len(self.stages)
+        self.stages.insert(index, stage)
+        return self
+
+    def remove(self, name: str) -> "ReportPipeline":
+        self.stages = [stage for stage in self.stages if stage.name != name]
+        return self
+
+    def run(self, text: str, **inputs) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """(context, milliseconds per stage); inputs seed the context (e.g. report_type)"""
+        document = ReportDocument(text)
+        context: Dict[str, Any] = dict(inputs)
+        timings: Dict[str, float] = {}
+        for stage in self.stages:
+            start = time.perf_counter()
+            context[stage.name] = stage.run(document, context)
+            timings[stage.name] = (time.perf_counter() - start) * 1000
+        logger.debug(f"Report pipeline timings (ms): {timings}")
+        return context, timings
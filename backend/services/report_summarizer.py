@@ -1,49 +1,122 @@
-import pdfplumber
+import re
 import pytesseract
 from PIL import Image
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import json
 from config import get_settings
+from database import SessionLocal
+from services.lab_flagger import LabFlagger
+from services.llm_gateway import LLMGateway
+from services.report_pipeline import PipelineStage, ReportPipeline
+from utils.extraction_cache import ExtractionCache
+from utils.patient_matching import PatientMatcher
+from utils.pdf_processor import PDFProcessor
+from utils.upload_storage import UploadStorage
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI library not available. Falling back to regex parsing.")
-
 
 class ReportSummarizer:
+    # Bump when summarize_report output changes so stored summaries are regenerated
+    SUMMARY_VERSION = "1"
+    
+    # Normal reference ranges for common tests (first key contained in a test name wins)
+    REFERENCE_RANGES = {
+        'hemoglobin': (12.0, 17.5, 'g/dL'),
+        'hb': (12.0, 17.5, 'g/dL'),
+        'rbc': (4.5, 5.5, 'million/μL'),
+        'wbc': (4000, 11000, '/μL'),
+        'platelet': (150000, 450000, '/μL'),
+        'glucose': (70, 100, 'mg/dL'),
+        'blood glucose': (70, 100, 'mg/dL'),
+        'creatinine': (0.6, 1.2, 'mg/dL'),
+        'urea': (15, 50, 'mg/dL'),
+        'total cholesterol': (0, 200, 'mg/dL'),
+        'hdl': (40, 60, 'mg/dL'),
+        'ldl': (0, 100, 'mg/dL'),
+        'triglycerides': (0, 150, 'mg/dL'),
+        'hba1c': (4.0, 5.7, '%'),
+        'sgot': (10, 40, 'U/L'),
+        'sgpt': (10, 40, 'U/L'),
+        'bilirubin': (0.2, 1.2, 'mg/dL'),
+        'tsh': (0.4, 4.0, 'mIU/L'),
+        't3': (80, 200, 'ng/dL'),
+        't4': (4.5, 11.5, 'μg/dL'),
+        'vitamin d': (30, 100, 'ng/mL'),
+        'vitamin b12': (200, 900, 'pg/mL'),
+        'ferritin': (15, 150, 'ng/mL'),
+    }
+    
+    # Key findings: sentences mentioning one of these status words
+    SENTENCE_PATTERN = re.compile(r'[^.!?]+')
+    STATUS_WORD_PATTERN = re.compile(r'high|low|elevated|decreased|abnormal|abnormality', re.IGNORECASE)
+    LETTER_PATTERN = re.compile(r'[A-Z]', re.IGNORECASE)
+    
+    _flagger: Optional[LabFlagger] = None
+    
+    @classmethod
+    def get_flagger(cls) -> LabFlagger:
+        """Batch flagger over REFERENCE_RANGES, shared by every summarizer instance"""
+        if cls._flagger is None:
+            cls._flagger = LabFlagger(cls.REFERENCE_RANGES)
+        return cls._flagger
+    
     def __init__(self):
-        pass
+        self._pipeline: Optional[ReportPipeline] = None
     
     async def extract_text_from_pdf(self, file_path: str) -> str:
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text.strip()
+            cached = self._get_cached_extraction(file_path)
+            if cached is not None:
+                return cached
+            
+            pages = list(PDFProcessor.iter_pages(file_path))
+            text = PDFProcessor.join_pages(pages)
+            self._cache_extraction(file_path, text, pages)
+            return text
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             return ""
     
     async def extract_text_from_image(self, file_path: str) -> str:
         try:
+            cached = self._get_cached_extraction(file_path)
+            if cached is not None:
+                return cached
+            
             image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+            text = pytesseract.image_to_string(PDFProcessor.preprocess_for_ocr(image)).strip()
+            self._cache_extraction(file_path, text, [text] if text else [])
+            return text
         except Exception as e:
             logger.error(f"Error extracting text from image: {e}")
             return ""
     
+    def _get_cached_extraction(self, file_path: str):
+        """Look up a previous extraction of this file's content in the extraction cache"""
+        try:
+            db = SessionLocal()
+            try:
+                cached = ExtractionCache.get(db, UploadStorage.hash_file(file_path))
+                return cached["text"] if cached else None
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"Extraction cache lookup failed: {e}")
+            return None
+    
+    def _cache_extraction(self, file_path: str, text: str, pages: List[str]):
+        try:
+            db = SessionLocal()
+            try:
+                ExtractionCache.put(db, UploadStorage.hash_file(file_path), text, pages)
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"Could not cache extraction for {file_path}: {e}")
+    
     async def summarize_report(self, extracted_text: str, report_type: str) -> Dict[str, Any]:
         if not extracted_text:
             return {
@@ -53,63 +126,94 @@ class ReportSummarizer:
                 "recommendations": ["Try uploading a clearer image or PDF", "Ensure the file is not password protected"]
             }
         
-        import re
-        from typing import Tuple
+        context, timings = self.get_pipeline().run(extracted_text, report_type=report_type)
+        lab_values = context["lab_values"]
+        abnormal_values, normal_values = context["flags"]
         
-        text_lower = extracted_text.lower()
-        text_original = extracted_text
+        # Parse into structured categories - Use RAG model first, then fallback
+        parsed_data = None
+        try:
+            from services.medical_report_rag import MedicalReportRAG
+            rag_parser = MedicalReportRAG()
+            # Knowledge-base extraction already ran as a pipeline stage
+            parsed_data = await rag_parser.parse_report(extracted_text, context["structured_context"])
+            if parsed_data and isinstance(parsed_data, dict):
+                logger.info("Successfully parsed report using RAG model")
+            else:
+                parsed_data = None
+        except Exception as e:
+            logger.warning(f"RAG parsing failed: {e}, falling back to OpenAI/regex")
+            parsed_data = None
+        
+        # Fallback to OpenAI/regex if RAG failed
+        if not parsed_data or not isinstance(parsed_data, dict):
+            parsed_data = await self._parse_with_openai(extracted_text)
+            regex_data = self._parse_into_categories(extracted_text, extracted_text.lower(), lab_values, abnormal_values, normal_values)
         
-        # Extract actual lab values with their test names, values, units, and reference ranges
-        lab_values = self._extract_lab_values(text_original, text_lower)
+        # If RAG parsing failed, use fallback
+        if not parsed_data or not isinstance(parsed_data, dict):
+            logger.warning("RAG parsing failed, using fallback methods")
+            if 'regex_data' not in locals():
+                regex_data = self._parse_into_categories(extracted_text, extracted_text.lower(), lab_values, abnormal_values, normal_values)
+            parsed_data = regex_data
+            logger.info("Using regex-based parsing as fallback")
+        
+        return {
+            "summary": context["summary"],
+            "key_findings": context["key_findings"],
+            "abnormal_values": abnormal_values,
+            "normal_values": normal_values[:10],  # Show first 10 normal values
+            "recommendations": context["recommendations"],
+            "report_type": report_type,
+            "total_tests_found": len(lab_values),
+            "abnormal_count": len(abnormal_values),
+            "normal_count": len(normal_values),
+            "parsed_data": parsed_data,
+            "patient_name": context["patient_name"],
+            "structured_context": context["structured_context"],
+            "stage_timings_ms": timings
+        }
+    
+    def get_pipeline(self) -> ReportPipeline:
+        """
+        Analysis stages of summarize_report, run over one tokenised copy of the
+        report. Built once per summarizer; add or replace stages by name to extend it.
+        """
+        if self._pipeline is None:
+            from services.medical_report_rag import MedicalReportRAG
+            parser = MedicalReportRAG()
+            self._pipeline = ReportPipeline([
+                PipelineStage("patient_name", lambda doc, ctx: PatientMatcher.extract_patient_name(doc.text)),
+                PipelineStage("lab_values", lambda doc, ctx: self._extract_lab_values(doc.text, doc.lower, doc.lines)),
+                PipelineStage("flags", lambda doc, ctx: self._classify_lab_values(ctx["lab_values"])),
+                PipelineStage("key_findings", lambda doc, ctx: self._extract_key_findings(
+                    doc.text, doc.lower, ctx["lab_values"], ctx["flags"][0])),
+                PipelineStage("summary", lambda doc, ctx: self._generate_meaningful_summary(
+                    ctx["report_type"], ctx["lab_values"], *ctx["flags"])),
+                PipelineStage("recommendations", lambda doc, ctx: self._generate_recommendations(
+                    ctx["report_type"], ctx["flags"][0], ctx["key_findings"])),
+                PipelineStage("structured_context", lambda doc, ctx: parser._extract_with_knowledge_base(doc.text)),
+            ])
+        return self._pipeline
+    
+    def _classify_lab_values(self, lab_values: Dict[str, Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """(abnormal values, normal values) of the extracted lab values"""
         abnormal_values = []
         normal_values = []
-        key_findings = []
-        recommendations = []
         
-        # Normal reference ranges for common tests
-        reference_ranges = {
-            'hemoglobin': (12.0, 17.5, 'g/dL'),
-            'hb': (12.0, 17.5, 'g/dL'),
-            'rbc': (4.5, 5.5, 'million/μL'),
-            'wbc': (4000, 11000, '/μL'),
-            'platelet': (150000, 450000, '/μL'),
-            'glucose': (70, 100, 'mg/dL'),
-            'blood glucose': (70, 100, 'mg/dL'),
-            'creatinine': (0.6, 1.2, 'mg/dL'),
-            'urea': (15, 50, 'mg/dL'),
-            'total cholesterol': (0, 200, 'mg/dL'),
-            'hdl': (40, 60, 'mg/dL'),
-            'ldl': (0, 100, 'mg/dL'),
-            'triglycerides': (0, 150, 'mg/dL'),
-            'hba1c': (4.0, 5.7, '%'),
-            'sgot': (10, 40, 'U/L'),
-            'sgpt': (10, 40, 'U/L'),
-            'bilirubin': (0.2, 1.2, 'mg/dL'),
-            'tsh': (0.4, 4.0, 'mIU/L'),
-            't3': (80, 200, 'ng/dL'),
-            't4': (4.5, 11.5, 'μg/dL'),
-            'vitamin d': (30, 100, 'ng/mL'),
-            'vitamin b12': (200, 900, 'pg/mL'),
-            'ferritin': (15, 150, 'ng/mL'),
-        }
+        # Flag every value against the reference ranges in one batch
+        flags = self.get_flagger().flag_batch([lab_values])[0]
         
         # Analyze extracted values
-        for test_name, value_info in lab_values.items():
-            test_lower = test_name.lower()
+        for test_flag in flags:
+            test_name = test_flag.test
+            value_info = lab_values[test_name]
             value = value_info['value']
             unit = value_info.get('unit', '')
             
-            # Find matching reference range
-            matched_range = None
-            for ref_key, (min_val, max_val, ref_unit) in reference_ranges.items():
-                if ref_key in test_lower:
-                    matched_range = (min_val, max_val, ref_unit)
-                    break
-            
-            if matched_range:
-                min_ref, max_ref, ref_unit = matched_range
-                if value < min_ref:
-                    status = "LOW"
+            if test_flag.reference_key:
+                min_ref, max_ref, ref_unit = self.REFERENCE_RANGES[test_flag.reference_key]
+                if test_flag.status == "Low":
                     abnormal_values.append({
                         "test": test_name,
                         "value": f"{value} {unit}",
@@ -117,8 +221,7 @@ class ReportSummarizer:
                         "status": "Low",
                         "interpretation": f"{test_name} is below the normal reference range"
                     })
-                elif value > max_ref:
-                    status = "HIGH"
+                elif test_flag.status == "High":
                     abnormal_values.append({
                         "test": test_name,
                         "value": f"{value} {unit}",
@@ -127,7 +230,6 @@ class ReportSummarizer:
                         "interpretation": f"{test_name} is above the normal reference range"
                     })
                 else:
-                    status = "NORMAL"
                     normal_values.append({
                         "test": test_name,
                         "value": f"{value} {unit}",
@@ -148,57 +250,10 @@ class ReportSummarizer:
                         "value": f"{value} {unit}"
                     })
         
-        # Extract key findings from text patterns
-        key_findings = self._extract_key_findings(text_original, text_lower, lab_values, abnormal_values)
-        
-        # Generate meaningful summary
-        summary = self._generate_meaningful_summary(report_type, lab_values, abnormal_values, normal_values)
-        
-        # Generate recommendations based on findings
-        recommendations = self._generate_recommendations(report_type, abnormal_values, key_findings)
-        
-        # Parse into structured categories - Use RAG model first, then fallback
-        parsed_data = None
-        try:
-            from services.medical_report_rag import MedicalReportRAG
-            rag_parser = MedicalReportRAG()
-            parsed_data = await rag_parser.parse_report(extracted_text)
-            if parsed_data and isinstance(parsed_data, dict):
-                logger.info("Successfully parsed report using RAG model")
-            else:
-                parsed_data = None
-        except Exception as e:
-            logger.warning(f"RAG parsing failed: {e}, falling back to OpenAI/regex")
-            parsed_data = None
-        
-        # Fallback to OpenAI/regex if RAG failed
-        if not parsed_data or not isinstance(parsed_data, dict):
-            parsed_data = await self._parse_with_openai(extracted_text)
-            regex_data = self._parse_into_categories(text_original, text_lower, lab_values, abnormal_values, normal_values)
-        
-        # If RAG parsing failed, use fallback
-        if not parsed_data or not isinstance(parsed_data, dict):
-            logger.warning("RAG parsing failed, using fallback methods")
-            if 'regex_data' not in locals():
-                regex_data = self._parse_into_categories(text_original, text_lower, lab_values, abnormal_values, normal_values)
-            parsed_data = regex_data
-            logger.info("Using regex-based parsing as fallback")
-        
-        return {
-            "summary": summary,
-            "key_findings": key_findings,
-            "abnormal_values": abnormal_values,
-            "normal_values": normal_values[:10],  # Show first 10 normal values
-            "recommendations": recommendations,
-            "report_type": report_type,
-            "total_tests_found": len(lab_values),
-            "abnormal_count": len(abnormal_values),
-            "normal_count": len(normal_values),
-            "parsed_data": parsed_data
-        }
+        return abnormal_values, normal_values
     
-    def _extract_lab_values(self, text_original: str, text_lower: str) -> Dict[str, Dict]:
-        """Extract lab test names and their values from the report"""
+    def _extract_lab_values(self, text_original: str, text_lower: str, lines: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Extract lab test names and their values from the report (lines: text_original split on newlines)"""
         import re
         lab_values = {}
         
@@ -210,7 +265,8 @@ class ReportSummarizer:
             (r'(hemoglobin|hb|rbc|wbc|platelet|glucose|creatinine|urea|cholesterol|hdl|ldl|triglycerides|hba1c|sgot|sgpt|bilirubin|tsh|t3|t4|vitamin\s+d|vitamin\s+b12|ferritin)[\s:]+(\d+(?:\.\d+)?)\s*([a-zA-Z/%]+)?', 'named_test'),
         ]
         
-        lines = text_original.split('\n')
+        if lines is None:
+            lines = text_original.split('\n')
         
         for line in lines:
             line_lower = line.lower().strip()
@@ -327,20 +383,20 @@ class ReportSummarizer:
         
         # Extract specific medical findings from text
         finding_patterns = [
-            (r'([A-Z][^.!?]*?(?:high|low|elevated|decreased|abnormal|abnormality)[^.!?]*)', 'status_finding'),
             (r'(impression[:\s]+[^.!?]+)', 'impression'),
             (r'(diagnosis[:\s]+[^.!?]+)', 'diagnosis'),
             (r'(recommendation[:\s]+[^.!?]+)', 'recommendation'),
         ]
         
         import re
+        candidates = self._find_status_sentences(text_original)
         for pattern, pattern_type in finding_patterns:
-            matches = re.finditer(pattern, text_original, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                finding_text = match.group(1).strip()
-                if len(finding_text) > 20 and len(finding_text) < 200:  # Reasonable length
-                    if finding_text not in findings:
-                        findings.append(finding_text)
+            candidates.extend(match.group(1) for match in re.finditer(pattern, text_original, re.IGNORECASE | re.MULTILINE))
+        for candidate in candidates:
+            finding_text = candidate.strip()
+            if len(finding_text) > 20 and len(finding_text) < 200:  # Reasonable length
+                if finding_text not in findings:
+                    findings.append(finding_text)
         
         # If no specific findings, create meaningful ones from extracted data
         if not findings and lab_values:
@@ -352,6 +408,21 @@ class ReportSummarizer:
         
         return findings[:8]  # Limit to 8 key findings
     
+    def _find_status_sentences(self, text: str) -> List[str]:
+        """
+        Each sentence (text between '.', '!' and '?') that mentions a status word,
+        from its first letter on. Same result as searching the text with
+        [A-Z][^.!?]*?(?:high|low|...)[^.!?]* but checks each sentence once
+        instead of backtracking from every letter.
+        """
+        sentences = []
+        for sentence in self.SENTENCE_PATTERN.finditer(text):
+            first_letter = self.LETTER_PATTERN.search(text, sentence.start(), sentence.end())
+            # The status word has to start after the first letter
+            if first_letter and self.STATUS_WORD_PATTERN.search(text, first_letter.start() + 1, sentence.end()):
+                sentences.append(text[first_letter.start():sentence.end()])
+        return sentences
+    
     def _generate_meaningful_summary(self, report_type: str, lab_values: Dict, abnormal_values: List, normal_values: List) -> str:
         """Generate a doctor-friendly summary"""
         summary_parts = []
@@ -418,12 +489,12 @@ class ReportSummarizer:
     
     async def _parse_with_openai(self, extracted_text: str) -> Dict[str, Any]:
         """Use OpenAI API to parse medical report with high accuracy"""
-        if not OPENAI_AVAILABLE or not settings.OPENAI_API_KEY:
+        llm = LLMGateway.get()
+        if not llm.available:
             logger.warning("OpenAI not available or API key not set. Falling back to regex parsing.")
             return None
         
         try:
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
             
             # Truncate text if too long, but keep important parts
             text_to_analyze = extracted_text[:20000] if len(extracted_text) > 20000 else extracted_text
@@ -678,18 +749,16 @@ EXAMPLE OUTPUT STRUCTURE (fill with actual data from report):
 
 Now extract ALL data from the provided report and return the JSON:"""
 
-            response = client.chat.completions.create(
-                model="gpt-4o",  # Using gpt-4o for better accuracy in medical data extraction
-                messages=[
+            result_text = (await llm.chat(
+                "gpt-4o",  # Using gpt-4o for better accuracy in medical data extraction
+                [
                     {"role": "system", "content": "You are a medical data extraction expert specializing in lab reports. Extract ALL test values, results, reference ranges, and patient information with 100% accuracy. Return only valid JSON without any markdown formatting or code blocks."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.0,  # Zero temperature for maximum consistency
                 response_format={"type": "json_object"},  # Force JSON response
                 max_tokens=4000  # Allow enough tokens for complete extraction
-            )
-            
-            result_text = response.choices[0].message.content.strip()
+            )).strip()
             
             # Remove markdown code blocks if present
             if result_text.startswith("```json"):
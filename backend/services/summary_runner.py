@@ -0,0 +1,211 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from models import MedicalReport, SummaryRun
+from services.llm_gateway import LLMGateway
+from services.report_summarizer import ReportSummarizer
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SummaryRunner:
+    """
+    Bulk re-summarisation of reports whose AI fields are missing or were produced
+    by an older ReportSummarizer.SUMMARY_VERSION.
+
+    A run walks the archive in report id order. Each batch is summarised in a
+    thread pool and committed together with the run's cursor and counters, so
+    progress is visible in summary_runs and a run interrupted by a crash or
+    shutdown resumes after its last committed batch. batch_size, workers and
+    throttle_seconds are re-read before every batch, so a run can be slowed down,
+    paused or cancelled while it is going.
+    """
+
+    ACTIVE_STATUSES = ("running", "paused")
+
+    def __init__(self):
+        self.summarizer = ReportSummarizer()
+        self._threads: Dict[int, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @staticmethod
+    def stale_filter() -> Tuple:
+        """Completed reports with text whose summary is missing or from an older summarizer"""
+        return (
+            MedicalReport.processing_status == "completed",
+            MedicalReport.extracted_text.isnot(None),
+            MedicalReport.extracted_text != "",
+            or_(
+                MedicalReport.ai_summary.is_(None),
+                MedicalReport.ai_summary == "",
+                MedicalReport.summary_version.is_(None),
+                MedicalReport.summary_version != ReportSummarizer.SUMMARY_VERSION
+            )
+        )
+
+    def create_run(self, db: Session, batch_size: Optional[int] = None, workers: Optional[int] = None,
+                   throttle_seconds: Optional[float] = None) -> SummaryRun:
+        """Record a new run; raises ValueError if another run is still active"""
+        active = db.query(SummaryRun).filter(SummaryRun.status.in_(self.ACTIVE_STATUSES)).first()
+        if active:
+            raise ValueError(f"Summary run {active.id} is still {active.status}")
+
+        run = SummaryRun(
+            status="running",
+            cursor_report_id=0,
+            total=db.query(MedicalReport.id).filter(*self.stale_filter()).count(),
+            processed=0,
+            failed=0,
+            batch_size=batch_size or settings.RESUMMARIZE_BATCH_SIZE,
+            workers=workers or settings.RESUMMARIZE_WORKERS,
+            throttle_seconds=settings.RESUMMARIZE_THROTTLE_SECONDS if throttle_seconds is None else throttle_seconds,
+            started_at=datetime.now()
+        )
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        return run
+
+    def start(self, db: Session, **options) -> SummaryRun:
+        """Create a run and process it on a background thread"""
+        run = self.create_run(db, **options)
+        self._launch(run.id)
+        return run
+
+    def recover(self):
+        """Continue runs left running when the app last stopped"""
+        self._stopping.clear()
+        db = SessionLocal()
+        try:
+            run_ids = [run.id for run in db.query(SummaryRun).filter(SummaryRun.status == "running").all()]
+        finally:
+            db.close()
+        for run_id in run_ids:
+            logger.info(f"Resuming summary run {run_id}")
+            self._launch(run_id)
+
+    def shutdown(self):
+        """Stop after the current batch; runs stay "running" and resume on next start"""
+        self._stopping.set()
+
+    def set_status(self, db: Session, run: SummaryRun, status: str) -> SummaryRun:
+        """Pause, resume or cancel a run"""
+        if run.status not in self.ACTIVE_STATUSES:
+            raise ValueError(f"Summary run {run.id} is already {run.status}")
+        run.status = status
+        if status == "cancelled":
+            run.finished_at = datetime.now()
+        db.commit()
+        db.refresh(run)
+        if status == "running":
+            self._launch(run.id)
+        return run
+
+    @staticmethod
+    def progress(run: SummaryRun) -> Dict[str, Any]:
+        done = (run.processed or 0) + (run.failed or 0)
+        elapsed = ((run.finished_at or datetime.now()) - run.started_at).total_seconds() if run.started_at else 0
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max((run.total or 0) - done, 0)
+        return {
+            "id": run.id,
+            "status": run.status,
+            "total": run.total,
+            "processed": run.processed,
+            "failed": run.failed,
+            "percent": round(100 * done / run.total, 1) if run.total else 100.0,
+            "reports_per_second": round(rate, 2),
+            "eta_seconds": round(remaining / rate) if rate and run.status == "running" else None,
+            "cursor_report_id": run.cursor_report_id,
+            "batch_size": run.batch_size,
+            "workers": run.workers,
+            "throttle_seconds": run.throttle_seconds,
+            "error": run.error,
+            "created_at": run.created_at,
+            "started_at": run.started_at,
+            "finished_at": run.finished_at
+        }
+
+    def _launch(self, run_id: int):
+        with self._lock:
+            thread = self._threads.get(run_id)
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(target=self.run, args=(run_id,), name=f"summary-run-{run_id}", daemon=True)
+            self._threads[run_id] = thread
+            thread.start()
+
+    def run(self, run_id: int):
+        """Process a run until it completes, is paused/cancelled or the runner stops"""
+        db = SessionLocal()
+        try:
+            while not self._stopping.is_set():
+                run = db.query(SummaryRun).filter(SummaryRun.id == run_id).first()
+                if not run or run.status != "running":
+                    return
+
+                batch = db.query(MedicalReport).filter(
+                    *self.stale_filter(),
+                    MedicalReport.id > (run.cursor_report_id or 0)
+                ).order_by(MedicalReport.id).limit(run.batch_size or settings.RESUMMARIZE_BATCH_SIZE).all()
+
+                if not batch:
+                    run.status = "completed"
+                    run.finished_at = datetime.now()
+                    db.commit()
+                    logger.info(f"Summary run {run_id} completed: {run.processed} summarised, {run.failed} failed")
+                    return
+
+                results = self._summarize_batch(batch, run.workers or settings.RESUMMARIZE_WORKERS)
+                for report, result in zip(batch, results):
+                    if result is None:
+                        run.failed = (run.failed or 0) + 1
+                        continue
+                    report.ai_summary = result.get("summary", "")
+                    report.ai_key_findings = result.get("key_findings", [])
+                    report.ai_abnormal_values = result.get("abnormal_values", [])
+                    report.summary_version = ReportSummarizer.SUMMARY_VERSION
+                    run.processed = (run.processed or 0) + 1
+                run.cursor_report_id = batch[-1].id
+                db.commit()
+                # Summarised rows hold the full report text; don't keep them in the session
+                for report in batch:
+                    db.expunge(report)
+
+                if run.throttle_seconds:
+                    self._stopping.wait(run.throttle_seconds)
+
+        except Exception as e:
+            logger.error(f"Summary run {run_id} failed: {e}")
+            db.rollback()
+            run = db.query(SummaryRun).filter(SummaryRun.id == run_id).first()
+            if run:
+                run.status = "failed"
+                run.error = str(e)
+                run.finished_at = datetime.now()
+                db.commit()
+        finally:
+            db.close()
+
+    def _summarize_batch(self, reports: List[MedicalReport], workers: int) -> List[Optional[Dict[str, Any]]]:
+        """summarize_report for each report; None where it failed"""
+        jobs = [(report.id, report.extracted_text, report.report_type or "lab") for report in reports]
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="summary-run") as executor:
+            return list(executor.map(self._summarize_one, jobs))
+
+    def _summarize_one(self, job: Tuple[int, str, str]) -> Optional[Dict[str, Any]]:
+        report_id, extracted_text, report_type = job
+        try:
+            # Summarizer is async; worker threads have no running loop
+            return LLMGateway.get().run(self.summarizer.summarize_report(extracted_text, report_type))
+        except Exception as e:
+            logger.warning(f"Could not summarise report {report_id}: {e}")
+            return None
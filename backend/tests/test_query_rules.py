@@ -0,0 +1,113 @@
+"""
+The local rules in QueryUnderstandingService answer chat queries without OpenAI
+when they are confident. Whatever they are confident about must agree with the
+examples the OpenAI prompt gives; everything else has to be left to the model.
+"""
+import re
+import json
+import pytest
+from config import get_settings
+from services.query_understanding_service import QueryUnderstandingService
+
+settings = get_settings()
+
+EXAMPLE_PATTERN = re.compile(r'^\s*- "([^"]+)" -> (\{\{.*?\}\})', re.MULTILINE)
+PROMPT_EXAMPLES = [
+    (query, json.loads(expected.replace("{{", "{").replace("}}", "}")))
+    for query, expected in EXAMPLE_PATTERN.findall(QueryUnderstandingService.SYSTEM_PROMPT)
+]
+
+# Keyword and entity mixed in one query: the rules must not answer these on their own
+MIXED_QUERIES = [
+    "how many patients have low hemoglobin",
+    "list all reports with low platelets",
+    "which patients have high WBC and what is wrong with them",
+    "what is the problem with patient rajesh in his report",
+]
+
+# A keyword rule fits, but the query also names a patient or condition the rule would drop
+ENTITY_QUERIES = [
+    "add a task to call Rahul tomorrow",
+    "show all reports of Priya Sharma",
+    "show all reports of priya sharma",
+    "what tasks do I have for Rahul",
+    "upload report for Mr. Sharma",
+    "how many patients have diabetes",
+    "list all reports with anemia",
+]
+
+
+@pytest.fixture(scope="module")
+def service():
+    return QueryUnderstandingService()
+
+
+def is_confident(result):
+    return result["confidence"] >= settings.QUERY_RULES_CONFIDENCE_THRESHOLD
+
+
+def test_prompt_has_examples():
+    assert len(PROMPT_EXAMPLES) >= 40
+
+
+@pytest.mark.parametrize("query,expected", PROMPT_EXAMPLES, ids=[query for query, _ in PROMPT_EXAMPLES])
+def test_confident_rules_agree_with_prompt_examples(service, query, expected):
+    result = service._fallback_understanding(query)
+    if not is_confident(result):
+        return  # Left to OpenAI
+    assert result["intent"] == expected["intent"]
+    if expected.get("patient_name") is None:
+        assert result["patient_name"] is None
+
+
+@pytest.mark.parametrize("query", [
+    "how many medical reports",
+    "show me all reports",
+    "list all patient names",
+    "tell me all the tasks",
+    "upload medical reports",
+])
+def test_unambiguous_queries_skip_openai(service, query):
+    assert is_confident(service._fallback_understanding(query))
+
+
+@pytest.mark.parametrize("query", MIXED_QUERIES)
+def test_mixed_queries_go_to_openai(service, query):
+    assert not is_confident(service._fallback_understanding(query))
+
+
+@pytest.mark.parametrize("query", ENTITY_QUERIES)
+def test_queries_naming_entities_go_to_openai(service, query):
+    assert not is_confident(service._fallback_understanding(query))
+
+
+@pytest.mark.parametrize("query,intent", [
+    ("add a task to call the lab", "create_task"),
+    ("what tasks do I have", "get_all_tasks"),
+    ("show all reports for me", "list_reports"),
+])
+def test_keywords_match_whole_words(service, query, intent):
+    result = service._fallback_understanding(query)
+    assert result["intent"] == intent
+    assert is_confident(result)
+
+
+@pytest.mark.parametrize("query", [
+    "what is the medical report of Mr. John Doe",
+    "please provide me a medical analysis of this Mr. rahul",
+    "what is wrong with patient Rajesh",
+    "find patient Smith",
+])
+def test_extracted_names_are_never_confident(service, query):
+    result = service._fallback_understanding(query)
+    assert result["patient_name"]
+    assert not is_confident(result)
+
+
+@pytest.mark.parametrize("query", [
+    "please provide me medical analysis of him",
+    "medical analysis of this person",
+    "which patients have high WBC and what is wrong with them",
+])
+def test_pronouns_are_not_patient_names(service, query):
+    assert service._fallback_understanding(query)["patient_name"] is None
@@ -0,0 +1,134 @@
+import logging
+import os
+from typing import Iterable, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import MedicalReport, ReportBlob
+from utils.upload_storage import UploadStorage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Content-addressed storage for report files.
+
+    Files live at UPLOAD_DIR/blobs/<h[0:2]>/<h[2:4]>/<hash><ext>, so byte-identical
+    uploads share one file. ReportBlob.ref_count tracks how many reports point at
+    each blob and the file is only removed when the last reference is released:
+    release() returns the orphaned path and delete_files() removes it after commit.
+    Reports stored before blobs existed keep their original paths.
+    """
+
+    @staticmethod
+    def blob_path(file_hash: str, file_ext: str) -> str:
+        """Path for a blob derived from its content hash"""
+        return os.path.join(settings.UPLOAD_DIR, "blobs", file_hash[:2], file_hash[2:4], f"{file_hash}{file_ext}")
+
+    @staticmethod
+    def _increment(db: Session, file_hash: str, **values) -> bool:
+        """Take a reference in SQL so concurrent uploads can't lose one; False if the row is gone"""
+        updated = db.query(ReportBlob).filter(ReportBlob.file_hash == file_hash).update(
+            {ReportBlob.ref_count: func.coalesce(ReportBlob.ref_count, 0) + 1, **values},
+            synchronize_session="fetch"
+        )
+        return updated > 0
+
+    @staticmethod
+    def store(db: Session, temp_path: str, file_hash: str, file_size: int, file_ext: str) -> str:
+        """
+        Store a streamed upload as a blob and take a reference to it.
+        If the content is already stored, the temp file is discarded and no bytes are written.
+        The caller commits the session together with the report row.
+        """
+        blob = db.query(ReportBlob).filter(ReportBlob.file_hash == file_hash).first()
+
+        if blob and os.path.exists(blob.file_path) and BlobStore._increment(db, file_hash):
+            UploadStorage.discard(temp_path)
+            return blob.file_path
+
+        file_path = BlobStore.blob_path(file_hash, file_ext)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        UploadStorage.commit(temp_path, file_path)
+
+        # Row survived but the file went missing: restore it
+        if blob and BlobStore._increment(db, file_hash, file_path=file_path, file_size=file_size):
+            return file_path
+
+        try:
+            # Savepoint: a concurrent upload of the same content may insert the row first
+            with db.begin_nested():
+                db.add(ReportBlob(file_hash=file_hash, file_path=file_path, file_size=file_size, ref_count=1))
+        except IntegrityError:
+            if not BlobStore._increment(db, file_hash, file_path=file_path, file_size=file_size):
+                raise
+        return file_path
+
+    @staticmethod
+    def get_blob(db: Session, file_path: str) -> Optional[ReportBlob]:
+        if not file_path:
+            return None
+        return db.query(ReportBlob).filter(ReportBlob.file_path == file_path).first()
+
+    @staticmethod
+    def add_reference(db: Session, file_path: str) -> bool:
+        """Take another reference to the blob at file_path (no-op for legacy paths)"""
+        blob = BlobStore.get_blob(db, file_path)
+        if not blob:
+            return False
+        return BlobStore._increment(db, blob.file_hash)
+
+    @staticmethod
+    def release(db: Session, report: MedicalReport) -> Optional[str]:
+        """
+        Drop the reference held by a report that is about to be deleted.
+        Returns the file path if nothing points at it anymore; pass it to
+        delete_files once the session has been committed, so a rolled back
+        delete doesn't leave reports without their files.
+        """
+        file_path = report.file_path
+        if not file_path:
+            return None
+
+        blob = BlobStore.get_blob(db, file_path)
+        if blob:
+            db.query(ReportBlob).filter(ReportBlob.id == blob.id).update(
+                {ReportBlob.ref_count: func.coalesce(ReportBlob.ref_count, 0) - 1},
+                synchronize_session="fetch"
+            )
+            # Only the release that takes the count to zero removes the row
+            removed = db.query(ReportBlob).filter(
+                ReportBlob.id == blob.id,
+                ReportBlob.ref_count <= 0
+            ).delete(synchronize_session="fetch")
+            if not removed:
+                return None
+        else:
+            # Legacy per-upload path: only delete if no other report shares the file
+            other_reports_with_same_file = db.query(MedicalReport).filter(
+                MedicalReport.file_path == file_path,
+                MedicalReport.id != report.id
+            ).count()
+            if other_reports_with_same_file > 0:
+                return None
+        return file_path
+
+    @staticmethod
+    def delete_files(db: Session, file_paths: Iterable[Optional[str]]) -> int:
+        """
+        Remove files returned by release after the commit. A path that a new
+        upload has stored again in the meantime is kept. Returns the number of files deleted.
+        """
+        deleted = 0
+        for file_path in file_paths:
+            if not file_path or BlobStore.get_blob(db, file_path) or not os.path.exists(file_path):
+                continue
+            try:
+                os.remove(file_path)
+                deleted += 1
+            except Exception as e:
+                logger.warning(f"Could not delete file {file_path}: {e}")
+        return deleted
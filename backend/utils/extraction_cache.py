@@ -0,0 +1,107 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import ExtractionCacheEntry
+from utils.pdf_processor import PDFProcessor
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Persistent cache of extracted report text keyed by (file hash, extractor version).
+
+    Entries for other extractor versions are never returned and are purged on
+    startup; empty extractions are never stored or returned; the cache is evicted least-recently-used first once it grows past
+    EXTRACTION_CACHE_MAX_BYTES.
+    """
+
+    @staticmethod
+    def get(db: Session, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Return {"text", "pages"} for a cached extraction, or None on a miss"""
+        if not file_hash:
+            return None
+
+        entry = db.query(ExtractionCacheEntry).filter(
+            ExtractionCacheEntry.file_hash == file_hash,
+            ExtractionCacheEntry.extractor_version == PDFProcessor.EXTRACTOR_VERSION
+        ).first()
+        if not entry:
+            return None
+        if not (entry.text or "").strip():
+            # A failed extraction (e.g. OCR unavailable) must not stick; drop it so the
+            # next successful extraction can be cached
+            db.delete(entry)
+            db.commit()
+            return None
+
+        entry.last_accessed_at = datetime.now()
+        db.commit()
+        return {"text": entry.text, "pages": entry.pages or []}
+
+    @staticmethod
+    def put(db: Session, file_hash: str, text: str, pages: List[str]):
+        """Store an extraction and evict old entries if the cache is over its size budget; empty text isn't cached"""
+        if not file_hash or not (text or "").strip():
+            return
+
+        entry = ExtractionCacheEntry(
+            file_hash=file_hash,
+            extractor_version=PDFProcessor.EXTRACTOR_VERSION,
+            text=text,
+            pages=pages,
+            size_bytes=len(text.encode("utf-8")) + sum(len(page.encode("utf-8")) for page in pages),
+            last_accessed_at=datetime.now()
+        )
+        try:
+            db.add(entry)
+            db.commit()
+        except IntegrityError:
+            # Another worker cached the same file first
+            db.rollback()
+            return
+
+        ExtractionCache.evict(db)
+
+    @staticmethod
+    def evict(db: Session, max_bytes: Optional[int] = None) -> int:
+        """Delete least-recently-used entries until the cache fits in max_bytes"""
+        max_bytes = max_bytes or settings.EXTRACTION_CACHE_MAX_BYTES
+        total = db.query(func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0)).scalar()
+        if total <= max_bytes:
+            return 0
+
+        # Only ids and sizes are loaded; the cached text stays on disk
+        candidates = db.query(ExtractionCacheEntry.id, ExtractionCacheEntry.size_bytes).order_by(
+            ExtractionCacheEntry.last_accessed_at.asc()
+        ).all()
+        evict_ids = []
+        for entry_id, size_bytes in candidates:
+            if total <= max_bytes:
+                break
+            total -= size_bytes or 0
+            evict_ids.append(entry_id)
+
+        db.query(ExtractionCacheEntry).filter(
+            ExtractionCacheEntry.id.in_(evict_ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        logger.info(f"Evicted {len(evict_ids)} extraction cache entries")
+        return len(evict_ids)
+
+    @staticmethod
+    def purge_stale_versions(db: Session) -> int:
+        """Drop entries produced by a different extractor version"""
+        deleted = db.query(ExtractionCacheEntry).filter(
+            ExtractionCacheEntry.extractor_version != PDFProcessor.EXTRACTOR_VERSION
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            logger.info(f"Purged {deleted} extraction cache entries from older extractor versions")
+        return deleted
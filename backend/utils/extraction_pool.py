@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from config import get_settings
+from utils.pdf_processor import PDFProcessor
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def extract_pages(file_path: str, file_type: str, page_range: Optional[Tuple[int, int]] = None, header_only: bool = False) -> Optional[List[str]]:
+    """
+    Extract per-page text from a report file (module-level so worker processes can unpickle it).
+    None if a PDF could not be read, so a failed chunk isn't mistaken for pages without text.
+    """
+    file_type = (file_type or "").lower()
+    if file_type == ".pdf":
+        return PDFProcessor.extract_pages_from_pdf(file_path, page_range=page_range, header_only=header_only)
+    elif file_type in [".jpg", ".jpeg", ".png"]:
+        text = PDFProcessor.extract_text_from_image(file_path)
+        return [text] if text else []
+    logger.error(f"Unsupported file type: {file_type}")
+    return []
+
+
+class ExtractionPool:
+    """
+    Process pool for CPU-bound text extraction (pdfplumber, tesseract OCR).
+
+    Workers are recycled after EXTRACTION_MAX_TASKS_PER_CHILD files so memory
+    leaked by pdfplumber/PIL stays bounded.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=settings.EXTRACTION_WORKERS,
+                    # max_tasks_per_child is not supported with the fork start method
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=settings.EXTRACTION_MAX_TASKS_PER_CHILD
+                )
+                logger.info(f"Extraction pool started with {settings.EXTRACTION_WORKERS} worker processes")
+            return cls._executor
+
+    @classmethod
+    def extract_pages(cls, file_path: str, file_type: str, header_only: bool = False) -> List[str]:
+        """
+        Extract per-page text in worker processes, blocking the calling thread until done.
+        Long PDFs are split into page ranges that are extracted in parallel; if any range
+        fails or comes back short, the whole file is extracted again in one task rather
+        than returning a document with pages missing.
+        """
+        try:
+            executor = cls.get_executor()
+            if (file_type or "").lower() == ".pdf" and not header_only:
+                page_count = PDFProcessor.get_page_count(file_path)
+                if page_count >= settings.PDF_PARALLEL_MIN_PAGES:
+                    chunks = PDFProcessor.page_chunks(page_count, settings.PDF_PAGES_PER_CHUNK)
+                    futures = [executor.submit(extract_pages, file_path, file_type, chunk) for chunk in chunks]
+                    results = [future.result() for future in futures]
+                    if all(pages is not None and len(pages) == end - start
+                           for pages, (start, end) in zip(results, chunks)):
+                        return [page for pages in results for page in pages]
+                    logger.warning(f"Parallel extraction of {file_path} returned incomplete pages; extracting serially")
+            return executor.submit(extract_pages, file_path, file_type, None, header_only).result() or []
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM on a huge scan); rebuild the pool and extract in-process
+            logger.error(f"Extraction pool broken, restarting: {e}")
+            cls.shutdown()
+            return extract_pages(file_path, file_type, None, header_only) or []
+
+    @classmethod
+    def extract(cls, file_path: str, file_type: str) -> str:
+        """Extract full text in a worker process, blocking the calling thread until done"""
+        return PDFProcessor.join_pages(cls.extract_pages(file_path, file_type))
+
+    @classmethod
+    async def extract_async(cls, file_path: str, file_type: str) -> str:
+        """Extract full text in a worker process without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        pages = await loop.run_in_executor(cls.get_executor(), extract_pages, file_path, file_type)
+        return PDFProcessor.join_pages(pages or [])
+
+    @classmethod
+    def shutdown(cls, wait: bool = False):
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=wait, cancel_futures=True)
+                cls._executor = None
@@ -0,0 +1,95 @@
+import logging
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ReportFileServer:
+    """Path resolution and HTTP caching helpers for serving stored report files"""
+
+    MEDIA_TYPES = {
+        '.pdf': 'application/pdf',
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.png': 'image/png',
+        '.txt': 'text/plain'
+    }
+
+    # stored file_path -> path that exists on this machine
+    _path_cache: Dict[str, str] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def resolve_path(stored_path: str) -> Optional[str]:
+        """
+        Find the file for a stored report path. Older rows hold Windows-style
+        relative paths, so a few candidates are probed once and the hit is cached.
+        """
+        if not stored_path:
+            return None
+
+        cached = ReportFileServer._path_cache.get(stored_path)
+        if cached:
+            return cached
+
+        normalized = os.path.normpath(stored_path.replace('\\', '/'))
+        candidates = [
+            stored_path,  # Original path
+            normalized,  # Relative to the working directory
+            os.path.join(PROJECT_ROOT, normalized),  # Relative to the project root
+            os.path.join('..', normalized)  # Server started from backend/
+        ]
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                with ReportFileServer._lock:
+                    ReportFileServer._path_cache[stored_path] = candidate
+                return candidate
+
+        return None
+
+    @staticmethod
+    def invalidate(stored_path: str):
+        """Forget a cached resolution (file moved or deleted)"""
+        with ReportFileServer._lock:
+            ReportFileServer._path_cache.pop(stored_path, None)
+
+    @staticmethod
+    def media_type(file_path: str) -> str:
+        return ReportFileServer.MEDIA_TYPES.get(os.path.splitext(file_path)[1].lower(), 'application/octet-stream')
+
+    @staticmethod
+    def etag(file_hash: str) -> str:
+        """Strong ETag: file_hash is the MD5 of the exact bytes served"""
+        return f'"{file_hash}"'
+
+    @staticmethod
+    def last_modified(mtime: float) -> str:
+        return formatdate(mtime, usegmt=True)
+
+    @staticmethod
+    def is_not_modified(headers, etag: Optional[str], mtime: float) -> bool:
+        """
+        Evaluate If-None-Match / If-Modified-Since. If-None-Match takes precedence
+        when present (RFC 9110 13.2.2).
+        """
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            if not etag:
+                return False
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison: W/"x" matches "x"
+            return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= int(parsedate_to_datetime(if_modified_since).timestamp())
+            except (TypeError, ValueError):
+                return False
+
+        return False
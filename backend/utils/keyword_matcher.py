@@ -0,0 +1,123 @@
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatch(NamedTuple):
+    start: int  # Offsets into text.lower()
+    end: int
+    term: str
+    payload: Any
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a keyword vocabulary.
+
+    One pass over the text reports every occurrence of every term (overlapping
+    matches included), so lookup cost depends on the length of the text and the
+    number of matches, not on the size of the vocabulary. Matching is case-insensitive;
+    with whole_words=True a match must not be preceded or followed by a letter/digit.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Any]]):
+        # Trie: goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Terms ending at each state, including those reached through failure links
+        self._output: List[List[int]] = [[]]
+        self._terms: List[str] = []
+        self._payloads: List[List[Any]] = []
+        term_ids: Dict[str, int] = {}
+
+        for term, payload in entries:
+            term = term.lower()
+            if not term:
+                continue
+            if term not in term_ids:
+                term_ids[term] = len(self._terms)
+                self._terms.append(term)
+                self._payloads.append([])
+                self._insert(term, term_ids[term])
+            self._payloads[term_ids[term]].append(payload)
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _insert(self, term: str, term_id: int):
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(term_id)
+
+    def _build_failure_links(self):
+        # Breadth-first from the root's children, whose failure link is the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
+
+    def find_all(self, text: str, whole_words: bool = False) -> List[KeywordMatch]:
+        """Every occurrence of every term, ordered by start offset"""
+        if not text or not self._terms:
+            return []
+
+        text_lower = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for index, char in enumerate(text_lower):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term_id in output[state]:
+                term = self._terms[term_id]
+                start = index - len(term) + 1
+                end = index + 1
+                if whole_words and (
+                    (start > 0 and self._is_word_char(text_lower[start - 1])) or
+                    (end < len(text_lower) and self._is_word_char(text_lower[end]))
+                ):
+                    continue
+                for payload in self._payloads[term_id]:
+                    matches.append(KeywordMatch(start, end, term, payload))
+
+        matches.sort(key=lambda match: (match.start, match.end))
+        return matches
+
+    def first_matches(self, text: str, whole_words: bool = False) -> Dict[str, KeywordMatch]:
+        """First occurrence of each matched term (one entry per term, first payload)"""
+        first = {}
+        for match in self.find_all(text, whole_words):
+            if match.term not in first:
+                first[match.term] = match
+        return first
+
+    def matched_payloads(self, text: str, whole_words: bool = False) -> List[Any]:
+        """Distinct payloads of the terms found in text, in order of first occurrence"""
+        seen = []
+        for match in self.find_all(text, whole_words):
+            if match.payload not in seen:
+                seen.append(match.payload)
+        return seen
@@ -0,0 +1,196 @@
+import copy
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from models import LLMResponseCacheEntry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of parsed LLM responses keyed by a hash of (purpose, model,
+    system prompt hash, mode, normalised input), so a phrasing that was already
+    sent to the model is answered without the round trip.
+
+    Entries expire after LLM_CACHE_TTL_SECONDS and the table is evicted least
+    recently used first above LLM_CACHE_MAX_ENTRIES. The most recently used
+    entries are also kept in process memory, so a repeated query is served
+    without touching the database; hits there don't refresh last_accessed_at.
+    """
+
+    _memory: "OrderedDict[str, Tuple[datetime, Any]]" = OrderedDict()
+    _lock = threading.Lock()
+    _counters: Dict[str, int] = {"memory_hits": 0, "db_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case and whitespace differences don't change what the model is asked"""
+        return " ".join((text or "").split()).casefold()
+
+    @staticmethod
+    def make_key(purpose: str, model: str, system_prompt: str, text: str, mode: Optional[str] = None) -> str:
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([purpose, model, prompt_hash, mode, LLMResponseCache.normalize(text)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _count(counter: str, amount: int = 1):
+        with LLMResponseCache._lock:
+            LLMResponseCache._counters[counter] += amount
+
+    @staticmethod
+    def _remember(cache_key: str, expires_at: datetime, response: Any):
+        with LLMResponseCache._lock:
+            LLMResponseCache._memory[cache_key] = (expires_at, response)
+            LLMResponseCache._memory.move_to_end(cache_key)
+            while len(LLMResponseCache._memory) > settings.LLM_CACHE_MEMORY_ENTRIES:
+                LLMResponseCache._memory.popitem(last=False)
+
+    @staticmethod
+    def get(cache_key: str, db: Optional[Session] = None) -> Optional[Any]:
+        """A copy of the cached response, or None on a miss (or if the cache is disabled)"""
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+
+        now = datetime.now()
+        with LLMResponseCache._lock:
+            cached = LLMResponseCache._memory.get(cache_key)
+            if cached is not None:
+                if cached[0] > now:
+                    LLMResponseCache._memory.move_to_end(cache_key)
+                    LLMResponseCache._counters["memory_hits"] += 1
+                    # Callers post-process the response in place
+                    return copy.deepcopy(cached[1])
+                del LLMResponseCache._memory[cache_key]
+
+        session = db or SessionLocal()
+        try:
+            entry = session.query(LLMResponseCacheEntry).filter(
+                LLMResponseCacheEntry.cache_key == cache_key,
+                LLMResponseCacheEntry.expires_at > now
+            ).first()
+            if not entry:
+                LLMResponseCache._count("misses")
+                return None
+
+            entry.last_accessed_at = now
+            entry.hit_count = (entry.hit_count or 0) + 1
+            session.commit()
+            LLMResponseCache._count("db_hits")
+            LLMResponseCache._remember(cache_key, entry.expires_at, entry.response)
+            return copy.deepcopy(entry.response)
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"LLM response cache lookup failed: {e}")
+            LLMResponseCache._count("misses")
+            return None
+        finally:
+            if db is None:
+                session.close()
+
+    @staticmethod
+    def put(cache_key: str, response: Any, purpose: str, model: str, db: Optional[Session] = None):
+        """Store a parsed response and evict old entries if the cache is over its limit"""
+        if not settings.LLM_CACHE_ENABLED:
+            return
+
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+        response = copy.deepcopy(response)
+        LLMResponseCache._remember(cache_key, expires_at, response)
+
+        session = db or SessionLocal()
+        try:
+            # Replaces an expired entry for the same key
+            session.query(LLMResponseCacheEntry).filter(
+                LLMResponseCacheEntry.cache_key == cache_key
+            ).delete(synchronize_session=False)
+            session.add(LLMResponseCacheEntry(
+                cache_key=cache_key,
+                purpose=purpose,
+                model=model,
+                response=response,
+                hit_count=0,
+                expires_at=expires_at,
+                last_accessed_at=now
+            ))
+            session.commit()
+            LLMResponseCache.evict(session)
+        except IntegrityError:
+            # Another request cached the same query first
+            session.rollback()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Could not cache LLM response: {e}")
+        finally:
+            if db is None:
+                session.close()
+
+    @staticmethod
+    def evict(db: Session, max_entries: Optional[int] = None) -> int:
+        """Delete expired entries, then least-recently-used ones until at most max_entries remain"""
+        max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        evicted = LLMResponseCache.purge_expired(db)
+
+        excess = db.query(LLMResponseCacheEntry.id).count() - max_entries
+        if excess > 0:
+            evict_ids = [entry_id for entry_id, in db.query(LLMResponseCacheEntry.id).order_by(
+                LLMResponseCacheEntry.last_accessed_at.asc()
+            ).limit(excess).all()]
+            db.query(LLMResponseCacheEntry).filter(
+                LLMResponseCacheEntry.id.in_(evict_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            evicted += len(evict_ids)
+            LLMResponseCache._count("evictions", len(evict_ids))
+            logger.info(f"Evicted {len(evict_ids)} LLM response cache entries")
+        return evicted
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """Drop entries past their TTL"""
+        deleted = db.query(LLMResponseCacheEntry).filter(
+            LLMResponseCacheEntry.expires_at <= datetime.now()
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            logger.info(f"Purged {deleted} expired LLM response cache entries")
+        return deleted
+
+    @staticmethod
+    def clear(db: Session) -> int:
+        """Drop every entry (e.g. after changing the model's behaviour outside its prompt)"""
+        with LLMResponseCache._lock:
+            LLMResponseCache._memory.clear()
+        deleted = db.query(LLMResponseCacheEntry).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def stats(db: Session) -> Dict[str, Any]:
+        """Hit/miss counters since startup and the size of the cache"""
+        with LLMResponseCache._lock:
+            counters = dict(LLMResponseCache._counters)
+            memory_entries = len(LLMResponseCache._memory)
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": db.query(LLMResponseCacheEntry.id).count(),
+            "memory_entries": memory_entries,
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "ttl_seconds": settings.LLM_CACHE_TTL_SECONDS,
+            "max_entries": settings.LLM_CACHE_MAX_ENTRIES
+        }
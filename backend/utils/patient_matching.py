@@ -0,0 +1,123 @@
+import re
+import logging
+from typing import Dict, Iterable, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import User
+
+logger = logging.getLogger(__name__)
+
+
+class PatientMatcher:
+    """Extracts patient names from report text and links them to patient records"""
+
+    # Common patterns for patient names in medical reports
+    NAME_PATTERNS = [
+        r'(?:Name|Patient\s+Name|Patient)[:\s]+(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Miss|Master)\s+([A-Z][a-zA-Z\s]+)',
+        r'(?:Name|Patient\s+Name|Patient)[:\s]+([A-Z][a-zA-Z\s]+)',
+        r'Name\s*:\s*(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?)\s+([A-Z][a-zA-Z\s]+)',
+        r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+Age\s*:',
+        r'Mr\.?\s+([A-Z][A-Z\s]+?)(?:\s+Age|\s+Gender|\s+Lab)',
+    ]
+
+    @staticmethod
+    def extract_patient_name(text: str) -> Optional[str]:
+        """Extract patient name from medical report text"""
+        if not text:
+            return None
+
+        for pattern in PatientMatcher.NAME_PATTERNS:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                name = match.group(1).strip()
+                # Clean up name (remove extra words)
+                name = re.sub(r'\s+(Age|Gender|Lab|Years|Year|Date).*$', '', name, flags=re.IGNORECASE).strip()
+                # Capitalize properly
+                name_parts = name.split()
+                formatted_name = ' '.join([part.capitalize() if part.isupper() else part.title() for part in name_parts])
+                return formatted_name
+
+        return None
+
+    @staticmethod
+    def find_or_create_patient(db: Session, patient_name: str) -> Optional[int]:
+        """Return the id of the patient matching patient_name, creating one if none exists"""
+        if not patient_name:
+            return None
+
+        existing_patient = db.query(User).filter(
+            (User.full_name.ilike(f"%{patient_name}%")) |
+            (User.username.ilike(f"%{patient_name}%"))
+        ).first()
+
+        if existing_patient:
+            return existing_patient.id
+
+        # Create new patient with extracted name
+        username = patient_name.lower().replace(" ", "_")
+        new_patient = User(
+            full_name=patient_name,
+            username=username,
+            email=f"{username}@example.com",
+            hashed_password="",  # No password for auto-created patients
+            role="patient"
+        )
+        try:
+            # Savepoint: job-queue workers can race to create the same patient
+            with db.begin_nested():
+                db.add(new_patient)
+        except IntegrityError:
+            existing_patient = db.query(User).filter(User.username == username).first()
+            if existing_patient:
+                logger.info(f"Patient record for '{patient_name}' was created concurrently")
+                return existing_patient.id
+            raise
+        db.commit()
+        db.refresh(new_patient)
+        logger.info(f"Created patient record for '{patient_name}'")
+        return new_patient.id
+
+    @staticmethod
+    def resolve_patients(db: Session, patient_names: Iterable[str]) -> Dict[str, int]:
+        """
+        Batch version of find_or_create_patient for imports: one query for exact
+        name matches, the usual fuzzy lookup only for the rest, and new patients
+        flushed together. The caller commits.
+        """
+        names = {name for name in patient_names if name}
+        if not names:
+            return {}
+
+        resolved = {}
+        exact_matches = db.query(User.id, User.full_name).filter(User.full_name.in_(names)).all()
+        for user_id, full_name in exact_matches:
+            resolved.setdefault(full_name, user_id)
+
+        new_patients = {}
+        for name in sorted(names - set(resolved)):
+            existing_patient = db.query(User.id).filter(
+                (User.full_name.ilike(f"%{name}%")) |
+                (User.username.ilike(f"%{name}%"))
+            ).first()
+            if existing_patient:
+                resolved[name] = existing_patient.id
+                continue
+
+            # Names differing only in case share a username, so they share a patient
+            username = name.lower().replace(" ", "_")
+            if username not in new_patients:
+                new_patients[username] = User(
+                    full_name=name,
+                    username=username,
+                    email=f"{username}@example.com",
+                    hashed_password="",  # No password for auto-created patients
+                    role="patient"
+                )
+                db.add(new_patients[username])
+            resolved[name] = new_patients[username]
+
+        if new_patients:
+            db.flush()
+            logger.info(f"Created {len(new_patients)} patient records")
+
+        return {name: (value.id if isinstance(value, User) else value) for name, value in resolved.items()}
@@ -2,35 +2,108 @@ import pdfplumber
 from PIL import Image
 import pytesseract
 import logging
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
+from config import get_settings
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 class PDFProcessor:
+    # Bump whenever extraction output changes so cached extractions are invalidated
+    EXTRACTOR_VERSION = "2"
+    
+    @staticmethod
+    def iter_pages(file_path: str, page_range: Optional[Tuple[int, int]] = None) -> Iterator[str]:
+        """
+        Lazily yield the text of each page (0-based, end-exclusive page_range).
+        Pages are parsed one at a time and released as soon as their text is read.
+        Pages without a usable text layer (scans) are rasterised and OCR'd.
+        """
+        with pdfplumber.open(file_path) as pdf:
+            start, end = page_range or (0, len(pdf.pages))
+            for page_number, page in enumerate(pdf.pages[start:end], start=start):
+                try:
+                    text = page.extract_text() or ""
+                    if settings.OCR_ENABLED and len(text.strip()) < settings.OCR_MIN_TEXT_CHARS:
+                        text = PDFProcessor._ocr_pdf_page(page, page_number) or text
+                    yield text
+                finally:
+                    page.close()
+    
     @staticmethod
-    def extract_text_from_pdf(file_path: str) -> Optional[str]:
+    def _ocr_pdf_page(page, page_number: int) -> str:
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            image = page.to_image(resolution=settings.OCR_RESOLUTION).original
+            text = pytesseract.image_to_string(PDFProcessor.preprocess_for_ocr(image))
+            logger.info(f"OCR'd page {page_number + 1} (no text layer)")
             return text.strip()
+        except Exception as e:
+            logger.error(f"Error running OCR on PDF page {page_number + 1}: {e}")
+            return ""
+    
+    @staticmethod
+    def preprocess_for_ocr(image: Image.Image) -> Image.Image:
+        """Shrink the image tesseract has to read: grayscale, cap the size, optionally binarise"""
+        if settings.OCR_GRAYSCALE and image.mode != "L":
+            image = image.convert("L")
+        
+        if max(image.size) > settings.OCR_MAX_DIMENSION:
+            image = image.copy()
+            image.thumbnail((settings.OCR_MAX_DIMENSION, settings.OCR_MAX_DIMENSION), Image.LANCZOS)
+        
+        if settings.OCR_BINARIZE:
+            threshold = settings.OCR_BINARIZE_THRESHOLD
+            image = image.convert("L").point(lambda p: 255 if p > threshold else 0)
+        
+        return image
+    
+    @staticmethod
+    def get_page_count(file_path: str) -> int:
+        try:
+            with pdfplumber.open(file_path) as pdf:
+                return len(pdf.pages)
+        except Exception as e:
+            logger.error(f"Error reading PDF page count: {e}")
+            return 0
+    
+    @staticmethod
+    def page_chunks(page_count: int, chunk_size: int) -> List[Tuple[int, int]]:
+        """Split a document into (start, end) page ranges for parallel extraction"""
+        return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+    
+    @staticmethod
+    def extract_pages_from_pdf(file_path: str, page_range: Optional[Tuple[int, int]] = None, header_only: bool = False) -> Optional[List[str]]:
+        """Per-page text; header_only stops after the first page (enough for patient details)"""
+        if header_only:
+            page_range = (0, 1)
+        try:
+            return list(PDFProcessor.iter_pages(file_path, page_range))
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             return None
     
+    @staticmethod
+    def extract_text_from_pdf(file_path: str, page_range: Optional[Tuple[int, int]] = None, header_only: bool = False) -> Optional[str]:
+        pages = PDFProcessor.extract_pages_from_pdf(file_path, page_range=page_range, header_only=header_only)
+        if pages is None:
+            return None
+        return PDFProcessor.join_pages(pages)
+    
     @staticmethod
     def extract_text_from_image(file_path: str) -> Optional[str]:
         try:
             image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            text = pytesseract.image_to_string(PDFProcessor.preprocess_for_ocr(image))
             return text.strip()
         except Exception as e:
             logger.error(f"Error extracting text from image: {e}")
             return None
     
+    @staticmethod
+    def join_pages(pages: List[str]) -> str:
+        """Assemble per-page text into the full report text"""
+        return "\n".join(page for page in pages if page).strip()
+    
     @staticmethod
     async def process_medical_report(file_path: str, file_type: str) -> Optional[str]:
         if file_type.lower() == ".pdf":
@@ -0,0 +1,91 @@
+import copy
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One in-flight call: its task, the chunks it has emitted so far and who is listening"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.chunks: List[Any] = []
+        self.listeners: List[Callable[[Any], None]] = []
+
+    def emit(self, chunk: Any):
+        self.chunks.append(chunk)
+        for listener in list(self.listeners):
+            listener(chunk)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is running, later
+    callers with the same key wait for it instead of starting their own, and every
+    caller gets (a copy of) its result or exception.
+
+    The call runs as its own task, so a caller that goes away (a closed stream)
+    doesn't cancel it for the others. Chunks the call emits while it runs
+    (streamed tokens) are passed to each caller's on_chunk, replaying earlier
+    chunks to callers that join late.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, call: Callable[[Callable[[Any], None]], Awaitable[T]],
+                 on_chunk: Optional[Callable[[Any], None]] = None) -> T:
+        """Result of call(emit), shared with concurrent callers of the same key"""
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)  # Tasks can only be awaited on their own loop
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = loop.create_task(call(flight.emit))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(flight_key, flight))
+            self._count("calls")
+        else:
+            self._count("shared")
+            logger.debug(f"{self.name}: joined in-flight call")
+
+        if on_chunk is not None:
+            for chunk in flight.chunks:
+                on_chunk(chunk)
+            flight.listeners.append(on_chunk)
+        try:
+            # Each caller gets its own copy; callers may post-process the result in place
+            return copy.deepcopy(await asyncio.shield(flight.task))
+        finally:
+            if on_chunk is not None:
+                flight.listeners.remove(on_chunk)
+
+    def _finish(self, flight_key: Tuple[asyncio.AbstractEventLoop, Hashable], flight: _Flight):
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            # Retrieved here so an exception nobody awaited anymore isn't reported as unhandled
+            logger.debug(f"{self.name}: call failed: {flight.task.exception()}")
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream calls made, callers that shared one, and calls in flight now"""
+        with self._lock:
+            counters = dict(self._counters)
+        requests = counters["calls"] + counters["shared"]
+        return {
+            **counters,
+            "in_flight": len(self._flights),
+            "shared_rate": round(counters["shared"] / requests, 3) if requests else 0.0
+        }
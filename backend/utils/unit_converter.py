@@ -0,0 +1,152 @@
+import re
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceRange(NamedTuple):
+    low: Optional[float]  # None for "<x" ranges
+    high: Optional[float]  # None for ">x" ranges
+    unit: Optional[str]  # Canonical unit of both bounds (as printed if not known)
+
+
+class UnitConverter:
+    """
+    Converts lab values and reference ranges to one canonical unit per quantity
+    ("lakh/mm³", "/cmm" and "mill/mm³" all become cells per μL, "g%" becomes g/dL),
+    so results can be compared and flagged with arithmetic instead of string checks.
+    """
+
+    # canonical unit -> [(factor, spellings)]; a value in a spelling times factor is in the canonical unit
+    UNIT_TABLE = {
+        "/μL": [
+            (1, ["/μl", "/ul", "/mm³", "/mm3", "/cmm", "/cumm", "cells/μl", "cells/ul", "cells/cmm", "cells/cumm"]),
+            (1e3, ["10³/μl", "10^3/μl", "x10³/μl", "x10^3/μl", "10^3/ul", "x10^3/ul", "thou/mm³", "thou/mm3",
+                   "thou/cmm", "thou/μl", "k/μl", "k/ul", "10^9/l", "x10^9/l", "10⁹/l", "x10⁹/l"]),
+            (1e5, ["lakh", "lakhs", "lakh/mm³", "lakh/mm3", "lakh/cmm", "lakh/cumm", "lakh/μl", "lakhs/cumm",
+                   "lakhs/cmm"]),
+            (1e6, ["mill/mm³", "mill/mm3", "mill/cmm", "mill/cumm", "mill/μl", "million/μl", "million/ul",
+                   "million/mm³", "million/mm3", "million/cmm", "millions/cumm", "10^6/μl", "x10^6/μl", "10⁶/μl",
+                   "x10⁶/μl", "10^12/l", "x10^12/l", "10¹²/l", "x10¹²/l"]),
+        ],
+        "g/dL": [(1, ["g/dl", "gm/dl", "gms/dl", "g%", "gm%", "gms%"]), (0.1, ["g/l", "gm/l"])],
+        "mg/dL": [(1, ["mg/dl", "mg%"])],
+        "mg/L": [(1, ["mg/l"])],
+        "U/L": [(1, ["u/l", "iu/l", "units/l"])],
+        "mm/hr": [(1, ["mm/hr", "mm/h", "mm/1sthr", "mm/1sthour", "mm/1st hr"])],
+        "%": [(1, ["%"])],
+        "fL": [(1, ["fl"])],
+        "pg": [(1, ["pg"])],
+    }
+
+    NUMBER = r'(\d[\d,]*(?:\.\d+)?)'
+    VALUE_PATTERN = re.compile(rf'^\s*{NUMBER}\s*(.*?)\s*$')
+    RANGE_PATTERN = re.compile(rf'{NUMBER}\s*(?:[-–]|to)\s*{NUMBER}\s*(.*)$')
+    BOUND_PATTERN = re.compile(rf'^\s*([<>])\s*=?\s*{NUMBER}\s*(.*)$')
+    SPACE_PATTERN = re.compile(r'\s+')
+
+    _lookup: Optional[Dict[str, Tuple[str, float]]] = None
+
+    @staticmethod
+    def get_lookup() -> Dict[str, Tuple[str, float]]:
+        """Normalised spelling -> (canonical unit, factor), built once"""
+        if UnitConverter._lookup is None:
+            lookup = {}
+            for canonical, groups in UnitConverter.UNIT_TABLE.items():
+                for factor, spellings in groups:
+                    for spelling in spellings + ([canonical] if factor == 1 else []):
+                        lookup[UnitConverter._key(spelling)] = (canonical, factor)
+            UnitConverter._lookup = lookup
+        return UnitConverter._lookup
+
+    @staticmethod
+    def _key(unit: str) -> str:
+        # Micro sign and Greek mu are both used for μL
+        return UnitConverter.SPACE_PATTERN.sub('', unit).lower().replace('µ', 'μ').rstrip('.')
+
+    @staticmethod
+    def _number(text: str) -> float:
+        return float(text.replace(',', ''))
+
+    @staticmethod
+    def canonical_unit(unit: Optional[str]) -> Optional[Tuple[str, float]]:
+        """(canonical unit, factor) for a unit spelling, or None if it isn't known"""
+        if not unit:
+            return None
+        return UnitConverter.get_lookup().get(UnitConverter._key(unit))
+
+    @staticmethod
+    def convert(value: float, unit: Optional[str]) -> Tuple[float, Optional[str]]:
+        """value in the canonical unit; unknown units are returned unchanged"""
+        canonical = UnitConverter.canonical_unit(unit)
+        if canonical is None:
+            return value, unit
+        return value * canonical[1], canonical[0]
+
+    @staticmethod
+    def convert_many(values: Sequence[float], units: Sequence[Optional[str]]) -> List[Tuple[float, Optional[str]]]:
+        """convert() over parallel arrays, looking each distinct unit up once"""
+        resolved = {unit: UnitConverter.canonical_unit(unit) for unit in set(units)}
+        converted = []
+        for value, unit in zip(values, units):
+            canonical = resolved[unit]
+            converted.append((value, unit) if canonical is None else (value * canonical[1], canonical[0]))
+        return converted
+
+    @staticmethod
+    def split_value(text: Optional[str]) -> Optional[Tuple[float, str]]:
+        """(number, printed unit) of a result such as "7,600 /cmm", or None if it isn't numeric"""
+        match = UnitConverter.VALUE_PATTERN.match(str(text or ""))
+        if not match:
+            return None
+        return UnitConverter._number(match.group(1)), match.group(2)
+
+    @staticmethod
+    def parse_value(text: Optional[str], default_unit: Optional[str] = None) -> Optional[Tuple[float, Optional[str]]]:
+        """Canonical (value, unit) of a result such as "7,600 /cmm" or "2.4 lakh", or None if it isn't numeric"""
+        split = UnitConverter.split_value(text)
+        if split is None:
+            return None
+        return UnitConverter.convert(split[0], split[1] or default_unit)
+
+    @staticmethod
+    def parse_range(text: Optional[str], default_unit: Optional[str] = None) -> Optional[ReferenceRange]:
+        """
+        Canonical bounds of a reference range ("4,000 – 11,000", "1.5 – 4.5 lakh", "<41").
+        A range without its own unit is in default_unit (the unit of the result).
+        """
+        text = str(text or "")
+        match = UnitConverter.BOUND_PATTERN.match(text)
+        if match:
+            bound = UnitConverter._number(match.group(2))
+            unit = match.group(3) if UnitConverter.canonical_unit(match.group(3)) else default_unit
+            bound, unit = UnitConverter.convert(bound, unit)
+            return ReferenceRange(None, bound, unit) if match.group(1) == '<' else ReferenceRange(bound, None, unit)
+
+        match = UnitConverter.RANGE_PATTERN.search(text)
+        if not match:
+            return None
+        unit = match.group(3) if UnitConverter.canonical_unit(match.group(3)) else default_unit
+        low, canonical = UnitConverter.convert(UnitConverter._number(match.group(1)), unit)
+        high, _ = UnitConverter.convert(UnitConverter._number(match.group(2)), unit)
+        return ReferenceRange(low, high, canonical)
+
+    @staticmethod
+    def flag(value: float, reference: Optional[ReferenceRange]) -> str:
+        """High, Low or Normal for a canonical value ("<x" is High at x, ">x" is Low at x)"""
+        if reference is None:
+            return "Normal"
+        if reference.low is None:
+            return "High" if value >= reference.high else "Normal"
+        if reference.high is None:
+            return "Low" if value <= reference.low else "Normal"
+        if value > reference.high:
+            return "High"
+        if value < reference.low:
+            return "Low"
+        return "Normal"
+
+    @staticmethod
+    def flag_many(values: Iterable[float], references: Iterable[Optional[ReferenceRange]]) -> List[str]:
+        return [UnitConverter.flag(value, reference) for value, reference in zip(values, references)]
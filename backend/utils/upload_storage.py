@@ -0,0 +1,69 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Optional, Tuple
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class UploadStorage:
+    """Streams uploaded files to disk without holding them in memory"""
+
+    @staticmethod
+    async def stream_to_temp(upload_file, upload_dir: Optional[str] = None, chunk_size: Optional[int] = None) -> Tuple[str, str, int]:
+        """
+        Read an UploadFile in fixed-size chunks, hashing and writing each chunk
+        to a temp file inside upload_dir (same filesystem, so the final rename is atomic).
+
+        Returns:
+            (temp_path, md5 hex digest, size in bytes)
+        """
+        upload_dir = upload_dir or settings.UPLOAD_DIR
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        os.makedirs(upload_dir, exist_ok=True)
+
+        hasher = hashlib.md5()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(prefix=".upload_", suffix=".part", dir=upload_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                while True:
+                    chunk = await upload_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            UploadStorage.discard(temp_path)
+            raise
+
+        return temp_path, hasher.hexdigest(), size
+
+    @staticmethod
+    def commit(temp_path: str, final_path: str) -> str:
+        """Atomically move a finished temp file to its final location"""
+        os.replace(temp_path, final_path)
+        return final_path
+
+    @staticmethod
+    def discard(temp_path: str) -> None:
+        """Remove a temp file that will not be kept (duplicate or failed upload)"""
+        try:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+        except OSError as e:
+            logger.warning(f"Could not remove temp upload {temp_path}: {e}")
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: Optional[int] = None) -> str:
+        """Calculate the MD5 hash of a file on disk without reading it all at once"""
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        hasher = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
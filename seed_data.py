@@ -309,7 +309,7 @@ try:
     print(f"   📋 See GP: {consultation_count - emergency_count - urgent_count} cases")
     
     print("\n🚀 Next Steps:")
-    print("   1. Start server: cd backend && python main.py")
+    print("   1. Start server: cd backend && python serve.py")
     print("   2. Open browser: http://localhost:8000/frontend/index.html")
     print("   3. Or use start-test.bat for auto-login")
     print("="*70 + "\n")